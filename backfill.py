@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Sharded Backfill Queue
+
+Splits work logs into (user, date) work units kept in a shared SQLite queue.
+Any number of worker processes, on one machine or several hosts sharing the
+file, claim units under a lease, process them through OpenProjectTimeLogger
+and record per-entry results. A worker renews its lease while it works; a
+unit whose lease ran out (its worker crashed or lost the network) is claimed
+again by the next worker. Re-running a unit is safe because existing work
+packages and time entries are detected before anything is created.
+
+Several hosts need the queue file on storage with working file locks.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+UNIT_STATES = ("pending", "leased", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    day TEXT NOT NULL,
+    source TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    updated REAL NOT NULL,
+    UNIQUE (user, day)
+);
+CREATE INDEX IF NOT EXISTS units_claim ON units (user, state, day);
+"""
+
+
+def worker_id():
+    """Return an ID naming this worker process and its host."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkUnit:
+    """One claimed (user, date) block of a work log."""
+
+    def __init__(self, unit_id, user, day, source, payload, attempts):
+        self.id = unit_id
+        self.user = user
+        self.day = day
+        self.source = source
+        self.payload = payload
+        self.attempts = attempts
+
+
+class WorkQueue:
+    """SQLite queue of work units with leases."""
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Transactions are managed explicitly so a claim is one atomic step
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _transaction(self, statements):
+        """Run statements (callables taking the connection) in one write transaction."""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = statements(self.connection)
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return result
+
+    def enqueue(self, user, day, payload, source=""):
+        """Add a unit; a changed unit that is not being worked on starts over.
+
+        Returns True if the unit was added or reset.
+        """
+        encoded = json.dumps(payload, sort_keys=True)
+
+        def write(connection):
+            cursor = connection.execute(
+                """
+                INSERT INTO units (user, day, source, payload, updated)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (user, day) DO UPDATE SET
+                    source = excluded.source,
+                    payload = excluded.payload,
+                    state = 'pending',
+                    attempts = 0,
+                    result = NULL,
+                    updated = excluded.updated
+                WHERE units.payload != excluded.payload AND units.state != 'leased'
+                """,
+                (user, day, source, encoded, time.time()),
+            )
+            return cursor.rowcount > 0
+
+        return self._transaction(write)
+
+    def claim(self, owner, user=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Lease the earliest available unit to owner and return it, or None."""
+
+        def claim_unit(connection):
+            now = time.time()
+            # Units whose worker kept failing are given up on
+            connection.execute(
+                """
+                UPDATE units SET state = 'failed', lease_owner = NULL, updated = ?
+                WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?
+                """,
+                (now, now, self.max_attempts),
+            )
+            query = """
+                SELECT id, user, day, source, payload, attempts FROM units
+                WHERE (state = 'pending' OR (state = 'leased' AND lease_expires < ?))
+            """
+            params = [now]
+            if user is not None:
+                query += " AND user = ?"
+                params.append(user)
+            row = connection.execute(
+                query + " ORDER BY day, id LIMIT 1", params
+            ).fetchone()
+            if row is None:
+                return None
+
+            connection.execute(
+                """
+                UPDATE units SET state = 'leased', lease_owner = ?, lease_expires = ?,
+                    attempts = attempts + 1, updated = ?
+                WHERE id = ?
+                """,
+                (owner, now + lease_seconds, now, row[0]),
+            )
+            unit_id, unit_user, day, source, payload, attempts = row
+            return WorkUnit(
+                unit_id, unit_user, day, source, json.loads(payload), attempts + 1
+            )
+
+        return self._transaction(claim_unit)
+
+    def renew(self, unit_id, owner, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extend a lease; returns False if owner no longer holds it."""
+        cursor = self.connection.execute(
+            """
+            UPDATE units SET lease_expires = ?, updated = ?
+            WHERE id = ? AND state = 'leased' AND lease_owner = ?
+            """,
+            (time.time() + lease_seconds, time.time(), unit_id, owner),
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, unit_id, owner, results, succeeded):
+        """Record a unit's results; a failed unit is retried until max_attempts."""
+
+        def finish(connection):
+            attempts = connection.execute(
+                "SELECT attempts FROM units WHERE id = ? AND lease_owner = ?",
+                (unit_id, owner),
+            ).fetchone()
+            if attempts is None:
+                # The lease expired and another worker took the unit over
+                return False
+            if succeeded:
+                state = "done"
+            elif attempts[0] >= self.max_attempts:
+                state = "failed"
+            else:
+                state = "pending"
+            connection.execute(
+                """
+                UPDATE units SET state = ?, lease_owner = NULL, lease_expires = NULL,
+                    result = ?, updated = ?
+                WHERE id = ?
+                """,
+                (state, json.dumps(results, default=str), time.time(), unit_id),
+            )
+            return True
+
+        return self._transaction(finish)
+
+    def retry_failed(self, user=None):
+        """Put failed units back in the queue and return how many."""
+        query = "UPDATE units SET state = 'pending', attempts = 0, updated = ? WHERE state = 'failed'"
+        params = [time.time()]
+        if user is not None:
+            query += " AND user = ?"
+            params.append(user)
+        return self.connection.execute(query, params).rowcount
+
+    def counts(self, user=None):
+        """Return {state: unit count}."""
+        query = "SELECT state, COUNT(*) FROM units"
+        params = []
+        if user is not None:
+            query += " WHERE user = ?"
+            params.append(user)
+        counts = dict.fromkeys(UNIT_STATES, 0)
+        counts.update(self.connection.execute(query + " GROUP BY state", params))
+        return counts
+
+    def failures(self, user=None):
+        """Return (user, day, attempts, result) of failed units."""
+        query = "SELECT user, day, attempts, result FROM units WHERE state = 'failed'"
+        params = []
+        if user is not None:
+            query += " AND user = ?"
+            params.append(user)
+        return [
+            (unit_user, day, attempts, json.loads(result) if result else None)
+            for unit_user, day, attempts, result in self.connection.execute(
+                query + " ORDER BY day", params
+            )
+        ]
+
+
+class LeaseKeeper:
+    """Renews a unit's lease from a background thread while it is processed."""
+
+    def __init__(self, queue_path, unit_id, owner, lease_seconds):
+        self.queue_path = queue_path
+        self.unit_id = unit_id
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        # SQLite connections belong to the thread that opened them
+        with WorkQueue(self.queue_path) as queue:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                if not queue.renew(self.unit_id, self.owner, self.lease_seconds):
+                    return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+def enqueue_work_logs(queue, parser, documents, user):
+    """Split (source, document) work logs into units and return (queued, errors).
+
+    Date blocks that do not parse cleanly are reported instead of queued, so
+    workers only retry failures that another attempt can fix.
+    """
+    units = {}
+    errors = []
+    for source, document in documents:
+        for block in document.get("logs", []):
+            try:
+                all_date_entries = parser.parse_json_work_log_content({"logs": [block]})
+            except (TypeError, ValueError) as e:
+                errors.append(f"{source}: {e}")
+                continue
+            if parser.errors or not all_date_entries:
+                errors.extend(f"{source}: {error}" for error in parser.errors)
+                continue
+
+            day = next(iter(all_date_entries)).isoformat()
+            if day in units and units[day][1] != block:
+                errors.append(
+                    f"{day} has different entries in {units[day][0]} and {source}; skipped"
+                )
+                units[day] = (units[day][0], None)
+                continue
+            units.setdefault(day, (source, block))
+
+    queued = 0
+    for day, (source, block) in sorted(units.items()):
+        if block is not None and queue.enqueue(user, day, block, source):
+            queued += 1
+    return queued, errors
+
+
+def process_unit(logger, parser_class, unit):
+    """Process one unit and return (per-entry results, succeeded)."""
+    parser = parser_class()
+    all_date_entries = parser.parse_json_work_log_content({"logs": [unit.payload]})
+    results = [{"error": error} for error in parser.errors]
+
+    for day, entries in all_date_entries.items():
+        # Entries may have been logged by an earlier attempt of this unit
+        logger.forget_time_entries()
+        logger.prefetch_work_log_entries(entries, day)
+        logger.apply_work_package_rules(
+            [entry for entry in entries if entry.get("create_new_task")], day
+        )
+        for entry in entries:
+            if entry.get("create_new_task") and not entry.get("project_id"):
+                entry["project_id"] = logger.reference_data.project_id(entry["project"])
+            outcome = logger.process_work_log_entry(entry, day)
+            results.append(
+                {
+                    "subject": entry["subject"],
+                    "hours": entry["hours"],
+                    **outcome,
+                }
+            )
+
+    succeeded = not parser.errors and all(
+        result.get("outcome") != "failed" for result in results
+    )
+    return results, succeeded
+
+
+def run_worker(
+    queue_path,
+    logger,
+    parser_class,
+    user=None,
+    lease_seconds=DEFAULT_LEASE_SECONDS,
+    owner=None,
+):
+    """Claim and process units until none are left; return (done, failed)."""
+    owner = owner or worker_id()
+    done = failed = 0
+
+    with WorkQueue(queue_path) as queue:
+        while True:
+            unit = queue.claim(owner, user, lease_seconds)
+            if unit is None:
+                break
+
+            print(f"[{owner}] {unit.user} {unit.day} (attempt {unit.attempts})")
+            with LeaseKeeper(queue_path, unit.id, owner, lease_seconds):
+                try:
+                    results, succeeded = process_unit(logger, parser_class, unit)
+                except Exception as e:
+                    results, succeeded = [
+                        {"error": f"{e.__class__.__name__}: {e}"}
+                    ], False
+
+            if not queue.complete(unit.id, owner, results, succeeded):
+                print(f"[{owner}] Lost the lease on {unit.day}; another worker has it")
+            elif succeeded:
+                done += 1
+            else:
+                failed += 1
+
+    return done, failed
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Work Log Parser Benchmark
+
+Times parsing of a synthetic work log the way it used to be done (stdlib
+json, validate_entry_data, then a reference copy of the former per-entry
+parsing) against WorkLogParser's single-pass decoder, which uses orjson when
+it is installed. Both must produce identical entries.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+
+import ingest
+from config import ACTIVITY_MAPPINGS
+from log import PROJECT_MAPPINGS, WorkLogParser, validate_entry_data
+
+
+def build_work_log(entry_count, entries_per_day=8):
+    """Return a synthetic work log document with about entry_count entries."""
+    projects = list(PROJECT_MAPPINGS)
+    activities = list(ACTIVITY_MAPPINGS)
+    subjects = [
+        "Daily scrum",
+        "Fix validation of leave requests",
+        "Setup staging server for the release",
+        "Clarification session on payroll rules",
+        "Enhanced profile view with new fields",
+    ]
+
+    logs = []
+    day = date(2020, 1, 1)
+    for index in range(entry_count):
+        if index % entries_per_day == 0:
+            logs.append({"date": day.strftime("%b-%d-%Y").lower(), "entries": []})
+            day += timedelta(days=1)
+        is_scrum = index % entries_per_day == 0
+        logs[-1]["entries"].append(
+            {
+                "project": projects[index % len(projects)],
+                "subject": subjects[index % len(subjects)],
+                "break_hours": 0.25 if index % 3 == 0 else None,
+                "duration_hours": 0.5 if is_scrum else 1.25,
+                "activity": activities[index % len(activities)] if index % 2 else None,
+                "is_scrum": is_scrum,
+                "work_package_id": 5641 if is_scrum or index % 4 == 0 else None,
+            }
+        )
+    return {"logs": logs}
+
+
+def parse_task_entry_reference(parser, entry_data, start_time, entry_date):
+    """Parse a validated entry the way parse_json_task_entry used to."""
+    project = entry_data.get("project")
+    subject = entry_data.get("subject") or entry_data.get("description")
+    activity = entry_data.get("activity")
+
+    if not project or not subject:
+        return None
+
+    duration_hours = entry_data.get("duration_hours", 0)
+    if isinstance(duration_hours, str):
+        duration_hours = float(duration_hours.rstrip("h"))
+    else:
+        duration_hours = float(duration_hours) if duration_hours else 0
+
+    if duration_hours == 0:
+        return None
+
+    is_scrum = entry_data.get("is_scrum", False)
+    work_package_id = entry_data.get("work_package_id")
+    break_hours = entry_data.get("break_hours") or 0
+    break_minutes = int(break_hours * 60) if break_hours else 0
+
+    if is_scrum:
+        if not work_package_id:
+            return None
+        actual_start_time = datetime.strptime("10:00", "%H:%M").replace(
+            year=entry_date.year, month=entry_date.month, day=entry_date.day
+        )
+        end_time = actual_start_time + timedelta(hours=duration_hours)
+        create_new_task = False
+        break_minutes = 0
+        break_hours = 0
+    else:
+        actual_start_time = start_time + timedelta(minutes=break_minutes)
+        actual_start_time = actual_start_time.replace(
+            year=entry_date.year, month=entry_date.month, day=entry_date.day
+        )
+        end_time = actual_start_time + timedelta(hours=duration_hours)
+        if work_package_id:
+            work_package_id = int(work_package_id)
+            create_new_task = False
+        else:
+            work_package_id = None
+            create_new_task = True
+
+    return {
+        "project": project,
+        "work_package_id": work_package_id,
+        "project_id": parser.project_mappings.get(project),
+        "subject": subject,
+        "activity": activity,
+        "start_time": actual_start_time,
+        "end_time": end_time,
+        "hours": duration_hours,
+        "break_minutes": break_minutes,
+        "break_hours": break_hours,
+        "create_new_task": create_new_task,
+        "is_scrum": is_scrum,
+        "needs_user_choice": not is_scrum and not work_package_id,
+        "activity_determined": not activity,
+        "entry_date": entry_date,
+    }
+
+
+def parse_two_pass(parser, file_path):
+    """Parse the way WorkLogParser did before the single-pass decoder."""
+    with open(file_path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+
+    all_time_entries = {}
+    for log_entry in data["logs"]:
+        parsed_date = parser.parse_date_string(log_entry["date"])
+        time_entries = []
+        current_time = datetime.strptime("09:00", "%H:%M")
+        for entry_index, entry_data in enumerate(log_entry["entries"]):
+            if validate_entry_data(entry_data, entry_index + 1):
+                continue
+            entry = parse_task_entry_reference(
+                parser, entry_data, current_time, parsed_date
+            )
+            if entry:
+                time_entries.append(entry)
+                current_time = entry["end_time"]
+        if time_entries:
+            all_time_entries[parsed_date] = time_entries
+
+    parser.determine_activities(all_time_entries)
+    return all_time_entries
+
+
+def best_time(function, repeat):
+    """Return the best wall time of repeat calls and the last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--entries", type=int, default=50000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args(argv)
+
+    document = build_work_log(args.entries)
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".json", delete=False, encoding="utf-8"
+    ) as file:
+        json.dump(document, file)
+        file_path = file.name
+
+    try:
+        parser = WorkLogParser(file_path)
+        with redirect_stdout(io.StringIO()):
+            two_pass_time, two_pass = best_time(
+                lambda: parse_two_pass(WorkLogParser(file_path), file_path),
+                args.repeat,
+            )
+            single_pass_time, single_pass = best_time(
+                parser.parse_work_log_file, args.repeat
+            )
+    finally:
+        os.remove(file_path)
+
+    if two_pass != single_pass:
+        print("✗ The two parsing paths returned different entries")
+        return 1
+
+    backend = "orjson" if ingest.orjson is not None else "json"
+    print(f"{args.entries} entries, best of {args.repeat}")
+    print(
+        f"  json + validate + parse:  {two_pass_time * 1000:8.1f} ms  "
+        f"({args.entries / two_pass_time:,.0f} entries/s)"
+    )
+    print(
+        f"  {backend} + single pass: {single_pass_time * 1000:8.1f} ms  "
+        f"({args.entries / single_pass_time:,.0f} entries/s)"
+    )
+    print(f"  speedup: {two_pass_time / single_pass_time:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
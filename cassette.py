@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+HTTP Record and Replay
+
+'--record PATH' saves every request and response of a run, with its
+latency, to a JSON cassette; '--replay PATH' answers the same requests from
+the cassette without a server, optionally sleeping for the recorded latency
+(scaled by a factor). Runs of log.py and test_api.py can then be
+benchmarked and compared offline against identical data.
+
+Requests are matched by method, URL (query parameters in any order) and
+JSON body. Identical requests get their recorded responses in order; the
+last one is repeated when they run out. A request missing from the cassette
+fails with CassetteMiss. Authorization and cookie headers are not stored,
+and the API token is replaced wherever it appears.
+
+Cassettes are installed by wrapping the adapters mounted on a session, so
+replayed requests still pass through the client-side rate limiter.
+"""
+
+import base64
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from requests.exceptions import ConnectionError as RequestConnectionError
+from requests.exceptions import RequestException
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+CASSETTE_VERSION = 1
+REDACTED = "<redacted>"
+SKIPPED_HEADERS = {"authorization", "cookie", "set-cookie", "proxy-authorization"}
+STORED_REQUEST_HEADERS = {"content-type", "accept"}
+
+_active_cassette = None
+
+
+class CassetteMiss(RequestException):
+    """A replayed request that the cassette has no response for."""
+
+
+def request_key(method, url, body):
+    """Return the key a request is matched by."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    url = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+    return f"{method.upper()} {url} {body or ''}"
+
+
+def normalize_body(body):
+    """Return a request body as canonical text."""
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    try:
+        return json.dumps(json.loads(body), sort_keys=True)
+    except ValueError:
+        return body
+
+
+class Cassette:
+    """Recorded interactions of one run, for recording or replaying."""
+
+    def __init__(self, path, mode, latency_scale=0.0, secrets=()):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.secrets = [secret for secret in secrets if secret]
+        self.interactions = []
+        self.replay_queues = {}
+        self.lock = threading.Lock()
+        self.misses = 0
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"{self.path}: unsupported cassette version")
+        self.interactions = data["interactions"]
+        for interaction in self.interactions:
+            request = interaction["request"]
+            key = request_key(request["method"], request["url"], request["body"])
+            self.replay_queues.setdefault(key, []).append(interaction)
+
+    def redact(self, text):
+        for secret in self.secrets:
+            text = text.replace(secret, REDACTED)
+        return text
+
+    def record(self, request, response, elapsed):
+        """Add one request and its response (None if it failed) to the cassette."""
+        body = normalize_body(request.body)
+        interaction = {
+            "request": {
+                "method": request.method,
+                "url": self.redact(request.url),
+                "headers": {
+                    name: value
+                    for name, value in request.headers.items()
+                    if name.lower() in STORED_REQUEST_HEADERS
+                },
+                "body": self.redact(body) if body is not None else None,
+            },
+            "elapsed": round(elapsed, 6),
+        }
+        if response is not None:
+            content = response.content or b""
+            try:
+                text, encoding = self.redact(content.decode("utf-8")), "utf-8"
+            except UnicodeDecodeError:
+                text, encoding = base64.b64encode(content).decode("ascii"), "base64"
+            interaction["response"] = {
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": {
+                    name: self.redact(value)
+                    for name, value in response.headers.items()
+                    if name.lower() not in SKIPPED_HEADERS
+                },
+                "body": text,
+                "encoding": encoding,
+            }
+        with self.lock:
+            self.interactions.append(interaction)
+
+    def next_interaction(self, request):
+        """Return the recorded interaction answering a request."""
+        key = request_key(
+            request.method, self.redact(request.url), normalize_body(request.body)
+        )
+        with self.lock:
+            queue = self.replay_queues.get(key)
+            if not queue:
+                self.misses += 1
+                raise CassetteMiss(
+                    f"No recorded response for {request.method} {request.url}"
+                )
+            # The last response keeps answering repeats of the request
+            return queue.pop(0) if len(queue) > 1 else queue[0]
+
+    def replay(self, request):
+        """Build the recorded response to a request."""
+        interaction = self.next_interaction(request)
+        if self.latency_scale:
+            time.sleep(interaction["elapsed"] * self.latency_scale)
+
+        recorded = interaction.get("response")
+        if recorded is None:
+            raise RequestConnectionError(
+                f"Recorded failure of {request.method} {request.url}"
+            )
+
+        response = Response()
+        response.status_code = recorded["status"]
+        response.reason = recorded["reason"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        # The body is stored decoded; length and encoding headers described the wire
+        response.headers.pop("Content-Encoding", None)
+        response.headers.pop("Transfer-Encoding", None)
+        if recorded["encoding"] == "base64":
+            response._content = base64.b64decode(recorded["body"])
+        else:
+            response._content = recorded["body"].encode("utf-8")
+        response.headers["Content-Length"] = str(len(response._content))
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=interaction["elapsed"])
+        return response
+
+    def save(self):
+        """Write a recorded cassette."""
+        if self.mode != "record":
+            return
+        with self.lock:
+            data = {
+                "version": CASSETTE_VERSION,
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "interactions": list(self.interactions),
+            }
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=1)
+
+
+class CassetteAdapter:
+    """Wraps a transport adapter to record its traffic or replay it."""
+
+    def __init__(self, cassette, adapter):
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        if self.cassette.mode == "replay":
+            limiter = getattr(self.adapter, "limiter", None)
+            if limiter is None:
+                return self.cassette.replay(request)
+            limiter.before_request()
+            start = time.monotonic()
+            response = None
+            try:
+                response = self.cassette.replay(request)
+                return response
+            finally:
+                limiter.after_request(time.monotonic() - start, response)
+
+        start = time.perf_counter()
+        response = None
+        try:
+            response = self.adapter.send(request, **kwargs)
+            return response
+        finally:
+            self.cassette.record(request, response, time.perf_counter() - start)
+
+    def close(self):
+        self.adapter.close()
+
+
+def mount_cassette(session):
+    """Route a session's traffic through the active cassette, if there is one."""
+    cassette = _active_cassette
+    if cassette is None:
+        return
+    for prefix, adapter in list(session.adapters.items()):
+        if not isinstance(adapter, CassetteAdapter):
+            session.mount(prefix, CassetteAdapter(cassette, adapter))
+
+
+@contextmanager
+def use_cassette(path, mode, latency_scale=0.0, secrets=()):
+    """Record or replay the HTTP traffic of sessions created inside the block."""
+    global _active_cassette
+    cassette = Cassette(path, mode, latency_scale, secrets)
+    _active_cassette = cassette
+    try:
+        yield cassette
+    finally:
+        _active_cassette = None
+        if mode == "record":
+            cassette.save()
+            print(f"\nRecorded {len(cassette.interactions)} requests to {path}")
+        elif cassette.misses:
+            print(f"\n⚠ {cassette.misses} requests were not in {path}")
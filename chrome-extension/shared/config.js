@@ -3,7 +3,10 @@ export const CONFIG = {
     base_url: 'https://pm.reddotdigitalltd.com',
     access_token: '',
     accountable_user_id: '',
-    assignee_user_id: ''
+    assignee_user_id: '',
+    // Local sync service; used when it is running, otherwise the API is called directly
+    service_url: 'http://127.0.0.1:8770',
+    service_token: ''
 };
 
 export const PROJECT_MAPPINGS = {
@@ -0,0 +1,68 @@
+// Client for the local sync service ('python log.py serve'), which keeps
+// reference data, project indexes and connections warm between submissions
+export const DEFAULT_SERVICE_URL = 'http://127.0.0.1:8770';
+
+// How long to wait for /status before using the OpenProject API directly
+const STATUS_TIMEOUT_MS = 1500;
+
+export class SyncServiceClient {
+    constructor(serviceUrl = DEFAULT_SERVICE_URL, token = '') {
+        this.serviceUrl = (serviceUrl || DEFAULT_SERVICE_URL).replace(/\/$/, '');
+        this.token = token || '';
+    }
+
+    async _request(endpoint, options = {}) {
+        const headers = { 'Content-Type': 'application/json' };
+        if (this.token) {
+            headers['X-Service-Token'] = this.token;
+        }
+
+        const response = await fetch(`${this.serviceUrl}${endpoint}`, {
+            ...options,
+            headers: { ...headers, ...options.headers }
+        });
+
+        const body = await response.json().catch(() => ({}));
+        if (!response.ok) {
+            throw new Error(`Sync service ${endpoint}: HTTP ${response.status}: ${body.error || response.statusText}`);
+        }
+        return body;
+    }
+
+    // Resolves to true when the service answers; never throws
+    async isAvailable() {
+        const controller = new AbortController();
+        const timer = setTimeout(() => controller.abort(), STATUS_TIMEOUT_MS);
+        try {
+            await this._request('/status', { signal: controller.signal });
+            return true;
+        } catch (e) {
+            console.log(`Sync service not available, using the OpenProject API directly: ${e.message}`);
+            return false;
+        } finally {
+            clearTimeout(timer);
+        }
+    }
+
+    async getReference() {
+        return this._request('/reference');
+    }
+
+    async analyze(workLog) {
+        return this._request('/analyze', {
+            method: 'POST',
+            body: JSON.stringify({ work_log: workLog })
+        });
+    }
+
+    async submit(workLog, { startTimes = {}, workPackages = {} } = {}) {
+        return this._request('/submit', {
+            method: 'POST',
+            body: JSON.stringify({
+                work_log: workLog,
+                start_times: startTimes,
+                work_packages: workPackages
+            })
+        });
+    }
+}
@@ -1,6 +1,7 @@
 import { loadConfig } from './config.js';
 import { OpenProjectTimeLogger } from './apiClient.js';
 import { WorkLogParser } from './parser.js';
+import { SyncServiceClient } from './serviceClient.js';
 
 export class WorkLogService {
     constructor() {
@@ -8,13 +9,18 @@ export class WorkLogService {
         this.logger = new OpenProjectTimeLogger();
         this.parser = new WorkLogParser();
         this.workLogEntries = [];
+        this.workLogDocument = null;
         this.analysisData = null;
         this.statusData = [];
+        this.service = null;
+        this.useService = false;
     }
 
     async initialize() {
         this.config = await loadConfig();
         await this.logger.initialize();
+        this.service = new SyncServiceClient(this.config.CONFIG.service_url, this.config.CONFIG.service_token);
+        this.useService = await this.service.isAvailable();
     }
 
     async initializeLogger() {
@@ -25,6 +31,13 @@ export class WorkLogService {
     }
 
     async fetchStatuses() {
+        if (this.statusData.length === 0 && this.useService) {
+            try {
+                this.statusData = (await this.service.getReference()).statuses;
+            } catch (error) {
+                console.warn('Could not load statuses from the sync service:', error);
+            }
+        }
         if (this.statusData.length === 0) {
             await this.initializeLogger();
             this.statusData = await this.logger.getStatuses();
@@ -38,6 +51,8 @@ export class WorkLogService {
         }
 
         const allDateEntries = await this.parser.parseWorkLogFile(file);
+        // The sync service parses the document itself
+        this.workLogDocument = JSON.parse(await file.text());
 
         if (Object.keys(allDateEntries).length === 0) {
             throw new Error('No valid entries found in the file');
@@ -79,39 +94,85 @@ export class WorkLogService {
             }
         }
 
+        let serviceRows = null;
+        if (this.useService) {
+            try {
+                serviceRows = (await this.service.analyze(this.workLogDocument)).entries;
+            } catch (error) {
+                // Only an unreachable service falls back; its own errors are real
+                if (!(error instanceof TypeError)) throw error;
+                console.warn('Sync service unreachable, analyzing with the OpenProject API:', error);
+                this.useService = false;
+            }
+        }
+
         for (const entry of uniqueEntries) {
-            if (entry.is_scrum && entry.work_package_id) {
-                analysisResult.scrum.push(entry);
-            } else if (entry.work_package_id) {
-                analysisResult.existing.push(entry);
+            const row = serviceRows?.find(row => row.date === entry.entry_date && row.project === entry.project && row.subject === entry.subject);
+            if (row) {
+                this.classifyServiceAnalysis(entry, row, analysisResult);
             } else {
-                const projectMapping = this.config.PROJECT_MAPPINGS || {};
-                const projectId = projectMapping[entry.project];
-
-                if (projectId) {
-                    try {
-                        const existingWp = await this.logger.checkExistingWorkPackageBySubject(projectId, entry.subject);
-                        if (existingWp) {
-                            entry.existing_work_package_id = existingWp.id;
-                            analysisResult.duplicates.push({
-                                ...entry,
-                                existing_work_package_id: existingWp.id,
-                                existing_subject: existingWp.subject
-                            });
-                        } else {
-                            analysisResult.new.push(entry);
-                        }
-                    } catch (error) {
+                await this.analyzeEntry(entry, analysisResult);
+            }
+        }
+
+        this.analysisData = analysisResult;
+        return analysisResult;
+    }
+
+    async analyzeEntry(entry, analysisResult) {
+        if (entry.is_scrum && entry.work_package_id) {
+            analysisResult.scrum.push(entry);
+        } else if (entry.work_package_id) {
+            analysisResult.existing.push(entry);
+        } else {
+            const projectMapping = this.config.PROJECT_MAPPINGS || {};
+            const projectId = projectMapping[entry.project];
+
+            if (projectId) {
+                try {
+                    const existingWp = await this.logger.checkExistingWorkPackageBySubject(projectId, entry.subject);
+                    if (existingWp) {
+                        entry.existing_work_package_id = existingWp.id;
+                        analysisResult.duplicates.push({
+                            ...entry,
+                            existing_work_package_id: existingWp.id,
+                            existing_subject: existingWp.subject
+                        });
+                    } else {
                         analysisResult.new.push(entry);
                     }
-                } else {
-                    throw new Error(`Project mapping not found for ${entry.project}`);
+                } catch (error) {
+                    analysisResult.new.push(entry);
                 }
+            } else {
+                throw new Error(`Project mapping not found for ${entry.project}`);
             }
         }
+    }
 
-        this.analysisData = analysisResult;
-        return analysisResult;
+    // Sorts an entry by the plan the sync service's /analyze returned for it
+    classifyServiceAnalysis(entry, row, analysisResult) {
+        switch (row.plan) {
+            case 'scrum':
+                analysisResult.scrum.push(entry);
+                break;
+            case 'existing':
+                analysisResult.existing.push(entry);
+                break;
+            case 'reuse':
+                entry.existing_work_package_id = row.work_package_id;
+                analysisResult.duplicates.push({
+                    ...entry,
+                    existing_work_package_id: row.work_package_id,
+                    existing_subject: row.subject
+                });
+                break;
+            case 'new':
+                analysisResult.new.push(entry);
+                break;
+            default:
+                throw new Error(`Project mapping not found for ${entry.project}`);
+        }
     }
 
     calculateTotalTime() {
@@ -475,11 +536,88 @@ export class WorkLogService {
         }
     }
 
+    // Sends the whole work log to the sync service in one /submit call
+    async processAllEntriesWithService(commentData = {}, progressCallback = null) {
+        const startTimes = {};
+        for (const entry of this.workLogEntries) {
+            if (!entry.is_scrum && entry.calculated_start_time && !(entry.entry_date in startTimes)) {
+                startTimes[entry.entry_date] = entry.calculated_start_time;
+            }
+        }
+
+        const workPackages = {};
+        for (const entry of this.analysisData?.duplicates || []) {
+            workPackages[entry.subject] = { work_package_id: entry.existing_work_package_id };
+        }
+        (this.analysisData?.new || []).forEach((entry, index) => {
+            workPackages[entry.subject] = {
+                comment: commentData[`comment_${index}`] || '',
+                status_id: parseInt(commentData[`status_${index}`]) || null
+            };
+        });
+
+        const totalEntries = this.workLogEntries.length;
+        if (progressCallback) {
+            progressCallback({ current: 0, total: totalEntries, message: `Submitting ${totalEntries} entries to the sync service` });
+        }
+
+        let response;
+        try {
+            response = await this.service.submit(this.workLogDocument, { startTimes, workPackages });
+        } catch (error) {
+            // The request may have reached the service, so nothing is sent again directly
+            throw new Error(`Sync service submission failed; check OpenProject before retrying: ${error.message}`);
+        }
+
+        const newSubjects = new Set((this.analysisData?.new || []).map(entry => `${entry.project}|${entry.subject}`));
+        const results = [];
+        let createdCount = 0;
+        let updatedCount = 0;
+        let errorCount = 0;
+
+        response.entries.forEach((row, index) => {
+            const isNew = row.outcome === 'created' && newSubjects.has(`${row.project}|${row.subject}`);
+            const message = `${row.outcome}: ${row.project} - ${row.subject} (${row.hours}h${row.work_package_id ? `, WP ${row.work_package_id}` : ''})`;
+            if (row.outcome === 'failed') {
+                results.push({ success: false, entry: row, error: message });
+                errorCount++;
+            } else {
+                results.push({ success: true, entry: row, result: { type: isNew ? 'new' : row.outcome, message, workPackageId: row.work_package_id } });
+                if (isNew) {
+                    createdCount++;
+                } else {
+                    updatedCount++;
+                }
+            }
+            if (progressCallback) {
+                progressCallback({ current: index + 1, total: response.entries.length, entry: row, message });
+            }
+        });
+
+        for (const error of response.errors || []) {
+            results.push({ success: false, entry: null, error });
+            errorCount++;
+        }
+
+        return {
+            results,
+            createdCount,
+            updatedCount,
+            successCount: createdCount + updatedCount,
+            errorCount,
+            totalEntries
+        };
+    }
+
     async processAllEntries(commentData = {}, progressCallback = null) {
         if (!this.logger) {
             await this.initialize();
         }
 
+        if (this.useService) {
+            return this.processAllEntriesWithService(commentData, progressCallback);
+        }
+
         const results = [];
         let createdCount = 0;
         let updatedCount = 0;
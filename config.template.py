@@ -20,6 +20,72 @@ CONFIG = {
 
     # User ID for "Assignee" field on new work packages
     "assignee_user_id": 83,
+
+    # Work package type used for new work packages (discovered from /api/v3/types)
+    "work_package_type": "Task",
+
+    # Directory for local caches and how long discovered reference data
+    # (activities, statuses, types, projects) stays valid
+    "cache_dir": ".openproject_cache",
+    "reference_data_ttl_hours": 24,
+
+    # Project mappings discovered by 'python test_api.py'; entries in
+    # PROJECT_MAPPINGS below take precedence over the file
+    "project_mappings_file": "project_mappings.json",
+
+    # Rules deciding status and comment of new work packages by subject,
+    # project and activity (see README); prompts cover unmatched entries
+    "work_package_rules_file": "work_package_rules.json",
+
+    # Background threads that look up work packages and time entries while
+    # prompts are open
+    "prefetch_workers": 4,
+
+    # Client-side rate limit per OpenProject host: steady requests per second
+    # (0 disables it), burst allowance, and the most requests kept in flight.
+    # In-flight requests shrink automatically on 429/5xx or slow responses.
+    "requests_per_second": 10,
+    "request_burst": 20,
+    "max_concurrent_requests": 16,
+
+    # Page size asked for when a collection is first read; the server's own
+    # maximum is learned from its answer
+    "max_page_size": 1000,
+
+    # Seconds to wait for OpenProject when creating entries, and whether
+    # entries that cannot be sent are kept for 'python log.py flush'
+    "request_timeout": 30,
+    "spool_failed_requests": True,
+
+    # Check payloads against cached form schemas before sending them
+    "validate_payloads": True,
+
+    # Local sync service ('python log.py serve'); set service_token to
+    # require an X-Service-Token header from its clients
+    "service_host": "127.0.0.1",
+    "service_port": 8770,
+    "service_token": None,
+    # Secret of the OpenProject webhook that keeps the service's caches up to
+    # date (POST /webhook); None disables the endpoint
+    "webhook_secret": None,
+
+    # JSONL file receiving a span per processing stage ('--trace PATH' also
+    # turns it on for one run); None disables tracing
+    "trace_file": None,
+
+    # Shared queue of 'python log.py backfill'; units are claimed for this
+    # user (default: your login name) and re-claimed when a lease expires
+    "backfill_queue": "backfill_queue.sqlite3",
+    "backfill_user": None,
+    "backfill_lease_seconds": 300,
+
+    # SQLite database written by 'python log.py archive' and read by 'report'
+    "history_file": "work_log_history.sqlite3",
+
+    # Near-duplicate subject detection for new work packages: minimum trigram
+    # similarity (0-1) and whether to reuse a match ("ask", "always", "never")
+    "similar_subject_threshold": 0.8,
+    "reuse_similar_work_packages": "ask",
 }
 
 # Project name to ID mappings - use exact project names as they appear in JSON
@@ -38,7 +104,8 @@ PROJECT_MAPPINGS = {
 }
 
 # Activity name to OpenProject activity ID mappings
-# Update these IDs based on your OpenProject instance
+# Used for offline validation and as a fallback when the activities endpoint
+# cannot be discovered; IDs found on the server take precedence
 ACTIVITY_MAPPINGS = {
     "Development": 3,
     "Support": 5,
@@ -50,6 +117,21 @@ ACTIVITY_MAPPINGS = {
     "Management": 16,
 }
 
+# Keyword to activity rules for entries without an "activity" field. Keywords
+# match anywhere in the subject (case-insensitive); earlier keywords win.
+# Remove this to use the built-in rules from log.py.
+ACTIVITY_KEYWORDS = {
+    "scrum": "Meeting",
+    "meeting": "Meeting",
+    "session": "Meeting",
+    "clarification": "Meeting",
+    "fixed": "Development",
+    "fix": "Development",
+    "staging": "Support",
+    "server": "Support",
+    "feedback": "Specification",
+}
+
 # Default timezone for time calculations
 DEFAULT_TIMEZONE = "Asia/Dhaka"
 
@@ -63,8 +145,9 @@ DEFAULT_TIMEZONE = "Asia/Dhaka"
 #
 # 2. Find Project IDs and Names:
 #    - Run: python test_api.py
-#    - Copy the suggested PROJECT_MAPPINGS from the output
-#    - Update PROJECT_MAPPINGS above with the exact project names
+#    - All projects are saved to project_mappings.json, which log.py loads
+#    - Optionally copy suggested entries into PROJECT_MAPPINGS above to rename
+#      or override them
 #    - Project names in JSON files must exactly match the keys in PROJECT_MAPPINGS
 #
 # 3. Find User IDs:
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Form Schema Validation
+
+Work package and time entry payloads are checked against the schemas of
+OpenProject's form endpoints before they are sent, so entries the server
+would reject with a 422 fail locally without a request. A schema is fetched
+once per work package project and type and once per time entry project, reduced
+to the rules that are checked (required fields without a default, read-only
+fields, string lengths, date and duration formats, allowed link values) and
+kept in the disk cache for reference_data_ttl_hours.
+
+A schema that cannot be fetched is not checked against; the server still
+validates every write.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import date
+
+from config import CONFIG
+from reference_data import get_cache_dir
+
+CACHE_FILE_NAME = "form_schemas.json"
+DURATION_PATTERN = re.compile(
+    r"^P(?=\d|T\d)(?:\d+(?:\.\d+)?[YMWD])*(?:T(?=\d)(?:\d+(?:\.\d+)?[HMS])+)?$"
+)
+
+
+def _allowed_hrefs(field):
+    """Return the hrefs a link field accepts, or None when they are not listed."""
+    allowed = field.get("_links", {}).get("allowedValues")
+    if isinstance(allowed, list):
+        return sorted({value.get("href") for value in allowed if value.get("href")})
+    embedded = field.get("_embedded", {}).get("allowedValues")
+    if isinstance(embedded, list):
+        return sorted(
+            {
+                value.get("_links", {}).get("self", {}).get("href")
+                for value in embedded
+                if value.get("_links", {}).get("self", {}).get("href")
+            }
+        )
+    # A single link points at a collection too large to inline, e.g. all users
+    return None
+
+
+def _time_entry_key(work_package_id, project_id):
+    if project_id:
+        return f"time_entries:{project_id}"
+    return f"time_entries:work_package:{work_package_id}"
+
+
+class FormSchema:
+    """Validation rules of one form schema."""
+
+    def __init__(self, rules, fetched_at=None):
+        self.rules = rules
+        self.fetched_at = fetched_at or time.time()
+
+    @classmethod
+    def from_schema(cls, schema):
+        """Reduce a schema document to the rules that are checked locally."""
+        rules = {}
+        for name, field in schema.items():
+            if name.startswith("_") or not isinstance(field, dict):
+                continue
+            if "type" not in field:
+                continue
+            rules[name] = {
+                "name": field.get("name", name),
+                "type": field["type"],
+                "required": bool(field.get("required"))
+                and not field.get("hasDefault", False),
+                "writable": field.get("writable", True),
+                "min_length": field.get("minLength"),
+                "max_length": field.get("maxLength"),
+                "allowed": _allowed_hrefs(field),
+            }
+        return cls(rules)
+
+    def validate(self, payload):
+        """Return the problems the server would report for a payload."""
+        links = payload.get("_links", {})
+        errors = []
+        for name, rule in self.rules.items():
+            if name in payload:
+                value = payload[name]
+            elif name in links:
+                value = links[name].get("href")
+            else:
+                value = None
+
+            if value is None or value == "":
+                if rule["required"] and rule["writable"]:
+                    errors.append(f"{rule['name']} can't be blank.")
+                continue
+            if not rule["writable"]:
+                errors.append(
+                    f"{rule['name']} was attempted to be written but is not writable."
+                )
+                continue
+
+            if isinstance(value, dict):
+                # Formattable text such as descriptions
+                value = value.get("raw", "")
+            if name in links:
+                if rule["allowed"] is not None and value not in rule["allowed"]:
+                    errors.append(
+                        f"{rule['name']} is not set to one of the allowed values."
+                    )
+                continue
+
+            if rule["type"] == "Date":
+                try:
+                    date.fromisoformat(value)
+                except (TypeError, ValueError):
+                    errors.append(f"{rule['name']} is not a valid date.")
+            elif rule["type"] == "Duration":
+                if not DURATION_PATTERN.match(str(value)):
+                    errors.append(f"{rule['name']} is not a valid duration.")
+            elif isinstance(value, str):
+                if rule["min_length"] and len(value) < rule["min_length"]:
+                    errors.append(
+                        f"{rule['name']} is too short (minimum is {rule['min_length']} characters)."
+                    )
+                if rule["max_length"] and len(value) > rule["max_length"]:
+                    errors.append(
+                        f"{rule['name']} is too long (maximum is {rule['max_length']} characters)."
+                    )
+        return errors
+
+
+class FormSchemaCache:
+    """Form schemas by form, fetched on first use and cached on disk."""
+
+    def __init__(self, session, base_url, ttl_hours=None):
+        self.session = session
+        self.base_url = base_url
+        if ttl_hours is None:
+            ttl_hours = CONFIG.get("reference_data_ttl_hours", 24)
+        self.ttl_hours = ttl_hours
+        self.cache_path = os.path.join(get_cache_dir(), CACHE_FILE_NAME)
+        self.schemas = None  # Form key -> FormSchema, or None if unavailable
+        self.lock = threading.Lock()
+
+    def work_package(self, project_id, type_href=None):
+        """Return the new work package schema of a project and type."""
+        body = {"_links": {"type": {"href": type_href}}} if type_href else {}
+        return self.get(
+            f"work_packages:{project_id}:{type_href or ''}",
+            f"/api/v3/projects/{project_id}/work_packages/form",
+            body,
+        )
+
+    def time_entry(self, work_package_id, project_id=None):
+        """Return the new time entry schema of a work package's project.
+
+        Activities and custom fields differ between projects, so the form is
+        asked about the work package. Without a known project the schema is
+        kept for that work package alone.
+        """
+        body = {
+            "_links": {
+                "workPackage": {"href": f"/api/v3/work_packages/{work_package_id}"}
+            }
+        }
+        if project_id:
+            body["_links"]["project"] = {"href": f"/api/v3/projects/{project_id}"}
+        return self.get(
+            _time_entry_key(work_package_id, project_id),
+            "/api/v3/time_entries/form",
+            body,
+        )
+
+    def forget_work_package(self, project_id, type_href=None):
+        """Drop a work package schema the server disagreed with."""
+        self.forget(f"work_packages:{project_id}:{type_href or ''}")
+
+    def forget_time_entry(self, work_package_id, project_id=None):
+        """Drop a time entry schema after the server disagreed with it."""
+        self.forget(_time_entry_key(work_package_id, project_id))
+
+    def get(self, key, endpoint, body):
+        """Return a cached schema, fetching it on first use."""
+        with self.lock:
+            if self.schemas is None:
+                self.schemas = self._read_cache()
+            if key not in self.schemas:
+                self.schemas[key] = self._fetch(endpoint, body)
+                if self.schemas[key] is not None:
+                    self._write_cache()
+            return self.schemas[key]
+
+    def forget(self, key):
+        """Drop a schema so it is fetched again on next use."""
+        with self.lock:
+            if self.schemas is not None and self.schemas.pop(key, None) is not None:
+                self._write_cache()
+
+    def _fetch(self, endpoint, body):
+        from requests.exceptions import RequestException
+
+        try:
+            response = self.session.post(
+                f"{self.base_url}{endpoint}",
+                json=body,
+                timeout=CONFIG.get("request_timeout", 30),
+            )
+            response.raise_for_status()
+            schema = response.json().get("_embedded", {}).get("schema")
+        except (RequestException, ValueError):
+            # Validation is skipped for this form until the next run
+            return None
+        return FormSchema.from_schema(schema) if schema else None
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+        if cached.get("base_url") != self.base_url:
+            return {}
+        oldest = time.time() - self.ttl_hours * 3600
+        return {
+            key: FormSchema(entry["rules"], entry["fetched_at"])
+            for key, entry in cached.get("schemas", {}).items()
+            if entry.get("fetched_at", 0) >= oldest
+        }
+
+    def _write_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "base_url": self.base_url,
+                        "schemas": {
+                            key: {
+                                "fetched_at": schema.fetched_at,
+                                "rules": schema.rules,
+                            }
+                            for key, schema in self.schemas.items()
+                            if schema is not None
+                        },
+                    },
+                    file,
+                )
+        except OSError as e:
+            print(f"Warning: Could not write form schema cache: {e}")
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Work Log History Archive
+
+Keeps parsed work log entries in a local SQLite database for reporting.
+Entries are stored as compact integer rows: the date as a day number (with an
+index for range scans), a precomputed month bucket, and projects, activities
+and subjects as references to small lookup tables. Rollups are computed with
+a single GROUP BY inside SQLite, so reports over hundreds of thousands of
+entries need no Python-side loops.
+"""
+
+import os
+import sqlite3
+import time
+from datetime import date
+
+REPORT_DIMENSIONS = ("project", "activity", "year", "month", "week", "date")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS activities (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS subjects (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS entries (
+    day INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    project_id INTEGER NOT NULL,
+    activity_id INTEGER NOT NULL,
+    subject_id INTEGER NOT NULL,
+    work_package_id INTEGER,
+    is_scrum INTEGER NOT NULL,
+    hours REAL NOT NULL,
+    source TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS entries_day ON entries (day);
+CREATE TABLE IF NOT EXISTS archives (
+    source TEXT NOT NULL,
+    archived_at REAL NOT NULL,
+    first_day INTEGER NOT NULL,
+    last_day INTEGER NOT NULL,
+    entries INTEGER NOT NULL
+);
+"""
+
+# SQL expression of each report dimension. Projects and activities are grouped
+# by ID and named afterwards, which keeps joins out of the scan. Days are
+# proleptic ordinals, where day 1 (0001-01-01) is a Monday, so (day - 1) / 7
+# numbers Monday-based weeks. Months are stored as year * 12 + month - 1.
+DIMENSION_SQL = {
+    "project": "entries.project_id",
+    "activity": "entries.activity_id",
+    "year": "entries.month / 12",
+    "month": "entries.month",
+    "week": "(entries.day - 1) / 7",
+    "date": "entries.day",
+}
+
+
+def month_bucket(day):
+    """Return the month bucket of a date."""
+    return day.year * 12 + day.month - 1
+
+
+def format_dimension(dimension, value, names):
+    """Return the display label of a grouped dimension value."""
+    if dimension in names:
+        return names[dimension].get(value, str(value))
+    if dimension == "month":
+        return f"{value // 12}-{value % 12 + 1:02d}"
+    if dimension == "week":
+        year, week, _ = date.fromordinal(value * 7 + 1).isocalendar()
+        return f"{year}-W{week:02d}"
+    if dimension == "date":
+        return date.fromordinal(value).isoformat()
+    return str(value)
+
+
+class WorkLogHistory:
+    """SQLite archive of parsed work log entries."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self._add_source_column()
+        self._lookup_ids = {"projects": {}, "activities": {}, "subjects": {}}
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _add_source_column(self):
+        """Add the source column to archives written before it existed."""
+        columns = [
+            row[1] for row in self.connection.execute("PRAGMA table_info(entries)")
+        ]
+        if "source" in columns:
+            return
+        with self.connection:
+            self.connection.execute(
+                "ALTER TABLE entries ADD COLUMN source TEXT NOT NULL DEFAULT ''"
+            )
+            # Each archive replaced every row of its dates, so a row came from
+            # the latest archive covering its day
+            self.connection.execute("""
+                UPDATE entries SET source = COALESCE(
+                    (SELECT source FROM archives
+                     WHERE entries.day BETWEEN first_day AND last_day
+                     ORDER BY archived_at DESC LIMIT 1),
+                    ''
+                )
+                """)
+
+    def _lookup_id(self, table, name):
+        """Return the ID of a name in a lookup table, adding it if needed."""
+        ids = self._lookup_ids[table]
+        lookup_id = ids.get(name)
+        if lookup_id is None:
+            self.connection.execute(
+                f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,)
+            )
+            lookup_id = self.connection.execute(
+                f"SELECT id FROM {table} WHERE name = ?", (name,)
+            ).fetchone()[0]
+            ids[name] = lookup_id
+        return lookup_id
+
+    def archive(self, all_date_entries, source="", sources=None):
+        """Store parsed entries, replacing what the same source archived for their dates.
+
+        sources maps dates to their own source, e.g. the file of each date
+        when several files are archived together; other dates use source.
+        """
+        sources = sources or {}
+        days = []
+        rows = []
+        for day, entries in all_date_entries.items():
+            day_source = sources.get(day, source)
+            days.append((day.toordinal(), day_source))
+            for entry in entries:
+                rows.append(
+                    (
+                        day.toordinal(),
+                        month_bucket(day),
+                        self._lookup_id("projects", entry["project"]),
+                        self._lookup_id("activities", entry["activity"]),
+                        self._lookup_id("subjects", entry["subject"]),
+                        entry.get("work_package_id"),
+                        int(bool(entry.get("is_scrum"))),
+                        entry["hours"],
+                        day_source,
+                    )
+                )
+
+        # A work log is the source of truth for its own dates, so archiving
+        # the same file twice does not count its hours twice, while other
+        # files archived for the same dates are kept
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM entries WHERE day = ? AND source = ?", days
+            )
+            self.connection.executemany(
+                "INSERT INTO entries (day, month, project_id, activity_id, subject_id,"
+                " work_package_id, is_scrum, hours, source)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            if days:
+                ordinals = [day for day, _ in days]
+                self.connection.execute(
+                    "INSERT INTO archives VALUES (?, ?, ?, ?, ?)",
+                    (source, time.time(), min(ordinals), max(ordinals), len(rows)),
+                )
+
+        return len(rows)
+
+    def report(self, group_by, start_date=None, end_date=None, project=None):
+        """Return (labels..., hours, entries) rows grouped by the given dimensions."""
+        for dimension in group_by:
+            if dimension not in DIMENSION_SQL:
+                raise ValueError(
+                    f"Unknown report dimension '{dimension}'. Allowed values: {list(REPORT_DIMENSIONS)}"
+                )
+
+        columns = [DIMENSION_SQL[dimension] for dimension in group_by]
+        conditions = []
+        params = []
+        if start_date is not None:
+            conditions.append("entries.day >= ?")
+            params.append(start_date.toordinal())
+        if end_date is not None:
+            conditions.append("entries.day <= ?")
+            params.append(end_date.toordinal())
+        if project is not None:
+            conditions.append(
+                "entries.project_id = (SELECT id FROM projects WHERE name = ?)"
+            )
+            params.append(project)
+
+        select = ", ".join(columns + ["SUM(entries.hours)", "COUNT(*)"])
+        query = f"SELECT {select} FROM entries"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if columns:
+            positions = ", ".join(str(i + 1) for i in range(len(columns)))
+            query += f" GROUP BY {positions}"
+
+        names = {
+            "project": dict(self.connection.execute("SELECT id, name FROM projects")),
+            "activity": dict(
+                self.connection.execute("SELECT id, name FROM activities")
+            ),
+        }
+        rows = [
+            tuple(
+                format_dimension(dimension, value, names)
+                for dimension, value in zip(group_by, row)
+            )
+            + (round(row[-2] or 0, 2), row[-1])
+            for row in self.connection.execute(query, params)
+        ]
+        # Labels sort correctly: dates, weeks and months are zero-padded
+        rows.sort(key=lambda row: row[:-2])
+        return rows
+
+    def summary(self):
+        """Return (entries, first date, last date) of the archive."""
+        count, first_day, last_day = self.connection.execute(
+            "SELECT COUNT(*), MIN(day), MAX(day) FROM entries"
+        ).fetchone()
+        if not count:
+            return 0, None, None
+        return count, date.fromordinal(first_day), date.fromordinal(last_day)
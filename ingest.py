@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Work Log Ingest
+
+Finds work log files from paths, directories and glob patterns, including
+gzip-compressed '.json.gz' files, decodes them with orjson when installed,
+and parses many of them in a process pool.
+The per-file results are merged into one date-ordered mapping. A date found
+in more than one file is kept once when the entries agree and reported as a
+conflict otherwise.
+"""
+
+import glob
+import gzip
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+WORK_LOG_SUFFIXES = (".json", ".json.gz")
+GLOB_CHARACTERS = "*?["
+
+
+def is_work_log_file(path):
+    """Return True if the path has a supported work log suffix."""
+    return path.lower().endswith(WORK_LOG_SUFFIXES)
+
+
+def open_work_log(path):
+    """Open a work log file for reading text, decompressing '.gz' files."""
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def load_work_log(path):
+    """Read and decode a work log file, using orjson when it is installed."""
+    if orjson is None:
+        with open_work_log(path) as file:
+            return json.load(file)
+
+    if path.lower().endswith(".gz"):
+        with gzip.open(path, "rb") as file:
+            return orjson.loads(file.read())
+    with open(path, "rb") as file:
+        return orjson.loads(file.read())
+
+
+def expand_work_log_paths(patterns):
+    """Expand files, directories and glob patterns into work log file paths."""
+    paths = []
+    seen = set()
+
+    def add(path):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            paths.append(path)
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs.sort()
+                for name in sorted(files):
+                    if is_work_log_file(name):
+                        add(os.path.join(root, name))
+        elif any(character in pattern for character in GLOB_CHARACTERS):
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path) and is_work_log_file(path):
+                    add(path)
+        else:
+            # Plain paths are kept even if missing so the caller can report it
+            add(pattern)
+
+    return paths
+
+
+def parse_file(parser_class, path):
+    """Parse one work log file and return (path, date entries, errors)."""
+    parser = parser_class(path)
+    try:
+        all_date_entries = parser.parse_work_log_file()
+    except ValueError as e:
+        all_date_entries = {}
+        parser.errors.append(str(e))
+    return path, all_date_entries, [f"{path}: {error}" for error in parser.errors]
+
+
+def merge_date_entries(results):
+    """Merge per-file (path, date entries) results into one date-ordered mapping.
+
+    Returns (merged, {date: path it came from}, errors).
+    """
+    merged = {}
+    sources = {}
+    conflicts = {}
+
+    for path, all_date_entries in results:
+        for date, entries in all_date_entries.items():
+            if date in conflicts:
+                conflicts[date].append(path)
+            elif date not in merged:
+                merged[date] = entries
+                sources[date] = path
+            elif merged[date] != entries:
+                conflicts[date] = [sources[date], path]
+            else:
+                print(
+                    f"Note: {date.isoformat()} appears in both {sources[date]} "
+                    f"and {path} with the same entries; using it once"
+                )
+
+    # Conflicting dates are left out entirely rather than guessing a winner
+    errors = []
+    for date, paths in sorted(conflicts.items()):
+        merged.pop(date, None)
+        sources.pop(date, None)
+        errors.append(
+            f"{date.isoformat()} has different entries in {', '.join(paths)}; skipped"
+        )
+
+    return dict(sorted(merged.items())), sources, errors
+
+
+def parse_work_log_files(parser_class, paths, max_workers=None):
+    """Parse work log files, in a process pool when there are several.
+
+    Returns (date entries, errors, {date: path it came from}).
+    """
+    workers = min(len(paths), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        results = [parse_file(parser_class, path) for path in paths]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(parse_file, [parser_class] * len(paths), paths))
+
+    errors = [error for _, _, file_errors in results for error in file_errors]
+    merged, sources, conflict_errors = merge_date_entries(
+        (path, all_date_entries) for path, all_date_entries, _ in results
+    )
+    return merged, errors + conflict_errors, sources
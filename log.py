@@ -6,17 +6,97 @@ This script allows logging spent time to OpenProject tasks via the API.
 It can either log individual time entries or parse daily work logs for batch processing.
 """
 
-import requests
+import argparse
 import re
 import os
+import sys
 import json
-from datetime import datetime, timedelta
-from requests.auth import HTTPBasicAuth
+from datetime import date, datetime, timedelta
+from contextlib import nullcontext
+from functools import lru_cache
 from config import (
     CONFIG,
-    PROJECT_MAPPINGS,
     ACTIVITY_MAPPINGS,
 )
+from reference_data import (
+    ReferenceData,
+    DEFAULT_STATUS_NAME,
+    DEFAULT_TYPE_NAME,
+    get_cache_dir,
+    load_project_mappings,
+)
+from profiling import profile_phase
+from subject_index import SubjectIndex, DEFAULT_SIMILARITY_THRESHOLD
+from tracing import (
+    current_span,
+    get_tracer,
+    record_response,
+    set_trace_file,
+    traced,
+)
+
+try:
+    from config import ACTIVITY_KEYWORDS
+except ImportError:
+    ACTIVITY_KEYWORDS = None
+
+# config.py mappings merged over the file written by 'python test_api.py'
+PROJECT_MAPPINGS = load_project_mappings()
+
+# Keyword -> activity rules used when an entry has no activity; earlier
+# keywords win. Override with ACTIVITY_KEYWORDS in config.py.
+DEFAULT_ACTIVITY_KEYWORDS = {
+    "scrum": "Meeting",
+    "meeting": "Meeting",
+    "session": "Meeting",
+    "clarification": "Meeting",
+    "setup": "Development",
+    "enhanced": "Development",
+    "fixed": "Development",
+    "fix": "Development",
+    "route": "Development",
+    "linkup": "Development",
+    "template": "Development",
+    "codes": "Development",
+    "staging": "Support",
+    "server": "Support",
+    "feedback": "Specification",
+    "recruitment": "Specification",
+    "profile": "Development",
+    "view": "Development",
+}
+DEFAULT_ACTIVITY = "Development"
+
+# Exact number types taken by the single-pass entry decoder; booleans and
+# numeric strings are left to validate_entry_data
+NUMBER_TYPES = (int, float)
+
+# requests is imported on first use by OpenProjectTimeLogger, so commands that
+# never touch the network (e.g. 'validate') start without loading it.
+requests = None
+
+
+def load_requests():
+    """Import the requests module on first use and return it."""
+    global requests
+    if requests is None:
+        import requests as requests_module
+
+        requests = requests_module
+    return requests
+
+
+# Work logs repeat a handful of durations, so their timedeltas are cached
+@lru_cache(maxsize=256)
+def hours_timedelta(hours):
+    """Return a cached timedelta of the given hours."""
+    return timedelta(hours=hours)
+
+
+@lru_cache(maxsize=256)
+def minutes_timedelta(minutes):
+    """Return a cached timedelta of the given minutes."""
+    return timedelta(minutes=minutes)
 
 
 def validate_entry_data(entry_data, entry_index=None):
@@ -25,7 +105,8 @@ def validate_entry_data(entry_data, entry_index=None):
     prefix = f"Entry {entry_index}: " if entry_index is not None else "Entry: "
 
     # Required fields validation
-    required_fields = ["project", "subject", "duration_hours", "activity", "is_scrum"]
+    # 'activity' may be omitted; it is then determined from the subject
+    required_fields = ["project", "subject", "duration_hours", "is_scrum"]
     for field in required_fields:
         if field not in entry_data:
             errors.append(f"{prefix}Missing required field '{field}'")
@@ -97,33 +178,122 @@ def validate_entry_data(entry_data, entry_index=None):
     return errors
 
 
+class ActivityClassifier:
+    """Classifies task descriptions into activities using prioritized keywords."""
+
+    def __init__(self, keywords=None, default_activity=DEFAULT_ACTIVITY):
+        self.keywords = {
+            keyword.lower(): activity
+            for keyword, activity in (keywords or DEFAULT_ACTIVITY_KEYWORDS).items()
+        }
+        self.default_activity = default_activity
+        self.activities = list(self.keywords.values())
+        self.cache = {}
+
+        # Keyword order is the priority. One trie-shaped regex finds the
+        # longest keyword at each match position in a single scan whose cost
+        # does not grow with the number of keywords.
+        priorities = {keyword: index for index, keyword in enumerate(self.keywords)}
+        self.pattern = (
+            re.compile(self._trie_pattern(self.keywords)) if self.keywords else None
+        )
+
+        # Shorter keywords at the same position are prefixes of the match, so
+        # each keyword's priority includes its keyword prefixes.
+        self.priorities = {
+            keyword: min(
+                priorities[keyword[:length]]
+                for length in range(1, len(keyword) + 1)
+                if keyword[:length] in priorities
+            )
+            for keyword in self.keywords
+        }
+
+        # Matches do not overlap, so higher priority keywords that can start
+        # inside a match are checked directly when that keyword is found.
+        keywords_by_prefix = {}
+        for keyword in self.keywords:
+            for length in range(1, len(keyword)):
+                keywords_by_prefix.setdefault(keyword[:length], []).append(keyword)
+        self.hidden_keywords = {}
+        for keyword, priority in self.priorities.items():
+            hidden = {
+                keyword[start:end]
+                for start in range(1, len(keyword))
+                for end in range(start + 1, len(keyword) + 1)
+                if keyword[start:end] in priorities
+            }
+            for start in range(1, len(keyword)):
+                hidden.update(keywords_by_prefix.get(keyword[start:], ()))
+            self.hidden_keywords[keyword] = sorted(
+                (other for other in hidden if self.priorities[other] < priority),
+                key=self.priorities.get,
+            )
+
+    @staticmethod
+    def _trie_pattern(keywords):
+        """Build a regex alternation shaped like a prefix trie of the keywords."""
+        trie = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = True
+
+        def build(node):
+            branches = [
+                re.escape(char) + build(child)
+                for char, child in sorted(node.items())
+                if char
+            ]
+            if not branches:
+                return ""
+            body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+            return f"(?:{body})?" if "" in node else body
+
+        return build(trie)
+
+    def classify(self, task_description):
+        """Return the activity for a task description, memoized by description."""
+        activity = self.cache.get(task_description)
+        if activity is not None:
+            return activity
+
+        activity = self.default_activity
+        if self.pattern is not None:
+            text = task_description.lower()
+            found = set(self.pattern.findall(text))
+            if found:
+                best = min(self.priorities[keyword] for keyword in found)
+                for keyword in found:
+                    for hidden in self.hidden_keywords[keyword]:
+                        if self.priorities[hidden] >= best:
+                            break
+                        if hidden in text:
+                            best = self.priorities[hidden]
+                            break
+                activity = self.activities[best]
+
+        self.cache[task_description] = activity
+        return activity
+
+    def classify_many(self, task_descriptions):
+        """Return the activities for many task descriptions, classifying each once."""
+        return [self.classify(description) for description in task_descriptions]
+
+
 class WorkLogParser:
     """Parses daily work log files and extracts time entry information."""
 
     def __init__(self, file_path=None):
         self.file_path = file_path
+        self.file_paths = [file_path] if file_path else []
+        self.date_sources = {}  # Date -> file it came from, for several files
         self.project_mappings = PROJECT_MAPPINGS
+        self.errors = []  # Problems found during the last parse
 
-        self.activity_keywords = {
-            "scrum": "Meeting",
-            "meeting": "Meeting",
-            "session": "Meeting",
-            "clarification": "Meeting",
-            "setup": "Development",
-            "enhanced": "Development",
-            "fixed": "Development",
-            "fix": "Development",
-            "route": "Development",
-            "linkup": "Development",
-            "template": "Development",
-            "codes": "Development",
-            "staging": "Support",
-            "server": "Support",
-            "feedback": "Specification",
-            "recruitment": "Specification",
-            "profile": "Development",
-            "view": "Development",
-        }
+        self.activity_keywords = dict(ACTIVITY_KEYWORDS or DEFAULT_ACTIVITY_KEYWORDS)
+        self.activity_classifier = ActivityClassifier(self.activity_keywords)
 
     def parse_work_log_file(self, file_path=None):
         """Parse a JSON work log file and return a dictionary of date entries."""
@@ -137,30 +307,44 @@ class WorkLogParser:
             print(f"Work log file not found: {file_path}")
             return {}
 
-        if not file_path.lower().endswith(".json"):
+        if not file_path.lower().endswith((".json", ".json.gz")):
             raise ValueError(
-                "Only JSON format work log files are supported. Please provide a .json file."
+                "Only JSON format work log files are supported. Please provide a .json or .json.gz file."
             )
 
         return self.parse_json_work_log_file(file_path)
 
     def parse_json_work_log_file(self, file_path):
         """Parse a JSON work log file and return a dictionary of date entries."""
+        from ingest import load_work_log
+
         try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
+            data = load_work_log(file_path)
 
             return self.parse_json_work_log_content(data)
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON file: {e}")
+            self.errors.append(f"Invalid JSON: {e}")
             return {}
         except Exception as e:
             print(f"Error reading JSON file: {e}")
+            self.errors.append(str(e))
             return {}
 
+    def parse_work_log_files(self, file_paths, max_workers=None):
+        """Parse several work log files in parallel into one date-ordered dictionary."""
+        from ingest import parse_work_log_files
+
+        self.file_paths = list(file_paths)
+        all_date_entries, self.errors, self.date_sources = parse_work_log_files(
+            type(self), self.file_paths, max_workers
+        )
+        return all_date_entries
+
     def parse_json_work_log_content(self, data):
         """Parse JSON work log content with multiple date entries and extract time entries."""
         all_time_entries = {}  # Dictionary with date as key
+        self.errors = []
 
         if "logs" not in data:
             raise ValueError("Invalid JSON format: Missing 'logs' array")
@@ -174,9 +358,9 @@ class WorkLogParser:
 
         for log_index, log_entry in enumerate(logs):
             if "date" not in log_entry:
-                print(
-                    f"Warning: Log entry {log_index + 1} missing 'date' field, skipping"
-                )
+                message = f"Log entry {log_index + 1} missing 'date' field, skipping"
+                print(f"Warning: {message}")
+                self.errors.append(message)
                 continue
 
             date_str = log_entry["date"]
@@ -185,24 +369,27 @@ class WorkLogParser:
             try:
                 parsed_date = self.parse_date_string(date_str)
             except ValueError as e:
-                print(
-                    f"Warning: Log entry {log_index + 1} has invalid date format '{date_str}': {e}"
-                )
+                message = f"Log entry {log_index + 1} has invalid date format '{date_str}': {e}"
+                print(f"Warning: {message}")
+                self.errors.append(message)
                 continue
 
             entries = log_entry.get("entries", [])
             if not isinstance(entries, list):
-                print(
-                    f"Warning: Log entry {log_index + 1} 'entries' must be an array, skipping"
+                message = (
+                    f"Log entry {log_index + 1} 'entries' must be an array, skipping"
                 )
+                print(f"Warning: {message}")
+                self.errors.append(message)
                 continue
 
             time_entries = []
-            current_time = datetime.strptime("09:00", "%H:%M")
+            current_time = datetime(1900, 1, 1, 9, 0)  # Days start at 09:00
 
             for entry_index, entry_data in enumerate(entries):
-                # Validate entry data
-                validation_errors = validate_entry_data(entry_data, entry_index + 1)
+                entry, validation_errors = self.decode_task_entry(
+                    entry_data, entry_index + 1, current_time, parsed_date
+                )
                 if validation_errors:
                     print(
                         f"Validation errors for log date {date_str}, entry {entry_index + 1}:"
@@ -210,11 +397,11 @@ class WorkLogParser:
                     for error in validation_errors:
                         print(f"  - {error}")
                     print("Skipping this entry due to validation errors.")
+                    self.errors.extend(
+                        f"{date_str}: {error}" for error in validation_errors
+                    )
                     continue
 
-                entry = self.parse_json_task_entry(
-                    entry_data, current_time, parsed_date
-                )
                 if entry:
                     time_entries.append(entry)
                     current_time = entry["end_time"]
@@ -222,6 +409,8 @@ class WorkLogParser:
             if time_entries:
                 all_time_entries[parsed_date] = time_entries
 
+        self.determine_activities(all_time_entries)
+
         return all_time_entries
 
     def parse_date_string(self, date_str):
@@ -276,11 +465,69 @@ class WorkLogParser:
         except ValueError as e:
             raise ValueError(f"Invalid date values: {e}")
 
+    def decode_task_entry(self, entry_data, entry_index, start_time, entry_date):
+        """Validate, coerce and parse a JSON task entry in one pass, returning (entry, errors)."""
+        # Well-formed entries are checked and converted field by field here;
+        # anything unusual goes through validate_entry_data and
+        # parse_json_task_entry so it gets the same messages and handling.
+        if type(entry_data) is dict:
+            get = entry_data.get
+            project = get("project")
+            subject = get("subject")
+            duration_hours = get("duration_hours")
+            is_scrum = get("is_scrum")
+            activity = get("activity")
+            break_hours = get("break_hours")
+            work_package_id = get("work_package_id")
+
+            if (
+                type(project) is str
+                and project in PROJECT_MAPPINGS
+                and type(subject) is str
+                and subject.strip()
+                and type(duration_hours) in NUMBER_TYPES
+                and duration_hours > 0
+                and type(is_scrum) is bool
+                and (
+                    not activity
+                    or (type(activity) is str and activity in ACTIVITY_MAPPINGS)
+                )
+                and (
+                    break_hours is None
+                    or (type(break_hours) in NUMBER_TYPES and break_hours >= 0)
+                )
+                and (
+                    work_package_id is None
+                    or (type(work_package_id) is int and work_package_id > 0)
+                )
+            ):
+                if is_scrum and not work_package_id:
+                    return None, []
+                return (
+                    self._build_task_entry(
+                        project,
+                        subject,
+                        activity,
+                        float(duration_hours),
+                        is_scrum,
+                        work_package_id,
+                        break_hours or 0,
+                        start_time,
+                        entry_date,
+                    ),
+                    [],
+                )
+
+        validation_errors = validate_entry_data(entry_data, entry_index)
+        if validation_errors:
+            return None, validation_errors
+        return self.parse_json_task_entry(entry_data, start_time, entry_date), []
+
     def parse_json_task_entry(self, entry_data, start_time, entry_date):
         """Parse individual JSON task entry and extract time entry information."""
         project = entry_data.get("project")
         subject = entry_data.get("subject") or entry_data.get("description")
-        activity = entry_data.get("activity", "Development")
+        activity = entry_data.get("activity")
 
         if not project or not subject:
             return None
@@ -297,37 +544,61 @@ class WorkLogParser:
         is_scrum = entry_data.get("is_scrum", False)
         work_package_id = entry_data.get("work_package_id")
         break_hours = entry_data.get("break_hours") or 0
-        break_minutes = int(break_hours * 60) if break_hours else 0
 
         if is_scrum:
             if not work_package_id:
                 return None
-            actual_start_time = datetime.strptime("10:00", "%H:%M").replace(
-                year=entry_date.year, month=entry_date.month, day=entry_date.day
-            )
-            end_time = actual_start_time + timedelta(hours=duration_hours)
             work_package_id = (
                 int(work_package_id)
                 if isinstance(work_package_id, str)
                 else work_package_id
             )
-            create_new_task = False
+        elif work_package_id:
+            work_package_id = int(work_package_id)
+        else:
+            work_package_id = None
+
+        return self._build_task_entry(
+            project,
+            subject,
+            activity,
+            duration_hours,
+            is_scrum,
+            work_package_id,
+            break_hours,
+            start_time,
+            entry_date,
+        )
+
+    def _build_task_entry(
+        self,
+        project,
+        subject,
+        activity,
+        duration_hours,
+        is_scrum,
+        work_package_id,
+        break_hours,
+        start_time,
+        entry_date,
+    ):
+        """Build a parsed entry from already validated and converted field values."""
+        if is_scrum:
+            # SCRUM entries always start at 10:00 without a break
+            actual_start_time = datetime(
+                entry_date.year, entry_date.month, entry_date.day, 10, 0
+            )
             break_minutes = 0
             break_hours = 0
         else:
-            actual_start_time = start_time + timedelta(minutes=break_minutes)
+            break_minutes = int(break_hours * 60) if break_hours else 0
+            actual_start_time = start_time + minutes_timedelta(break_minutes)
             # Use entry_date for the date part
-            actual_start_time = actual_start_time.replace(
-                year=entry_date.year, month=entry_date.month, day=entry_date.day
-            )
-            end_time = actual_start_time + timedelta(hours=duration_hours)
-
-            if work_package_id:
-                work_package_id = int(work_package_id)
-                create_new_task = False
-            else:
-                work_package_id = None
-                create_new_task = True
+            if actual_start_time.date() != entry_date:
+                actual_start_time = actual_start_time.replace(
+                    year=entry_date.year, month=entry_date.month, day=entry_date.day
+                )
+        end_time = actual_start_time + hours_timedelta(duration_hours)
 
         return {
             "project": project,
@@ -340,21 +611,49 @@ class WorkLogParser:
             "hours": duration_hours,
             "break_minutes": break_minutes,
             "break_hours": break_hours,
-            "create_new_task": create_new_task,
+            "create_new_task": not work_package_id,
             "is_scrum": is_scrum,
             "needs_user_choice": not is_scrum and not work_package_id,
+            "activity_determined": not activity,
             "entry_date": entry_date,  # Add date information
         }
 
+    @staticmethod
+    def apply_start_time(work_log_entries, start_time):
+        """Move a day's entries so the first starts at start_time, keeping breaks."""
+        current_time = start_time
+        for i, entry in enumerate(work_log_entries):
+            if i == 0:
+                # First entry starts at the specified time
+                entry["start_time"] = current_time
+            else:
+                # Add any break time to the current time
+                current_time += timedelta(minutes=entry.get("break_minutes", 0))
+                entry["start_time"] = current_time
+
+            # Calculate end time
+            entry["end_time"] = entry["start_time"] + timedelta(hours=entry["hours"])
+            current_time = entry["end_time"]
+
     def determine_activity(self, task_description):
         """Determine the activity type based on task description."""
-        task_lower = task_description.lower()
-
-        for keyword, activity in self.activity_keywords.items():
-            if keyword in task_lower:
-                return activity
+        return self.activity_classifier.classify(task_description)
+
+    def determine_activities(self, all_date_entries):
+        """Fill in the activity of every parsed entry that has none, in one batch."""
+        missing = [
+            entry
+            for entries in all_date_entries.values()
+            for entry in entries
+            if not entry["activity"]
+        ]
+        activities = self.activity_classifier.classify_many(
+            entry["subject"] for entry in missing
+        )
+        for entry, activity in zip(missing, activities):
+            entry["activity"] = activity
 
-        return "Development"
+        return len(missing)
 
 
 class OpenProjectTimeLogger:
@@ -363,16 +662,112 @@ class OpenProjectTimeLogger:
     def __init__(self, base_url, api_token):
         self.base_url = base_url.rstrip("/")
         self.api_token = api_token
-        self.session = requests.Session()
+        self.session = load_requests().Session()
         self._setup_authentication()
+        self.rate_limiter = self._setup_rate_limiting()
+        self._setup_cassette()
+        self.spool = self._setup_spool()
+        self.tracer = self._setup_tracing()
+        self.work_package_rules = self._setup_work_package_rules()
+        self.form_schemas = self._setup_form_schemas()
+        self.reference_data = ReferenceData.from_config()
+        self.subject_indexes = {}  # Project ID -> SubjectIndex for this session
+        self.time_entries_by_date = {}  # ISO date -> the user's time entries
+        self.prefetch_executor = None
+        self.prefetch_futures = {}  # Lookup key -> Future of a background lookup
 
     def _setup_authentication(self):
         """Setup API token authentication for API requests."""
+        from requests.auth import HTTPBasicAuth
+
         self.session.auth = HTTPBasicAuth("apikey", self.api_token)
         self.session.headers.update(
             {"Content-Type": "application/json", "Accept": "application/hal+json"}
         )
 
+    def _setup_rate_limiting(self):
+        """Send API requests through the rate limiter shared by this host."""
+        from rate_limit import mount_rate_limiter
+
+        return mount_rate_limiter(self.session, self.base_url)
+
+    def _setup_cassette(self):
+        """Record or replay this session's traffic when a cassette is in use."""
+        from cassette import mount_cassette
+
+        mount_cassette(self.session)
+
+    def _setup_tracing(self):
+        """Add the status of each API response to the span that made it."""
+        tracer = get_tracer()
+        if tracer.enabled:
+            self.session.hooks["response"].append(record_response)
+        return tracer
+
+    def _setup_spool(self):
+        """Return the offline spool for writes that cannot reach the server."""
+        if not CONFIG.get("spool_failed_requests", True):
+            return None
+        from spool import Spool, default_spool_path
+
+        return Spool(default_spool_path())
+
+    def _setup_work_package_rules(self):
+        """Load the rules deciding status and comment of new work packages."""
+        from work_package_rules import WorkPackageRules
+
+        try:
+            return WorkPackageRules.load()
+        except (OSError, ValueError) as e:
+            print(f"⚠ Ignoring work package rules: {e}")
+            return None
+
+    def _setup_form_schemas(self):
+        """Return the form schemas that payloads are checked against before sending."""
+        if not CONFIG.get("validate_payloads", True):
+            return None
+        from form_schema import FormSchemaCache
+
+        return FormSchemaCache(self.session, self.base_url)
+
+    def _payload_errors(self, schema, payload, what):
+        """Print and return the problems the server would reject a payload for."""
+        if schema is None:
+            return []
+        errors = schema.validate(payload)
+        if errors:
+            current_span().set_attribute("rejected_locally", True)
+            print(f"Validation error creating {what} (checked before sending):")
+            for error in errors:
+                print(f"  - {error}")
+        return errors
+
+    def _should_spool(self, error):
+        """Return True if a failed write should be kept in the offline spool."""
+        if self.spool is None:
+            return False
+        if isinstance(
+            error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        ):
+            return True
+        response = getattr(error, "response", None)
+        return response is not None and response.status_code in (502, 503, 504)
+
+    def load_reference_data(self, refresh=False):
+        """Load activities, statuses, types and projects from cache or the API."""
+        self.reference_data = ReferenceData.load(
+            self.session, self.base_url, refresh=refresh
+        )
+        return self.reference_data
+
+    def default_status_id(self):
+        """Return the status ID used when none was chosen for a new work package."""
+        status_id = self.reference_data.status_id(DEFAULT_STATUS_NAME)
+        if status_id is None and self.reference_data.status_choices:
+            # Same fallback as the status prompt: the first status
+            status_id = self.reference_data.status_choices[0][0]
+        return status_id or 7
+
     def get_work_package_info(self, work_package_id):
         """Retrieve work package information to validate the task exists."""
         url = f"{self.base_url}/api/v3/work_packages/{work_package_id}"
@@ -397,102 +792,241 @@ class OpenProjectTimeLogger:
             print(f"Error fetching current user info: {e}")
             return None
 
-    def check_existing_work_package_by_subject(self, project_id, subject):
-        """Check if a work package with the same subject already exists in the project."""
-        url = f"{self.base_url}/api/v3/projects/{project_id}/work_packages"
-
-        normalized_subject = subject.strip().lower()
-
-        try:
-            params = {"pageSize": 100, "offset": 1}
-
-            all_work_packages = []
-            page = 1
+    def fetch_project_work_packages(self, project_id):
+        """Fetch the ID and subject of all work packages of a project."""
+        from pagination import iter_collection
+        from sparse import WORK_PACKAGE_FIELDS, work_package_row
 
-            while True:
-                params["offset"] = page
-                response = self.session.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+        url = f"{self.base_url}/api/v3/projects/{project_id}/work_packages"
+        return [
+            work_package_row(element)
+            for element in iter_collection(
+                self.session,
+                url,
+                fields=WORK_PACKAGE_FIELDS,
+                collection="work_packages",
+            )
+        ]
+
+    def fetch_work_packages(self, work_package_ids):
+        """Fetch the ID and subject of the given work packages in one query."""
+        from pagination import iter_collection
+        from sparse import WORK_PACKAGE_FIELDS, work_package_row
+
+        filters = json.dumps(
+            [
+                {
+                    "id": {
+                        "operator": "=",
+                        "values": [
+                            str(work_package_id) for work_package_id in work_package_ids
+                        ],
+                    }
+                }
+            ]
+        )
+        return [
+            work_package_row(element)
+            for element in iter_collection(
+                self.session,
+                f"{self.base_url}/api/v3/work_packages",
+                {"filters": filters},
+                fields=WORK_PACKAGE_FIELDS,
+                collection="work_packages",
+            )
+        ]
 
-                if "_embedded" in data and "elements" in data["_embedded"]:
-                    work_packages = data["_embedded"]["elements"]
-                    all_work_packages.extend(work_packages)
+    def plan_work_log_requests(self, all_date_entries):
+        """Read everything the work log needs up front and report what was saved."""
+        from planner import build_plan, run_plan
 
-                    total = data.get("total", 0)
-                    current_count = len(all_work_packages)
+        plan = build_plan(self, all_date_entries)
+        print(f"\n{plan.describe()}")
+        missing = run_plan(self, plan)
+        if missing:
+            print(
+                "⚠ Referenced work packages not found: "
+                + ", ".join(str(work_package_id) for work_package_id in missing)
+            )
+        return plan
+
+    def prefetch(self, key, loader):
+        """Start a lookup in the background unless it is already running."""
+        if key in self.prefetch_futures:
+            return
+        if self.prefetch_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self.prefetch_executor = ThreadPoolExecutor(
+                max_workers=CONFIG.get("prefetch_workers", 4),
+                thread_name_prefix="prefetch",
+            )
+        from tracing import in_current_context
 
-                    if current_count >= total or len(work_packages) == 0:
-                        break
+        self.prefetch_futures[key] = self.prefetch_executor.submit(
+            in_current_context(loader)
+        )
 
-                    page += 1
-                else:
-                    break
+    def _lookup(self, key, loader):
+        """Return the result of a lookup, waiting for its prefetch if one was started."""
+        # Futures are only created and consumed on the main thread; the
+        # worker threads never touch the caches themselves
+        future = self.prefetch_futures.pop(key, None)
+        if future is not None:
+            return future.result()
+        return loader()
+
+    def prefetch_work_log_entries(self, work_log_entries, date):
+        """Start looking up the subjects and time entries needed for a date."""
+        if date.isoformat() not in self.time_entries_by_date:
+            self.prefetch(
+                ("time_entries", date.isoformat()),
+                lambda: self.fetch_time_entries(date, date),
+            )
 
-            for wp in all_work_packages:
-                wp_subject = wp.get("subject", "").strip().lower()
-                if wp_subject == normalized_subject:
-                    return wp
+        for entry in work_log_entries:
+            if entry.get("is_scrum") or not entry.get("create_new_task"):
+                continue
+            project_id = entry.get("project_id") or self.reference_data.project_id(
+                entry["project"]
+            )
+            if project_id and project_id not in self.subject_indexes:
+                self.prefetch(
+                    ("subjects", project_id),
+                    lambda project_id=project_id: self.build_subject_index(project_id),
+                )
 
-            return None
+    def close(self):
+        """Stop background lookups that are no longer needed."""
+        if self.prefetch_executor is not None:
+            self.prefetch_executor.shutdown(wait=False, cancel_futures=True)
+            self.prefetch_executor = None
+        self.prefetch_futures.clear()
+
+    def build_subject_index(self, project_id):
+        """Scan a project and return a subject index of its work packages."""
+        work_packages = self.fetch_project_work_packages(project_id)
+        return SubjectIndex(work_packages)
+
+    def get_subject_index(self, project_id):
+        """Return the subject index of a project, scanning the project on first use."""
+        index = self.subject_indexes.get(project_id)
+        if index is None:
+            index = self._lookup(
+                ("subjects", project_id), lambda: self.build_subject_index(project_id)
+            )
+            self.subject_indexes[project_id] = index
+        return index
 
+    @traced("lookup_work_package", "project_id", "subject")
+    def check_existing_work_package_by_subject(self, project_id, subject):
+        """Check if a work package with the same subject already exists in the project."""
+        try:
+            index = self.get_subject_index(project_id)
         except requests.exceptions.RequestException as e:
             print(f"Warning: Could not check existing work packages: {e}")
             return None
 
-    def check_existing_time_entries(self, work_package_id, date, activity_name=None):
-        """Check if time entries already exist for the given work package and date."""
-        url = f"{self.base_url}/api/v3/time_entries"
+        work_package_id = index.find_exact(subject)
+        if work_package_id is None:
+            return None
 
-        try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            data = response.json()
+        return {"id": work_package_id, "subject": index.subjects[work_package_id]}
 
-            existing_entries = []
-            if "_embedded" in data and "elements" in data["_embedded"]:
-                all_entries = data["_embedded"]["elements"]
+    @traced("find_similar_work_packages", "project_id", "subject")
+    def find_similar_work_packages(self, project_id, subject, threshold=None):
+        """Find work packages whose subjects nearly match, best match first."""
+        if threshold is None:
+            threshold = CONFIG.get(
+                "similar_subject_threshold", DEFAULT_SIMILARITY_THRESHOLD
+            )
 
-                for entry in all_entries:
-                    wp_href = (
-                        entry.get("_links", {}).get("workPackage", {}).get("href", "")
-                    )
-                    if not wp_href.endswith(f"/{work_package_id}"):
-                        continue
+        try:
+            index = self.get_subject_index(project_id)
+        except requests.exceptions.RequestException as e:
+            print(f"Warning: Could not check similar work packages: {e}")
+            return []
 
-                    entry_date = entry.get("spentOn")
-                    if entry_date != date.strftime("%Y-%m-%d"):
-                        continue
+        return [
+            {
+                "id": work_package_id,
+                "subject": index.subjects[work_package_id],
+                "score": score,
+            }
+            for score, work_package_id in index.find_similar(subject, threshold)
+        ]
+
+    def get_time_entries_for_date(self, date):
+        """Return the user's time entries on a date, fetching them once per session."""
+        entries = self.time_entries_by_date.get(date.isoformat())
+        if entries is None:
+            entries = self._lookup(
+                ("time_entries", date.isoformat()),
+                lambda: self.fetch_time_entries(date, date),
+            )
+            self.time_entries_by_date[date.isoformat()] = entries
+        return entries
 
-                    if activity_name:
-                        activity_mapping = {
-                            "development": 3,
-                            "support": 5,
-                            "meeting": 14,
-                            "specification": 2,
-                            "testing": 4,
-                            "other": 6,
-                            "change request": 15,
-                            "management": 16,
-                        }
-                        target_activity_id = activity_mapping.get(activity_name.lower())
-                        if target_activity_id:
-                            activity_href = (
-                                entry.get("_links", {})
-                                .get("activity", {})
-                                .get("href", "")
-                            )
-                            if not activity_href.endswith(f"/{target_activity_id}"):
-                                continue
+    def forget_time_entries(self):
+        """Drop cached time entries so the next check sees changes made elsewhere."""
+        self.time_entries_by_date.clear()
 
-                    existing_entries.append(entry)
+    @traced("check_duplicates", "work_package_id", "date", "activity_name")
+    def check_existing_time_entries(self, work_package_id, date, activity_name=None):
+        """Check if time entries already exist for the given work package and date."""
+        # Offline the check is left to 'flush', which repeats it
+        if self.spool is not None and self.spool.offline:
+            return []
 
-            return existing_entries
+        target_activity_href = (
+            self.reference_data.activity_href(activity_name) if activity_name else None
+        )
 
+        try:
+            all_entries = self.get_time_entries_for_date(date)
         except requests.exceptions.RequestException as e:
             print(f"Warning: Could not check existing time entries: {e}")
             return []
 
+        work_package_id = str(work_package_id)
+        return [
+            entry
+            for entry in all_entries
+            if str(entry.work_package_id) == work_package_id
+            and (
+                not target_activity_href or entry.activity_href == target_activity_href
+            )
+        ]
+
+    def fetch_time_entries(self, start_date, end_date, page_size=None):
+        """Fetch rows of the current user's time entries between two dates."""
+        from pagination import iter_collection
+        from sparse import TIME_ENTRY_FIELDS, time_entry_row
+
+        url = f"{self.base_url}/api/v3/time_entries"
+        filters = json.dumps(
+            [
+                {"user": {"operator": "=", "values": ["me"]}},
+                {
+                    "spentOn": {
+                        "operator": "<>d",
+                        "values": [start_date.isoformat(), end_date.isoformat()],
+                    }
+                },
+            ]
+        )
+        return [
+            time_entry_row(element)
+            for element in iter_collection(
+                self.session,
+                url,
+                {"filters": filters},
+                fields=TIME_ENTRY_FIELDS,
+                collection="time_entries",
+                page_size=page_size,
+            )
+        ]
+
     def parse_time_input(self, time_str):
         """Parse time string in various formats (HH:MM AM/PM, HH:MM, etc.)."""
         time_str = time_str.strip()
@@ -518,14 +1052,19 @@ class OpenProjectTimeLogger:
         """Format time object for display in 12-hour format."""
         return time_obj.strftime("%I:%M %p").lstrip("0")
 
+    @traced("create_work_package", "project_id", "subject")
     def create_work_package(
         self,
         project_id,
         subject,
         activity_type="Development",
         description="",
-        status_id=7,
+        status_id=None,
     ):
+        if self.spool is not None and self.spool.offline:
+            return self._spool_work_package(
+                project_id, subject, activity_type, description, status_id
+            )
 
         existing_wp = self.check_existing_work_package_by_subject(project_id, subject)
         if existing_wp:
@@ -535,16 +1074,12 @@ class OpenProjectTimeLogger:
             )
             return existing_id
 
-        type_mapping = {
-            "Development": 1,
-            "Support": 1,
-            "Meeting": 1,
-            "Specification": 1,
-            "Testing": 1,
-            "Other": 1,
-        }
+        if status_id is None:
+            status_id = self.default_status_id()
 
-        type_id = type_mapping.get(activity_type, 1)
+        type_href = self.reference_data.type_href(
+            CONFIG.get("work_package_type", DEFAULT_TYPE_NAME)
+        )
 
         accountable_user_id = CONFIG.get("accountable_user_id")
         assignee_user_id = CONFIG.get("assignee_user_id")
@@ -553,8 +1088,8 @@ class OpenProjectTimeLogger:
             "subject": subject,
             "_links": {
                 "project": {"href": f"/api/v3/projects/{project_id}"},
-                "type": {"href": f"/api/v3/types/{type_id}"},
-                "status": {"href": f"/api/v3/statuses/{status_id}"},
+                "type": {"href": type_href},
+                "status": {"href": self.reference_data.status_href(status_id)},
             },
         }
 
@@ -574,14 +1109,29 @@ class OpenProjectTimeLogger:
                 "href": f"/api/v3/users/{assignee_user_id}"
             }
 
+        if self.form_schemas is not None and self._payload_errors(
+            self.form_schemas.work_package(project_id, type_href),
+            work_package_data,
+            "work package",
+        ):
+            return None
+
         url = f"{self.base_url}/api/v3/work_packages"
 
         try:
-            response = self.session.post(url, json=work_package_data)
+            response = self.session.post(
+                url, json=work_package_data, timeout=CONFIG.get("request_timeout", 30)
+            )
             if response.status_code == 201:
                 work_package = response.json()
+                index = self.subject_indexes.get(project_id)
+                if index is not None:
+                    index.add(work_package.get("id"), subject)
                 return work_package.get("id")
             elif response.status_code == 422:
+                if self.form_schemas is not None:
+                    # The cached schema let this through, so it may be stale
+                    self.form_schemas.forget_work_package(project_id, type_href)
                 error_data = response.json()
                 print(f"Validation error creating work package:")
                 if "_embedded" in error_data and "errors" in error_data["_embedded"]:
@@ -594,28 +1144,44 @@ class OpenProjectTimeLogger:
                 response.raise_for_status()
                 return response.json().get("id")
         except requests.exceptions.RequestException as e:
+            current_span().set_error(e)
+            if self._should_spool(e):
+                print("  ⏸ OpenProject unreachable, work package saved to the spool")
+                return self._spool_work_package(
+                    project_id, subject, activity_type, description, status_id
+                )
             print(f"Error creating work package: {e}")
             if hasattr(e, "response") and e.response is not None:
                 print(f"Response: {e.response.text}")
             return None
 
+    @traced("post_time_entry", "work_package_id", "date", "hours", "activity_name")
     def create_time_entry(
-        self, work_package_id, date, start_time, hours, activity_name, comment=""
+        self,
+        work_package_id,
+        date,
+        start_time,
+        hours,
+        activity_name,
+        comment="",
+        project_id=None,
     ):
-        """Create a time entry for the specified work package."""
-
-        activity_mapping = {
-            "development": 3,
-            "support": 5,
-            "meeting": 14,
-            "specification": 2,
-            "testing": 4,
-            "other": 6,
-            "change request": 15,
-            "management": 16,
-        }
+        """Create a time entry for the specified work package.
 
-        activity_id = activity_mapping.get(activity_name.lower(), 3)
+        project_id, the work package's project if known, selects the form
+        schema the entry is checked against.
+        """
+        if self.spool is not None:
+            from spool import is_spool_ref
+
+            if self.spool.offline or is_spool_ref(work_package_id):
+                return self._spool_time_entry(
+                    work_package_id, date, start_time, hours, activity_name, comment
+                )
+
+        activity_href = self.reference_data.activity_href(
+            activity_name
+        ) or self.reference_data.activity_href("Development")
 
         time_entry_data = {
             "spentOn": date.strftime("%Y-%m-%d"),
@@ -623,17 +1189,35 @@ class OpenProjectTimeLogger:
             "comment": comment,
             "_links": {
                 "workPackage": {"href": f"/api/v3/work_packages/{work_package_id}"},
-                "activity": {"href": f"/api/v3/time_entries/activities/{activity_id}"},
+                "activity": {"href": activity_href},
             },
         }
 
+        if self.form_schemas is not None and self._payload_errors(
+            self.form_schemas.time_entry(work_package_id, project_id),
+            time_entry_data,
+            "time entry",
+        ):
+            return None
+
         url = f"{self.base_url}/api/v3/time_entries"
 
         try:
-            response = self.session.post(url, json=time_entry_data)
+            response = self.session.post(
+                url, json=time_entry_data, timeout=CONFIG.get("request_timeout", 30)
+            )
             if response.status_code == 201:
-                return response.json()
+                time_entry = response.json()
+                # Later checks for the same date see the new entry
+                cached = self.time_entries_by_date.get(date.isoformat())
+                if cached is not None:
+                    from sparse import time_entry_row
+
+                    cached.append(time_entry_row(time_entry))
+                return time_entry
             elif response.status_code == 422:
+                if self.form_schemas is not None:
+                    self.form_schemas.forget_time_entry(work_package_id, project_id)
                 error_data = response.json()
                 print("Validation error:")
                 if "_embedded" in error_data and "errors" in error_data["_embedded"]:
@@ -646,12 +1230,103 @@ class OpenProjectTimeLogger:
                 response.raise_for_status()
                 return response.json()
         except requests.exceptions.RequestException as e:
+            current_span().set_error(e)
+            if self._should_spool(e):
+                print("  ⏸ OpenProject unreachable, time entry saved to the spool")
+                return self._spool_time_entry(
+                    work_package_id, date, start_time, hours, activity_name, comment
+                )
             print(f"Error creating time entry: {e}")
             if hasattr(e, "response") and e.response is not None:
                 print(f"Response: {e.response.text}")
             return None
 
-    def dry_run_work_package_analysis(self, work_log_entries):
+    @traced("patch_time_entry", "time_entry_id", "hours")
+    def update_time_entry(self, time_entry_id, date, hours, comment):
+        """Change the hours and comment of an existing time entry."""
+        url = f"{self.base_url}/api/v3/time_entries/{time_entry_id}"
+        try:
+            response = self.session.patch(
+                url,
+                json={"hours": f"PT{hours}H", "comment": comment},
+                timeout=CONFIG.get("request_timeout", 30),
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            current_span().set_error(e)
+            print(f"Error updating time entry {time_entry_id}: {e}")
+            if hasattr(e, "response") and e.response is not None:
+                print(f"Response: {e.response.text}")
+            return None
+
+        time_entry = response.json()
+        cached = self.time_entries_by_date.get(date.isoformat())
+        if cached is not None:
+            from sparse import time_entry_row
+
+            cached[:] = [row for row in cached if row.id != time_entry_id]
+            cached.append(time_entry_row(time_entry))
+        return time_entry
+
+    @traced("delete_time_entry", "time_entry_id")
+    def delete_time_entry(self, time_entry_id, date):
+        """Delete a time entry; return True if it is gone."""
+        url = f"{self.base_url}/api/v3/time_entries/{time_entry_id}"
+        try:
+            response = self.session.delete(
+                url, timeout=CONFIG.get("request_timeout", 30)
+            )
+            # Already deleted in OpenProject is as good as deleted here
+            if response.status_code != 404:
+                response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            current_span().set_error(e)
+            print(f"Error deleting time entry {time_entry_id}: {e}")
+            return False
+
+        cached = self.time_entries_by_date.get(date.isoformat())
+        if cached is not None:
+            cached[:] = [row for row in cached if row.id != time_entry_id]
+        return True
+
+    def _spool_work_package(
+        self, project_id, subject, activity_type, description, status_id
+    ):
+        """Save a work package to the spool and return its spool reference."""
+        current_span().set_attribute("spooled", True)
+        return self.spool.spool_work_package(
+            project_id, subject, activity_type, description, status_id
+        )
+
+    def _spool_time_entry(
+        self, work_package_id, date, start_time, hours, activity_name, comment
+    ):
+        """Save a time entry to the spool and return a placeholder result."""
+        current_span().set_attribute("spooled", True)
+        spool_ref = self.spool.spool_time_entry(
+            work_package_id, date, start_time, hours, activity_name, comment
+        )
+        return {"id": spool_ref, "spooled": True}
+
+    def apply_work_package_rules(self, entries, date=None):
+        """Set status and comment of entries matching a rule; return the others."""
+        if self.work_package_rules is None:
+            return list(entries)
+
+        unmatched = []
+        for entry in entries:
+            decision = self.work_package_rules.decide(
+                entry, date, self.reference_data.status_id
+            )
+            if decision is None:
+                unmatched.append(entry)
+                continue
+            status_id, comment = decision
+            entry["work_package_status_id"] = status_id or self.default_status_id()
+            entry["work_package_comment"] = comment
+        return unmatched
+
+    def dry_run_work_package_analysis(self, work_log_entries, date=None):
         """Analyze which work packages exist and which will be created without making changes."""
         print("\n" + "=" * 60)
         print("WORK PACKAGE ANALYSIS")
@@ -666,7 +1341,10 @@ class OpenProjectTimeLogger:
             if entry.get("is_scrum", False):
                 scrum_packages.append(entry)
             elif entry.get("create_new_task", False):
-                project_id = entry.get("project_id")
+                project_id = entry.get("project_id") or self.reference_data.project_id(
+                    entry["project"]
+                )
+                entry["project_id"] = project_id
                 if project_id:
                     existing_wp = self.check_existing_work_package_by_subject(
                         project_id, entry["subject"]
@@ -703,6 +1381,36 @@ class OpenProjectTimeLogger:
                     f"  • [{entry['project']}] {entry['subject']} → Work Package ID: {entry['work_package_id']}"
                 )
 
+        similar_packages = []
+        for entry in new_packages:
+            matches = self.find_similar_work_packages(
+                entry["project_id"], entry["subject"]
+            )
+            if matches:
+                similar_packages.append((entry, matches))
+
+        if similar_packages:
+            print(f"\n≈ SIMILAR EXISTING WORK PACKAGES ({len(similar_packages)}):")
+            for entry, matches in similar_packages:
+                print(f"  • [{entry['project']}] {entry['subject']}")
+                for match in matches[:3]:
+                    print(
+                        f"    ≈ {match['score']:.0%} ID {match['id']}: {match['subject']}"
+                    )
+
+                best = matches[0]
+                if should_reuse_similar_work_package(best):
+                    entry["create_new_task"] = False
+                    entry["work_package_id"] = best["id"]
+                    new_packages.remove(entry)
+                    existing_packages.append(
+                        {
+                            "entry": entry,
+                            "existing_id": best["id"],
+                            "existing_subject": best["subject"],
+                        }
+                    )
+
         if existing_packages:
             print(f"\n✅ EXISTING WORK PACKAGES FOUND ({len(existing_packages)}):")
             for pkg in existing_packages:
@@ -712,32 +1420,37 @@ class OpenProjectTimeLogger:
 
         if new_packages:
             print(f"\n🆕 NEW WORK PACKAGES TO CREATE ({len(new_packages)}):")
-            for i, entry in enumerate(new_packages, 1):
+            unmatched = self.apply_work_package_rules(new_packages, date)
+            unmatched_ids = {id(entry) for entry in unmatched}
+            for entry in new_packages:
+                if id(entry) in unmatched_ids:
+                    continue
+                status_name = self.reference_data.status_names.get(
+                    entry["work_package_status_id"],
+                    f"Status ID {entry['work_package_status_id']}",
+                )
                 print(f"  • [{entry['project']}] {entry['subject']}")
+                if entry["work_package_comment"]:
+                    print(f"    → Comment: {entry['work_package_comment']}")
+                print(f"    → Status '{status_name}' from work package rules")
 
-                print(
-                    f"\n--- Configuration for work package {i}/{len(new_packages)} ---"
-                )
+            for i, entry in enumerate(unmatched, 1):
+                print(f"  • [{entry['project']}] {entry['subject']}")
+
+                print(f"\n--- Configuration for work package {i}/{len(unmatched)} ---")
 
                 comment = get_work_package_comment(entry["subject"])
                 entry["work_package_comment"] = comment
                 if comment:
                     print(f"    → Comment: {comment}")
 
-                status_id = get_work_package_status()
+                status_id = get_work_package_status(self.reference_data.status_choices)
                 entry["work_package_status_id"] = status_id
 
                 # Get status name for display
-                status_names = {
-                    1: "New",
-                    2: "To Do",
-                    7: "In Progress",
-                    11: "Developed",
-                    12: "Closed",
-                    13: "Rejected",
-                    14: "On Hold",
-                }
-                status_name = status_names.get(status_id, f"Status ID {status_id}")
+                status_name = self.reference_data.status_names.get(
+                    status_id, f"Status ID {status_id}"
+                )
                 print(f"    → Will create new work package with status '{status_name}'")
 
         print(f"\n" + "=" * 60)
@@ -745,6 +1458,7 @@ class OpenProjectTimeLogger:
         print(f"  SCRUM entries: {len(scrum_packages)}")
         print(f"  Existing work package entries: {len(existing_wp_packages)}")
         print(f"  Existing work packages (will reuse): {len(existing_packages)}")
+        print(f"  Similar subjects found: {len(similar_packages)}")
         print(f"  New work packages (will create): {len(new_packages)}")
         print("=" * 60)
 
@@ -755,6 +1469,175 @@ class OpenProjectTimeLogger:
             "new": new_packages,
         }
 
+    def _update_existing_time_entry(
+        self, existing_entries, entry, work_package_id, date, result, claimed
+    ):
+        """Update the one unclaimed time entry matching an entry.
+
+        Returns the matches left to treat as duplicates, an empty list when
+        none is left (a new time entry is created), or None when the entry's
+        outcome is decided in result.
+        """
+        unclaimed = [
+            existing
+            for existing in existing_entries
+            if existing.id not in (claimed or ())
+        ]
+        if not unclaimed:
+            return []
+        if len(unclaimed) > 1:
+            from reconcile import parse_iso_duration
+
+            # An unchanged entry owns the match that already has its hours
+            same_hours = [
+                existing
+                for existing in unclaimed
+                if abs(parse_iso_duration(existing.hours) - entry["hours"]) < 0.005
+            ]
+            if same_hours:
+                print(f"  ⚠ Time entry {same_hours[0].id} already has these hours")
+                result["outcome"] = "duplicate"
+                result["time_entry_id"] = same_hours[0].id
+                return None
+        if len(unclaimed) > 1:
+            print(
+                f"  ⚠ {len(unclaimed)} matching time entries on {date.strftime('%Y-%m-%d')}; "
+                "not sure which one changed - update it in OpenProject"
+            )
+            result["outcome"] = "ambiguous"
+            return None
+
+        time_entry_id = unclaimed[0].id
+        result["time_entry_id"] = time_entry_id
+        time_entry = self.update_time_entry(
+            time_entry_id,
+            date,
+            entry["hours"],
+            f"[{entry['project']}] {entry['subject']}",
+        )
+        if time_entry:
+            print(f"  ✓ Updated existing time entry (ID: {time_entry_id})")
+            result["outcome"] = "updated"
+        else:
+            print(f"  ✗ Failed to update time entry {time_entry_id}")
+        return None
+
+    def process_work_log_entry(self, entry, date, update_existing=False, claimed=None):
+        """Create the work package and time entry of one entry and return the outcome.
+
+        With update_existing, a matching time entry is changed to the entry's
+        hours and comment instead of being skipped as a duplicate. Time entry
+        IDs in claimed already belong to other entries and are left alone.
+        """
+        result = {
+            "outcome": "failed",
+            "work_package_id": entry["work_package_id"],
+            "time_entry_id": None,
+        }
+        work_package_id = entry["work_package_id"]
+
+        if entry.get("is_scrum", False) and work_package_id:
+            existing_entries = self.check_existing_time_entries(
+                work_package_id, date, entry["activity"]
+            )
+            if existing_entries and update_existing:
+                existing_entries = self._update_existing_time_entry(
+                    existing_entries, entry, work_package_id, date, result, claimed
+                )
+                if existing_entries is None:
+                    return result
+            if existing_entries:
+                print(
+                    f"  ⚠ SCRUM entry already exists for {date.strftime('%Y-%m-%d')} - skipping"
+                )
+                print(f"    Found {len(existing_entries)} existing SCRUM time entries")
+                result["outcome"] = "duplicate"
+                return result
+
+        if entry.get("create_new_task", False):
+            print(f"  Checking for existing work package: {entry['subject']}")
+            project_id = entry.get("project_id")
+            if not project_id:
+                print(f"  ✗ No project ID found for {entry['project']}")
+                return result
+
+            comment = entry.get("work_package_comment", "")
+            status_id = entry.get("work_package_status_id", self.default_status_id())
+            work_package_id = self.create_work_package(
+                project_id,
+                entry["subject"],
+                entry["activity"],
+                comment,
+                status_id,
+            )
+            if not work_package_id:
+                print(f"  ✗ Failed to create work package")
+                return result
+            result["work_package_id"] = work_package_id
+
+            # Check if time entry already exists for this work package
+            existing_entries = self.check_existing_time_entries(
+                work_package_id, date, entry["activity"]
+            )
+            if existing_entries and update_existing:
+                existing_entries = self._update_existing_time_entry(
+                    existing_entries, entry, work_package_id, date, result, claimed
+                )
+                if existing_entries is None:
+                    return result
+            if existing_entries:
+                print(
+                    f"  ⚠ Time entry already exists for {date.strftime('%Y-%m-%d')} - skipping"
+                )
+                print(f"    Found {len(existing_entries)} existing time entries")
+                result["outcome"] = "duplicate"
+                return result
+        else:
+            print(f"  Using existing work package ID: {work_package_id}")
+            # Check if time entry already exists for existing work packages too
+            existing_entries = self.check_existing_time_entries(
+                work_package_id, date, entry["activity"]
+            )
+            if existing_entries and update_existing:
+                existing_entries = self._update_existing_time_entry(
+                    existing_entries, entry, work_package_id, date, result, claimed
+                )
+                if existing_entries is None:
+                    return result
+            if existing_entries:
+                print(
+                    f"  ⚠ Time entry already exists for {date.strftime('%Y-%m-%d')} - skipping"
+                )
+                print(f"    Found {len(existing_entries)} existing time entries")
+                result["outcome"] = "duplicate"
+                return result
+
+        time_entry = self.create_time_entry(
+            work_package_id,
+            date,
+            entry["start_time"].time(),
+            entry["hours"],
+            entry["activity"],
+            f"[{entry['project']}] {entry['subject']}",
+            project_id=entry.get("project_id")
+            or self.reference_data.project_id(entry["project"]),
+        )
+
+        if time_entry and time_entry.get("spooled"):
+            print("  ⏸ Queued in the offline spool; run 'python log.py flush' later")
+            result["outcome"] = "spooled"
+        elif time_entry:
+            print(
+                f"  ✓ Successfully created time entry (ID: {time_entry.get('id', 'Unknown')})"
+            )
+            result["outcome"] = "created"
+        else:
+            print(f"  ✗ Failed to create time entry")
+            return result
+
+        result["time_entry_id"] = time_entry.get("id")
+        return result
+
     def process_work_log_entries(self, work_log_entries, date):
         """Process multiple work log entries and create time entries."""
         successful_entries = []
@@ -766,95 +1649,27 @@ class OpenProjectTimeLogger:
         print("=" * 60)
 
         for i, entry in enumerate(work_log_entries, 1):
-            print(
-                f"\n[{i}/{len(work_log_entries)}] Processing: {entry['project']} - {entry['subject'][:50]}..."
-            )
-            print(
-                f"  Time: {entry['start_time'].strftime('%H:%M')} - {entry['end_time'].strftime('%H:%M')} ({entry['hours']} hrs)"
-            )
-            print(f"  Activity: {entry['activity']}")
-
-            work_package_id = entry["work_package_id"]
-
-            if entry.get("is_scrum", False) and work_package_id:
-                existing_entries = self.check_existing_time_entries(
-                    work_package_id, date, entry["activity"]
-                )
-                if existing_entries:
-                    print(
-                        f"  ⚠ SCRUM entry already exists for {date.strftime('%Y-%m-%d')} - skipping"
-                    )
-                    print(
-                        f"    Found {len(existing_entries)} existing SCRUM time entries"
-                    )
-                    continue
-
-            if entry.get("create_new_task", False):
-                print(f"  Checking for existing work package: {entry['subject']}")
-                project_id = entry.get("project_id")
-                if project_id:
-                    comment = entry.get("work_package_comment", "")
-                    status_id = entry.get(
-                        "work_package_status_id", 7
-                    )  # Default to "In Progress"
-                    work_package_id = self.create_work_package(
-                        project_id,
-                        entry["subject"],
-                        entry["activity"],
-                        comment,
-                        status_id,
-                    )
-                    if work_package_id:
-                        # Check if time entry already exists for this work package
-                        existing_entries = self.check_existing_time_entries(
-                            work_package_id, date, entry["activity"]
-                        )
-                        if existing_entries:
-                            print(
-                                f"  ⚠ Time entry already exists for {date.strftime('%Y-%m-%d')} - skipping"
-                            )
-                            print(
-                                f"    Found {len(existing_entries)} existing time entries"
-                            )
-                            continue
-                    else:
-                        print(f"  ✗ Failed to create work package")
-                        failed_entries.append(entry)
-                        continue
-                else:
-                    print(f"  ✗ No project ID found for {entry['project']}")
-                    failed_entries.append(entry)
-                    continue
-            else:
-                print(f"  Using existing work package ID: {work_package_id}")
-                # Check if time entry already exists for existing work packages too
-                existing_entries = self.check_existing_time_entries(
-                    work_package_id, date, entry["activity"]
+            with self.tracer.span(
+                "process_entry",
+                date=date.isoformat(),
+                project=entry["project"],
+                subject=entry["subject"],
+                hours=entry["hours"],
+            ) as span:
+                print(
+                    f"\n[{i}/{len(work_log_entries)}] Processing: {entry['project']} - {entry['subject'][:50]}..."
                 )
-                if existing_entries:
-                    print(
-                        f"  ⚠ Time entry already exists for {date.strftime('%Y-%m-%d')} - skipping"
-                    )
-                    print(f"    Found {len(existing_entries)} existing time entries")
-                    continue
-
-            result = self.create_time_entry(
-                work_package_id,
-                date,
-                entry["start_time"].time(),
-                entry["hours"],
-                entry["activity"],
-                f"[{entry['project']}] {entry['subject']}",
-            )
-
-            if result:
                 print(
-                    f"  ✓ Successfully created time entry (ID: {result.get('id', 'Unknown')})"
+                    f"  Time: {entry['start_time'].strftime('%H:%M')} - {entry['end_time'].strftime('%H:%M')} ({entry['hours']} hrs)"
                 )
-                successful_entries.append(entry)
-            else:
-                print(f"  ✗ Failed to create time entry")
-                failed_entries.append(entry)
+                print(f"  Activity: {entry['activity']}")
+
+                outcome = self.process_work_log_entry(entry, date)["outcome"]
+                span.set_attribute("outcome", outcome)
+                if outcome in ("created", "spooled"):
+                    successful_entries.append(entry)
+                elif outcome == "failed":
+                    failed_entries.append(entry)
 
         print(f"\n" + "=" * 60)
         print(
@@ -865,9 +1680,9 @@ class OpenProjectTimeLogger:
         return successful_entries, failed_entries
 
 
-def get_work_log_file_input():
-    """Get the logs.json file path."""
-    expected_file = "logs.json"
+def get_work_log_file_input(file_path=None):
+    """Get the work log file path, defaulting to logs.json."""
+    expected_file = file_path or "logs.json"
 
     if os.path.exists(expected_file):
         print(f"Found work log file: {expected_file}")
@@ -882,6 +1697,100 @@ def get_work_log_file_input():
         return None
 
 
+def get_work_log_files_input(file_patterns=None):
+    """Expand work log paths, directories and glob patterns, defaulting to logs.json."""
+    if isinstance(file_patterns, str):
+        file_patterns = [file_patterns]
+    if not file_patterns:
+        work_log_file = get_work_log_file_input()
+        return [work_log_file] if work_log_file else []
+
+    from ingest import expand_work_log_paths
+
+    work_log_files = []
+    for path in expand_work_log_paths(file_patterns):
+        if os.path.exists(path):
+            work_log_files.append(path)
+        else:
+            print(f"Error: Could not find work log file '{path}'.")
+
+    if not work_log_files:
+        print(f"No work log files match {', '.join(file_patterns)}")
+    elif len(work_log_files) > 1:
+        print(f"Found {len(work_log_files)} work log files")
+
+    return work_log_files
+
+
+def parse_work_log(file_patterns=None):
+    """Locate and parse the work log files, returning (parser, date entries)."""
+    with profile_phase("parse"):
+        return _parse_work_log(file_patterns)
+
+
+def _parse_work_log(file_patterns):
+    work_log_files = get_work_log_files_input(file_patterns)
+
+    if not work_log_files:
+        print("No work log file found. Exiting.")
+        return None, {}
+
+    if len(work_log_files) > 1:
+        print(f"Processing {len(work_log_files)} work log files")
+        parser = WorkLogParser()
+        all_date_entries = parser.parse_work_log_files(work_log_files)
+        for error in parser.errors:
+            print(f"Warning: {error}")
+        return parser, all_date_entries
+
+    work_log_file = work_log_files[0]
+    print(f"Processing work log file: {work_log_file}")
+
+    parser = WorkLogParser(work_log_file)
+    try:
+        all_date_entries = parser.parse_work_log_file()
+    except (ValueError, json.JSONDecodeError) as e:
+        print(f"Error parsing work log file: {e}")
+        parser.errors.append(str(e))
+        return parser, {}
+
+    return parser, all_date_entries
+
+
+def validate_work_log(file_patterns=None):
+    """Validate the work log file without contacting OpenProject."""
+    print("\nOpenProject Work Log Validator")
+    print("=" * 40)
+
+    parser, all_date_entries = parse_work_log(file_patterns)
+    if parser is None:
+        return False
+
+    total_entries = 0
+    total_hours = 0
+    for date, entries in all_date_entries.items():
+        hours = sum(entry["hours"] for entry in entries)
+        total_entries += len(entries)
+        total_hours += hours
+        print(f"  {date.strftime('%Y-%m-%d')}: {len(entries)} entries, {hours} hrs")
+
+    print("=" * 40)
+    print(
+        f"{len(all_date_entries)} dates, {total_entries} valid entries, {total_hours} hrs"
+    )
+
+    if parser.errors:
+        print(f"✗ {len(parser.errors)} problems found")
+        return False
+
+    if not all_date_entries:
+        print("✗ No valid time entries found in the work log file.")
+        return False
+
+    print("✓ Work log file is valid")
+    return True
+
+
 def get_yes_no_input(prompt):
     """Get yes/no input from user, only allowing 'y' or 'n'."""
     while True:
@@ -892,23 +1801,43 @@ def get_yes_no_input(prompt):
             print("Please enter 'y' for yes or 'n' for no.")
 
 
+def should_reuse_similar_work_package(match):
+    """Decide whether a near-duplicate work package replaces creating a new one."""
+    mode = CONFIG.get("reuse_similar_work_packages", "ask")
+
+    if mode == "always":
+        print(f"    → Reusing work package ID {match['id']}")
+        return True
+    if mode == "never":
+        return False
+
+    return get_yes_no_input(f"    Use existing work package ID {match['id']} instead?")
+
+
 def get_work_package_comment(task_subject):
     """Get optional comment/description for a new work package."""
     comment = input("Enter comment (or press Enter to skip): ").strip()
     return comment if comment else ""
 
 
-def get_work_package_status():
+def get_work_package_status(status_choices=None):
     """Get work package status from user input."""
+    if status_choices is None:
+        status_choices = ReferenceData.from_config().status_choices
+
     status_mapping = {
-        "1": {"id": 1, "name": "New"},
-        "2": {"id": 2, "name": "To Do"},
-        "3": {"id": 7, "name": "In Progress"},
-        "4": {"id": 11, "name": "Developed"},
-        "5": {"id": 12, "name": "Closed"},
-        "6": {"id": 13, "name": "Rejected"},
-        "7": {"id": 14, "name": "On Hold"},
+        str(index): {"id": status_id, "name": name}
+        for index, (status_id, name) in enumerate(status_choices, 1)
     }
+    default_status = next(
+        (
+            status
+            for status in status_mapping.values()
+            if status["name"].lower() == DEFAULT_STATUS_NAME.lower()
+        ),
+        status_mapping["1"],
+    )
+    last_choice = len(status_mapping)
 
     print("\nAvailable statuses:")
     for key, status in status_mapping.items():
@@ -916,18 +1845,20 @@ def get_work_package_status():
 
     while True:
         choice = input(
-            "Select status (1-7, or press Enter for 'In Progress'): "
+            f"Select status (1-{last_choice}, or press Enter for '{default_status['name']}'): "
         ).strip()
 
         if not choice:  # Default to "In Progress"
-            return status_mapping["3"]["id"]
+            return default_status["id"]
 
         if choice in status_mapping:
             selected_status = status_mapping[choice]
             print(f"Selected status: {selected_status['name']}")
             return selected_status["id"]
         else:
-            print("Invalid choice. Please select 1-7 or press Enter for default.")
+            print(
+                f"Invalid choice. Please select 1-{last_choice} or press Enter for default."
+            )
 
 
 def get_user_work_package_choices(work_log_entries):
@@ -943,36 +1874,38 @@ def get_user_work_package_choices(work_log_entries):
     return updated_entries
 
 
-def main():
-    """Main execution function."""
+def run_work_log(file_patterns=None, refresh_cache=False):
+    """Interactively process the work log file against OpenProject."""
     config = CONFIG
 
-    logger = OpenProjectTimeLogger(config["base_url"], config["api_token"])
-
     print("\nOpenProject Work Log Processor")
     print("=" * 40)
 
-    work_log_file = get_work_log_file_input()
-
-    if not work_log_file:
-        print("No work log file found. Exiting.")
-        return
-
-    print(f"Processing work log file: {work_log_file}")
-
-    parser = WorkLogParser(work_log_file)
-    try:
-        all_date_entries = parser.parse_work_log_file()
-    except (ValueError, json.JSONDecodeError) as e:
-        print(f"Error parsing work log file: {e}")
+    parser, all_date_entries = parse_work_log(file_patterns)
+    if parser is None:
         return
 
     if not all_date_entries:
         print("No valid time entries found in the work log file.")
         return
 
+    with profile_phase("reference data"):
+        logger = OpenProjectTimeLogger(config["base_url"], config["api_token"])
+        logger.load_reference_data(refresh=refresh_cache)
+
+    with profile_phase("plan"):
+        logger.plan_work_log_requests(all_date_entries)
+
+    dates = list(all_date_entries)
+
     # Process each date separately
-    for date, work_log_entries in all_date_entries.items():
+    for index, (date, work_log_entries) in enumerate(all_date_entries.items()):
+        # Look up what this date and the next one need while prompts are open
+        logger.prefetch_work_log_entries(work_log_entries, date)
+        if index + 1 < len(dates):
+            next_date = dates[index + 1]
+            logger.prefetch_work_log_entries(all_date_entries[next_date], next_date)
+
         print(f"\n" + "=" * 80)
         print(
             f"PROCESSING DATE: {date.strftime('%Y-%m-%d')} ({date.strftime('%A, %B %d, %Y')})"
@@ -1006,29 +1939,12 @@ def main():
                     # Parse the time input
                     start_time = logger.parse_time_input(start_time_input)
 
-                    # Update all entries with the new start time
-                    current_time = datetime.combine(date, start_time)
-
                     print(
                         f"\nUpdating work log entries with start time: {logger.format_time_for_display(start_time)}"
                     )
-
-                    for i, entry in enumerate(work_log_entries):
-                        if i == 0:
-                            # First entry starts at the specified time
-                            entry["start_time"] = current_time
-                        else:
-                            # Add any break time to the current time
-                            current_time += timedelta(
-                                minutes=entry.get("break_minutes", 0)
-                            )
-                            entry["start_time"] = current_time
-
-                        # Calculate end time
-                        entry["end_time"] = entry["start_time"] + timedelta(
-                            hours=entry["hours"]
-                        )
-                        current_time = entry["end_time"]
+                    WorkLogParser.apply_start_time(
+                        work_log_entries, datetime.combine(date, start_time)
+                    )
 
                     print(
                         f"✓ All {len(work_log_entries)} entries updated with new timing"
@@ -1040,7 +1956,8 @@ def main():
                     print("Please use formats like: 9:00 AM, 2:30 PM, 09:00, 14:30")
                     continue
 
-        analysis = logger.dry_run_work_package_analysis(work_log_entries)
+        with profile_phase("analysis"):
+            analysis = logger.dry_run_work_package_analysis(work_log_entries, date)
 
         if not get_yes_no_input(
             f"\nProceed with processing entries for {date.strftime('%Y-%m-%d')}?"
@@ -1058,7 +1975,10 @@ def main():
             print(
                 f"   Time: {entry['start_time'].strftime('%H:%M')} - {entry['end_time'].strftime('%H:%M')} ({entry['hours']} hrs)"
             )
-            print(f"   Activity: {entry['activity']}")
+            if entry.get("activity_determined"):
+                print(f"   Activity: {entry['activity']} (determined from subject)")
+            else:
+                print(f"   Activity: {entry['activity']}")
 
             if entry.get("is_scrum", False):
                 print(f"   Work Package: SCRUM (ID: {entry['work_package_id']})")
@@ -1083,7 +2003,8 @@ def main():
             print(f"Processing cancelled for {date.strftime('%Y-%m-%d')}.")
             continue
 
-        successful, failed = logger.process_work_log_entries(work_log_entries, date)
+        with profile_phase("apply"):
+            successful, failed = logger.process_work_log_entries(work_log_entries, date)
 
         if failed:
             print(
@@ -1099,16 +2020,756 @@ def main():
                         entry["hours"],
                         entry["activity"],
                         f"[{entry['project']}] {entry['subject']}",
+                        project_id=entry.get("project_id")
+                        or logger.reference_data.project_id(entry["project"]),
                     )
                     if result:
                         print("✓ Success on retry")
                     else:
                         print("✗ Failed again")
 
+    logger.close()
+
     print(f"\n" + "=" * 80)
     print("ALL DATES PROCESSED")
     print("=" * 80)
 
 
+def sync_work_log_changes(work_log_sync):
+    """Push pending work log changes, reporting problems instead of stopping."""
+    logger = work_log_sync.logger
+    if logger.spool is not None and len(logger.spool):
+        flush_work_log_spool(logger)
+
+    # Entries may have been logged elsewhere since the last change
+    logger.forget_time_entries()
+    try:
+        synced, failed = work_log_sync.sync()
+    except (ValueError, OSError) as e:
+        # json.JSONDecodeError is a ValueError; the file may be mid-edit
+        print(f"Could not sync work log changes: {e}")
+        return
+
+    stamp = datetime.now().strftime("%H:%M:%S")
+    if synced or failed:
+        print(f"[{stamp}] Synced {synced} entries, {failed} not pushed")
+    else:
+        print(f"[{stamp}] No new or changed entries")
+
+
+def flush_work_log_spool(logger=None, max_workers=4):
+    """Send the operations saved in the offline spool to OpenProject."""
+    from spool import Spool, default_spool_path, flush_spool
+
+    if logger is None:
+        logger = OpenProjectTimeLogger(CONFIG["base_url"], CONFIG["api_token"])
+        logger.load_reference_data()
+    spool = logger.spool or Spool(default_spool_path())
+
+    pending = len(spool)
+    if not pending:
+        print("The offline spool is empty.")
+        return True
+
+    print(f"Flushing {pending} spooled operations...")
+    sent, remaining = flush_spool(logger, spool, max_workers)
+    if remaining:
+        print(f"✗ Sent {sent}, {remaining} still spooled (server unreachable?)")
+        return False
+
+    print(f"✓ Sent all {sent} spooled operations")
+    return True
+
+
+def get_service_url():
+    """Return the base URL of the local sync service."""
+    from service import DEFAULT_HOST, DEFAULT_PORT
+
+    host = CONFIG.get("service_host", DEFAULT_HOST)
+    port = CONFIG.get("service_port", DEFAULT_PORT)
+    return f"http://{host}:{port}"
+
+
+def serve_work_log(host=None, port=None, refresh_cache=False):
+    """Run the local sync service until interrupted."""
+    from service import DEFAULT_HOST, DEFAULT_PORT, SyncService, create_server
+
+    host = host or CONFIG.get("service_host", DEFAULT_HOST)
+    port = port or CONFIG.get("service_port", DEFAULT_PORT)
+
+    logger = OpenProjectTimeLogger(CONFIG["base_url"], CONFIG["api_token"])
+    logger.load_reference_data(refresh=refresh_cache)
+
+    try:
+        server = create_server(
+            SyncService(logger, WorkLogParser, CONFIG.get("webhook_secret")),
+            host,
+            port,
+            CONFIG.get("service_token"),
+        )
+    except OSError as e:
+        print(f"✗ Could not listen on {host}:{port}: {e}")
+        return False
+
+    print(f"Sync service listening on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping sync service")
+    finally:
+        server.server_close()
+        logger.close()
+    return True
+
+
+def submit_work_log(file_patterns=None, url=None, start_time=None, dates=None):
+    """Send work log files to the local sync service and print the outcomes."""
+    from ingest import load_work_log
+
+    load_requests()
+    url = (url or get_service_url()).rstrip("/")
+    headers = {}
+    if CONFIG.get("service_token"):
+        headers["X-Service-Token"] = CONFIG["service_token"]
+
+    work_log_files = get_work_log_files_input(file_patterns)
+    if not work_log_files:
+        return False
+
+    all_ok = True
+    for work_log_file in work_log_files:
+        document = load_work_log(work_log_file)
+        body = {"work_log": document, "dates": dates, "start_time": start_time}
+
+        try:
+            response = requests.post(
+                f"{url}/submit", json=body, headers=headers, timeout=600
+            )
+        except requests.exceptions.ConnectionError:
+            print(
+                f"✗ The sync service is not running at {url}; start it with 'python log.py serve'"
+            )
+            return False
+        if response.status_code != 200:
+            print(f"✗ {work_log_file}: {response.json().get('error', response.text)}")
+            all_ok = False
+            continue
+
+        result = response.json()
+        print(f"\n{work_log_file}")
+        for entry in result["entries"]:
+            print(
+                f"  {entry['date']} {entry['outcome']:<9} [{entry['project']}] {entry['subject'][:50]}"
+            )
+        summary = ", ".join(
+            f"{count} {outcome}" for outcome, count in sorted(result["summary"].items())
+        )
+        print(f"  {summary or 'nothing to submit'}")
+        for error in result["errors"]:
+            print(f"  ⚠ {error}")
+        if result["summary"].get("failed"):
+            all_ok = False
+
+    return all_ok
+
+
+def get_backfill_queue_file():
+    """Return the path of the shared backfill queue."""
+    return CONFIG.get("backfill_queue", "backfill_queue.sqlite3")
+
+
+def get_backfill_user(user=None, document=None):
+    """Return the user whose units are queued or claimed."""
+    import getpass
+
+    if user:
+        return user
+    if document and document.get("user"):
+        return document["user"]
+    return CONFIG.get("backfill_user") or getpass.getuser()
+
+
+def backfill_enqueue(file_patterns=None, user=None, queue_path=None):
+    """Split work log files into (user, date) units on the backfill queue."""
+    from backfill import WorkQueue, enqueue_work_logs
+    from ingest import load_work_log
+
+    work_log_files = get_work_log_files_input(file_patterns)
+    if not work_log_files:
+        return False
+
+    documents_by_user = {}
+    for work_log_file in work_log_files:
+        try:
+            document = load_work_log(work_log_file)
+        except (OSError, ValueError) as e:
+            print(f"✗ Could not read {work_log_file}: {e}")
+            return False
+        documents_by_user.setdefault(get_backfill_user(user, document), []).append(
+            (work_log_file, document)
+        )
+
+    queue_path = queue_path or get_backfill_queue_file()
+    all_ok = True
+    with WorkQueue(queue_path) as queue:
+        for unit_user, documents in documents_by_user.items():
+            queued, errors = enqueue_work_logs(
+                queue, WorkLogParser(), documents, unit_user
+            )
+            print(f"✓ Queued {queued} new or changed dates for {unit_user}")
+            for error in errors:
+                print(f"  ⚠ {error}")
+            all_ok = all_ok and not errors
+        counts = queue.counts()
+
+    print(
+        f"{queue_path}: "
+        + ", ".join(f"{count} {state}" for state, count in counts.items())
+    )
+    return all_ok
+
+
+def _run_backfill_worker(queue_path, user, lease_seconds):
+    """Process backfill units in this process until the queue is drained."""
+    from backfill import run_worker
+
+    logger = OpenProjectTimeLogger(CONFIG["base_url"], CONFIG["api_token"])
+    try:
+        logger.load_reference_data()
+        return run_worker(queue_path, logger, WorkLogParser, user, lease_seconds)
+    finally:
+        logger.close()
+
+
+def backfill_work(workers=1, user=None, lease_seconds=None, queue_path=None):
+    """Run worker processes that drain the backfill queue."""
+    import multiprocessing
+
+    from backfill import DEFAULT_LEASE_SECONDS, WorkQueue
+
+    queue_path = queue_path or get_backfill_queue_file()
+    if not os.path.exists(queue_path):
+        print(
+            f"✗ No backfill queue at {queue_path}; run 'python log.py backfill enqueue'"
+        )
+        return False
+    user = get_backfill_user(user)
+    lease_seconds = lease_seconds or CONFIG.get(
+        "backfill_lease_seconds", DEFAULT_LEASE_SECONDS
+    )
+
+    if workers <= 1:
+        _run_backfill_worker(queue_path, user, lease_seconds)
+    else:
+        # Refresh the reference data cache once instead of in every worker
+        logger = OpenProjectTimeLogger(CONFIG["base_url"], CONFIG["api_token"])
+        logger.load_reference_data()
+        logger.close()
+
+        processes = [
+            multiprocessing.Process(
+                target=_run_backfill_worker, args=(queue_path, user, lease_seconds)
+            )
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    with WorkQueue(queue_path) as queue:
+        counts = queue.counts(user)
+    print(
+        f"\n{user}: " + ", ".join(f"{count} {state}" for state, count in counts.items())
+    )
+    return not counts["failed"] and not counts["pending"]
+
+
+def backfill_status(user=None, retry=False, queue_path=None):
+    """Print the backfill queue state, optionally re-queueing failed units."""
+    from backfill import WorkQueue
+
+    queue_path = queue_path or get_backfill_queue_file()
+    if not os.path.exists(queue_path):
+        print(f"No backfill queue at {queue_path}")
+        return False
+
+    with WorkQueue(queue_path) as queue:
+        if retry:
+            print(f"Re-queued {queue.retry_failed(user)} failed units")
+        counts = queue.counts(user)
+        failures = queue.failures(user)
+
+    print(", ".join(f"{count} {state}" for state, count in counts.items()))
+    for unit_user, day, attempts, results in failures:
+        print(f"  ✗ {unit_user} {day} after {attempts} attempts")
+        for result in results or []:
+            if result.get("error") or result.get("outcome") == "failed":
+                print(f"      {result.get('error') or result.get('subject')}")
+    return not failures
+
+
+def watch_work_log(file_path=None, poll_interval=1.0, mark_synced=False):
+    """Keep syncing new or changed work log entries whenever the file changes."""
+    from watcher import WorkLogSync, create_watcher, default_state_path
+
+    print("\nOpenProject Work Log Watcher")
+    print("=" * 40)
+
+    work_log_file = get_work_log_file_input(file_path)
+    if not work_log_file:
+        return False
+
+    # One logger for the whole session keeps its connection pool, reference
+    # data and subject indexes warm between changes
+    logger = OpenProjectTimeLogger(CONFIG["base_url"], CONFIG["api_token"])
+    logger.load_reference_data()
+    work_log_sync = WorkLogSync(
+        logger,
+        WorkLogParser(work_log_file),
+        work_log_file,
+        default_state_path(work_log_file, get_cache_dir()),
+    )
+
+    if mark_synced:
+        count = work_log_sync.mark_synced()
+        print(f"Marked {count} existing entries as synced")
+
+    sync_work_log_changes(work_log_sync)
+
+    watcher = create_watcher(work_log_file, poll_interval)
+    print(f"Watching {work_log_file} for changes (Ctrl+C to stop)")
+    try:
+        while True:
+            if watcher.wait_for_change():
+                sync_work_log_changes(work_log_sync)
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        watcher.close()
+
+    return True
+
+
+def reconcile_work_log(file_patterns=None, csv_path=None, show_all=False):
+    """Compare the work log with the time entries logged in OpenProject."""
+    from reconcile import (
+        print_reconcile_table,
+        reconcile_entries,
+        summarize,
+        write_reconcile_csv,
+    )
+
+    print("\nOpenProject Work Log Reconciliation")
+    print("=" * 40)
+
+    parser, all_date_entries = parse_work_log(file_patterns)
+    if parser is None or not all_date_entries:
+        print("No valid time entries to reconcile.")
+        return False
+
+    start_date = min(all_date_entries)
+    end_date = max(all_date_entries)
+
+    with profile_phase("fetch"):
+        logger = OpenProjectTimeLogger(CONFIG["base_url"], CONFIG["api_token"])
+        logger.load_reference_data()
+
+        try:
+            remote_entries = logger.fetch_time_entries(start_date, end_date)
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching time entries: {e}")
+            return False
+
+    print(
+        f"Comparing {sum(len(entries) for entries in all_date_entries.values())} local entries "
+        f"with {len(remote_entries)} time entries from {start_date} to {end_date}\n"
+    )
+
+    with profile_phase("compare"):
+        rows = reconcile_entries(
+            all_date_entries, remote_entries, logger.reference_data
+        )
+
+    if csv_path:
+        write_reconcile_csv(rows, csv_path)
+        print(f"Wrote {len(rows)} rows to {csv_path}")
+    else:
+        print_reconcile_table(rows, show_all)
+
+    counts = summarize(rows)
+    print(
+        f"\n{counts['ok']} matching, {counts['missing']} missing, "
+        f"{counts['extra']} extra, {counts['mismatch']} hour mismatches"
+    )
+
+    return counts["missing"] == counts["extra"] == counts["mismatch"] == 0
+
+
+def get_history_file():
+    """Return the path of the work log history database."""
+    return CONFIG.get("history_file", "work_log_history.sqlite3")
+
+
+def archive_work_log(file_patterns=None):
+    """Add the parsed work log to the local history archive."""
+    from history import WorkLogHistory
+
+    parser, all_date_entries = parse_work_log(file_patterns)
+    if parser is None or not all_date_entries:
+        print("No valid time entries to archive.")
+        return False
+
+    with WorkLogHistory(get_history_file()) as history:
+        source = ", ".join(os.path.abspath(path) for path in parser.file_paths)
+        sources = {
+            date: os.path.abspath(path) for date, path in parser.date_sources.items()
+        }
+        count = history.archive(all_date_entries, source, sources)
+        total, first_date, last_date = history.summary()
+
+    print(f"✓ Archived {count} entries from {len(all_date_entries)} dates")
+    print(f"History now holds {total} entries from {first_date} to {last_date}")
+    return True
+
+
+def report_history(group_by, start_date=None, end_date=None, project=None):
+    """Print hour rollups from the local history archive."""
+    from history import WorkLogHistory
+
+    history_file = get_history_file()
+    if not os.path.exists(history_file):
+        print(f"No history found at {history_file}. Run 'python log.py archive' first.")
+        return False
+
+    with WorkLogHistory(history_file) as history:
+        try:
+            rows = history.report(group_by, start_date, end_date, project)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return False
+
+    if not rows:
+        print("No archived entries match.")
+        return True
+
+    widths = [
+        max(len(dimension), *(len(row[i]) for row in rows))
+        for i, dimension in enumerate(group_by)
+    ]
+    header = "  ".join(
+        dimension.upper().ljust(width) for dimension, width in zip(group_by, widths)
+    )
+    print(f"{header}  {'HOURS':>10}  {'ENTRIES':>8}")
+    print("-" * (len(header) + 22))
+    for row in rows:
+        labels = "  ".join(label.ljust(width) for label, width in zip(row, widths))
+        print(f"{labels}  {row[-2]:>10.2f}  {row[-1]:>8}")
+
+    print("-" * (len(header) + 22))
+    print(
+        f"{'TOTAL'.ljust(len(header))}  {sum(row[-2] for row in rows):>10.2f}  "
+        f"{sum(row[-1] for row in rows):>8}"
+    )
+    return True
+
+
+def build_arg_parser():
+    """Build the command line interface."""
+    arg_parser = argparse.ArgumentParser(
+        description="Log work time from a JSON work log file to OpenProject."
+    )
+    arg_parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=True,
+        metavar="PREFIX",
+        help="Profile the run and write PREFIX.pstats and PREFIX.txt (default prefix: profile-<command>-<time>)",
+    )
+    arg_parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Append a JSONL span for each processing stage to PATH",
+    )
+    add_cassette_arguments(arg_parser)
+    subparsers = arg_parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser(
+        "run", help="Interactively process the work log (default)"
+    )
+    run_parser.add_argument(
+        "files",
+        nargs="*",
+        help="Work log files, directories or glob patterns, including .json.gz (default: logs.json)",
+    )
+    run_parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Re-discover activities, statuses, types and projects",
+    )
+
+    validate_parser = subparsers.add_parser(
+        "validate", help="Check the work log file without contacting OpenProject"
+    )
+    validate_parser.add_argument(
+        "files",
+        nargs="*",
+        help="Work log files, directories or glob patterns, including .json.gz (default: logs.json)",
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch", help="Sync new or changed entries whenever the work log changes"
+    )
+    watch_parser.add_argument(
+        "file", nargs="?", help="Work log file (default: logs.json)"
+    )
+    watch_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between checks when inotify is unavailable (default: 1)",
+    )
+    watch_parser.add_argument(
+        "--mark-synced",
+        action="store_true",
+        help="Treat the current file contents as already synced",
+    )
+
+    reconcile_parser = subparsers.add_parser(
+        "reconcile", help="Compare the work log with time entries in OpenProject"
+    )
+    reconcile_parser.add_argument(
+        "files",
+        nargs="*",
+        help="Work log files, directories or glob patterns, including .json.gz (default: logs.json)",
+    )
+    reconcile_parser.add_argument(
+        "--csv", metavar="PATH", help="Write all rows to a CSV file instead"
+    )
+    reconcile_parser.add_argument(
+        "--all", action="store_true", help="Also show matching entries"
+    )
+
+    flush_parser = subparsers.add_parser(
+        "flush", help="Send writes saved while OpenProject was unreachable"
+    )
+    flush_parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Concurrent requests while flushing (default: 4)",
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run the local sync service for the browser extension and CLI"
+    )
+    serve_parser.add_argument(
+        "--host", help="Address to listen on (default: 127.0.0.1)"
+    )
+    serve_parser.add_argument(
+        "--port", type=int, help="Port to listen on (default: 8770)"
+    )
+    serve_parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Re-discover activities, statuses, types and projects",
+    )
+
+    submit_parser = subparsers.add_parser(
+        "submit", help="Send work log files to the running sync service"
+    )
+    submit_parser.add_argument(
+        "files",
+        nargs="*",
+        help="Work log files, directories or glob patterns (default: logs.json)",
+    )
+    submit_parser.add_argument("--url", help="Sync service URL")
+    submit_parser.add_argument(
+        "--start", help="Start time of the first entry of each date (e.g. 09:30)"
+    )
+    submit_parser.add_argument(
+        "--date",
+        dest="dates",
+        action="append",
+        metavar="YYYY-MM-DD",
+        help="Only submit this date (repeatable)",
+    )
+
+    backfill_parser = subparsers.add_parser(
+        "backfill", help="Backfill many work logs through a shared work queue"
+    )
+    backfill_parser.add_argument(
+        "--queue", help="Queue file (default: backfill_queue.sqlite3)"
+    )
+    backfill_subparsers = backfill_parser.add_subparsers(
+        dest="backfill_command", required=True
+    )
+    backfill_enqueue_parser = backfill_subparsers.add_parser(
+        "enqueue", help="Split work log files into (user, date) units"
+    )
+    backfill_enqueue_parser.add_argument(
+        "files",
+        nargs="*",
+        help="Work log files, directories or glob patterns, including .json.gz (default: logs.json)",
+    )
+    backfill_enqueue_parser.add_argument(
+        "--user", help="Owner of the units (default: the file's 'user' field or you)"
+    )
+    backfill_work_parser = backfill_subparsers.add_parser(
+        "work", help="Claim and process units until the queue is drained"
+    )
+    backfill_work_parser.add_argument(
+        "--workers", type=int, default=1, help="Worker processes (default: 1)"
+    )
+    backfill_work_parser.add_argument(
+        "--user", help="Only claim this user's units (default: you)"
+    )
+    backfill_work_parser.add_argument(
+        "--lease",
+        type=int,
+        help="Seconds a unit stays claimed without renewal (default: 300)",
+    )
+    backfill_status_parser = backfill_subparsers.add_parser(
+        "status", help="Show unit counts and failed units"
+    )
+    backfill_status_parser.add_argument("--user", help="Only show this user's units")
+    backfill_status_parser.add_argument(
+        "--retry", action="store_true", help="Re-queue failed units"
+    )
+
+    archive_parser = subparsers.add_parser(
+        "archive", help="Add the work log to the local history archive"
+    )
+    archive_parser.add_argument(
+        "files",
+        nargs="*",
+        help="Work log files, directories or glob patterns, including .json.gz (default: logs.json)",
+    )
+
+    report_parser = subparsers.add_parser(
+        "report", help="Show hour totals from the local history archive"
+    )
+    report_parser.add_argument(
+        "--by",
+        nargs="+",
+        default=["project"],
+        metavar="DIMENSION",
+        help="Group by project, activity, year, month, week or date (default: project)",
+    )
+    report_parser.add_argument(
+        "--from",
+        dest="start_date",
+        type=date.fromisoformat,
+        help="First date (YYYY-MM-DD)",
+    )
+    report_parser.add_argument(
+        "--to", dest="end_date", type=date.fromisoformat, help="Last date (YYYY-MM-DD)"
+    )
+    report_parser.add_argument("--project", help="Only include this project")
+
+    return arg_parser
+
+
+def add_cassette_arguments(arg_parser):
+    """Add the HTTP record and replay options to a command line parser."""
+    cassette_group = arg_parser.add_mutually_exclusive_group()
+    cassette_group.add_argument(
+        "--record",
+        metavar="PATH",
+        help="Save every API request and response of the run to a cassette file",
+    )
+    cassette_group.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="Answer API requests from a recorded cassette instead of the server",
+    )
+    arg_parser.add_argument(
+        "--replay-latency",
+        nargs="?",
+        type=float,
+        const=1.0,
+        default=0.0,
+        metavar="FACTOR",
+        help="With --replay, wait for the recorded latency times FACTOR (default: 1)",
+    )
+
+
+def cassette_context(args):
+    """Return the cassette context selected by --record or --replay."""
+    if not (args.record or args.replay):
+        return nullcontext()
+    from cassette import use_cassette
+
+    if args.record:
+        return use_cassette(args.record, "record", secrets=(CONFIG["api_token"],))
+    return use_cassette(args.replay, "replay", args.replay_latency)
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = build_arg_parser().parse_args(argv)
+
+    if args.trace:
+        set_trace_file(args.trace)
+
+    with cassette_context(args):
+        if args.profile:
+            from profiling import default_profile_prefix, profile_run
+
+            command = args.command or "run"
+            prefix = (
+                args.profile if isinstance(args.profile, str) else None
+            ) or default_profile_prefix(command)
+            with profile_run(prefix, f"log.py {command}"):
+                return run_command(args)
+
+        return run_command(args)
+
+
+def run_command(args):
+    """Run the command selected on the command line and return the exit code."""
+    if args.command == "validate":
+        return 0 if validate_work_log(args.files) else 1
+
+    if args.command == "watch":
+        return (
+            0 if watch_work_log(args.file, args.poll_interval, args.mark_synced) else 1
+        )
+
+    if args.command == "reconcile":
+        return 0 if reconcile_work_log(args.files, args.csv, args.all) else 1
+
+    if args.command == "flush":
+        return 0 if flush_work_log_spool(max_workers=args.workers) else 1
+
+    if args.command == "serve":
+        return 0 if serve_work_log(args.host, args.port, args.refresh_cache) else 1
+
+    if args.command == "submit":
+        return 0 if submit_work_log(args.files, args.url, args.start, args.dates) else 1
+
+    if args.command == "backfill":
+        if args.backfill_command == "enqueue":
+            ok = backfill_enqueue(args.files, args.user, args.queue)
+        elif args.backfill_command == "work":
+            ok = backfill_work(args.workers, args.user, args.lease, args.queue)
+        else:
+            ok = backfill_status(args.user, args.retry, args.queue)
+        return 0 if ok else 1
+
+    if args.command == "archive":
+        return 0 if archive_work_log(args.files) else 1
+
+    if args.command == "report":
+        return (
+            0
+            if report_history(args.by, args.start_date, args.end_date, args.project)
+            else 1
+        )
+
+    run_work_log(getattr(args, "files", None), getattr(args, "refresh_cache", False))
+    return 0
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Collection Pagination
+
+One engine for reading OpenProject collections. The first request asks for
+the largest page size the server is known to serve (probing with
+max_page_size the first time a collection is read), takes 'total' and the
+served page size from the answer, then fetches all remaining pages
+concurrently and yields their elements as each page arrives. OpenProject's
+'offset' parameter is a page number, not an element offset.
+"""
+
+import threading
+
+from config import CONFIG
+from sparse import collection_elements, decode_json, get_collection_page
+from tracing import in_current_context
+
+DEFAULT_MAX_PAGE_SIZE = 1000
+DEFAULT_PAGE_WORKERS = 8
+
+# Collection -> page size the server served when it capped a request
+_served_page_sizes = {}
+_served_page_sizes_lock = threading.Lock()
+
+
+def fetch_collection_page(
+    session, url, params, page, page_size, fields=None, collection=None, timeout=60
+):
+    """Fetch one decoded page, selecting only fields when they are given."""
+    params = dict(params or {}, pageSize=page_size, offset=page)
+    if fields:
+        return get_collection_page(session, url, params, fields, collection, timeout)
+    response = session.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return decode_json(response)
+
+
+def iter_collection(
+    session,
+    url,
+    params=None,
+    fields=None,
+    collection=None,
+    page_size=None,
+    max_workers=DEFAULT_PAGE_WORKERS,
+    timeout=60,
+):
+    """Yield every element of a collection, fetching pages after the first concurrently."""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    collection = collection or url
+    requested_size = (
+        page_size
+        or _served_page_sizes.get(collection)
+        or CONFIG.get("max_page_size", DEFAULT_MAX_PAGE_SIZE)
+    )
+
+    def fetch(page, size):
+        return fetch_collection_page(
+            session, url, params, page, size, fields, collection, timeout
+        )
+
+    first_page = fetch(1, requested_size)
+    elements = collection_elements(first_page)
+    total = first_page.get("total", len(elements))
+    yield from elements
+    if len(elements) >= total:
+        return
+
+    # The server caps pageSize at its own maximum; later pages must use the
+    # size it served so page numbers line up
+    served_size = first_page.get("pageSize") or len(elements)
+    if not served_size:
+        return
+    if served_size < requested_size:
+        with _served_page_sizes_lock:
+            _served_page_sizes[collection] = served_size
+
+    page_count = -(-total // served_size)
+    executor = ThreadPoolExecutor(max_workers=min(page_count - 1, max_workers))
+    fetch_in_context = in_current_context(fetch)
+    try:
+        futures = [
+            executor.submit(fetch_in_context, page, served_size)
+            for page in range(2, page_count + 1)
+        ]
+        for future in as_completed(futures):
+            yield from collection_elements(future.result())
+    finally:
+        # A consumer that stops early does not wait for pages it will not read
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Cross-Date Request Planning
+
+Before the first date of a work log is processed, the planner looks at every
+entry and works out the reads the whole run needs: one time entry query
+per run of nearby dates, one subject index per distinct project that gets new
+work packages, and the distinct work package IDs the entries reference,
+read through ID-filtered collection queries. The reads run concurrently up
+front and fill the logger's caches, so the per-date loop answers duplicate
+and subject checks without further requests. Handling each date on its own
+costs one time entry query per date plus one scan per project; the
+referenced work package check is not made there at all, so it is reported
+as an added read rather than a saving.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import in_current_context
+
+# IDs per filtered work package query, keeping the URL short
+WORK_PACKAGE_IDS_PER_READ = 100
+
+# Dates at most this many days apart share a time entry query, so a weekend
+# does not split a week while months between sparse dates are not downloaded
+MAX_DATE_GAP_DAYS = 3
+
+
+def date_runs(dates):
+    """Split sorted dates into (first, last) runs of nearby dates."""
+    runs = []
+    for date in dates:
+        if runs and (date - runs[-1][1]).days <= MAX_DATE_GAP_DAYS:
+            runs[-1][1] = date
+        else:
+            runs.append([date, date])
+    return [tuple(run) for run in runs]
+
+
+class RequestPlan:
+    """The reads needed for a set of dated work log entries."""
+
+    def __init__(self, dates, project_ids, work_package_ids, per_date_reads):
+        self.dates = dates  # Dates whose time entries are not cached yet
+        self.project_ids = project_ids
+        self.work_package_ids = work_package_ids
+        self.per_date_reads = per_date_reads
+
+    @property
+    def work_package_chunks(self):
+        ids = self.work_package_ids
+        return [
+            ids[start : start + WORK_PACKAGE_IDS_PER_READ]
+            for start in range(0, len(ids), WORK_PACKAGE_IDS_PER_READ)
+        ]
+
+    @property
+    def date_runs(self):
+        return date_runs(self.dates)
+
+    @property
+    def reads(self):
+        """Reads replacing those of the per-date loop."""
+        return len(self.date_runs) + len(self.project_ids)
+
+    @property
+    def check_reads(self):
+        """Added reads checking that referenced work packages exist."""
+        return len(self.work_package_chunks)
+
+    def describe(self):
+        """Return a one-line summary of the plan."""
+        summary = (
+            f"Planned {self.reads} API reads instead of {self.per_date_reads}: "
+            f"time entries for {len(self.dates)} dates in "
+            f"{len(self.date_runs)} range queries, "
+            f"{len(self.project_ids)} project scans"
+        )
+        if self.check_reads:
+            summary += (
+                f", plus {self.check_reads} to check "
+                f"{len(self.work_package_ids)} referenced work packages"
+            )
+        return summary
+
+
+def entry_needs(logger, entry):
+    """Return (project ID to scan or None, referenced work package ID or None)."""
+    if entry.get("create_new_task") and not entry.get("is_scrum"):
+        project_id = entry.get("project_id") or logger.reference_data.project_id(
+            entry["project"]
+        )
+        return project_id, None
+    return None, entry.get("work_package_id")
+
+
+def build_plan(logger, all_date_entries):
+    """Collect the distinct reads needed by every date of a work log."""
+    project_ids = {}
+    work_package_ids = {}
+    dates = []
+
+    for date, entries in all_date_entries.items():
+        if entries and date.isoformat() not in logger.time_entries_by_date:
+            dates.append(date)
+        for entry in entries:
+            project_id, work_package_id = entry_needs(logger, entry)
+            # Subject indexes are kept for the session, so each project is
+            # scanned once either way
+            if project_id and project_id not in logger.subject_indexes:
+                project_ids[project_id] = None
+            if work_package_id:
+                work_package_ids[work_package_id] = None
+
+    # Per date: one time entry query per uncached date, and each project once
+    per_date_reads = len(dates) + len(project_ids)
+    return RequestPlan(
+        sorted(dates),
+        list(project_ids),
+        sorted(work_package_ids),
+        per_date_reads,
+    )
+
+
+def run_plan(logger, plan, max_workers=None):
+    """Run a plan's reads concurrently and fill the logger's caches.
+
+    Returns the referenced work package IDs that do not exist, or None if
+    they could not be checked. Reads that fail are left to the per-date
+    lookups.
+    """
+    from requests.exceptions import RequestException
+
+    max_workers = max_workers or max(1, min(plan.reads + plan.check_reads, 8))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        time_entries = {
+            (first, last): executor.submit(
+                in_current_context(logger.fetch_time_entries), first, last
+            )
+            for first, last in plan.date_runs
+        }
+        indexes = {
+            project_id: executor.submit(
+                in_current_context(logger.build_subject_index), project_id
+            )
+            for project_id in plan.project_ids
+        }
+        work_package_reads = [
+            executor.submit(in_current_context(logger.fetch_work_packages), chunk)
+            for chunk in plan.work_package_chunks
+        ]
+
+        # Results are stored on this thread; the workers never touch the caches
+        for (first, last), future in time_entries.items():
+            try:
+                rows = future.result()
+            except RequestException as e:
+                print(f"Warning: Could not read time entries up front: {e}")
+                continue
+            by_date = {
+                date.isoformat(): [] for date in plan.dates if first <= date <= last
+            }
+            for row in rows:
+                if row.spent_on in by_date:
+                    by_date[row.spent_on].append(row)
+            logger.time_entries_by_date.update(by_date)
+
+        for project_id, future in indexes.items():
+            try:
+                logger.subject_indexes[project_id] = future.result()
+            except RequestException as e:
+                print(f"Warning: Could not scan project {project_id} up front: {e}")
+
+        found = set()
+        try:
+            for future in work_package_reads:
+                found.update(row.id for row in future.result())
+        except RequestException as e:
+            print(f"Warning: Could not check referenced work packages: {e}")
+            return None
+
+    return [
+        work_package_id
+        for work_package_id in plan.work_package_ids
+        if int(work_package_id) not in found
+    ]
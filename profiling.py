@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Run Profiling
+
+'--profile' runs a command under cProfile, or the pyinstrument sampling
+profiler when it is installed, with tracemalloc tracking memory. Code marks
+its phases (parse, analysis, apply, ...) with profile_phase(); each phase
+records wall time, CPU time and peak traced memory. When the run ends three
+files are written next to the given prefix: a pstats file for snakeviz or
+'python -m pstats', a text report with the phase table, own time grouped
+into categories (network, JSON, datetime, imports, waiting on threads or
+for input) and the hottest functions, and the sampling profiler's call tree
+when it was used.
+"""
+
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+HOT_FUNCTION_COUNT = 30
+MIB = 1024 * 1024
+
+# Own time of functions is grouped by the first category whose pattern
+# appears in "file:function"; order matters, e.g. JSON before network
+TIME_CATEGORIES = (
+    ("waiting for input", ("builtins.input",)),
+    ("waiting on threads", ("_thread.lock", "threading.py", "concurrent/futures")),
+    ("JSON decoding", ("json", "orjson")),
+    ("datetime arithmetic", ("datetime", "_strptime", "dateutil")),
+    ("SQLite", ("sqlite3",)),
+    ("imports", ("importlib", "marshal.loads", "_imp.", "builtins.compile", "/re/_")),
+    ("network", ("socket", "ssl", "http/client", "urllib3", "selectors")),
+)
+
+_active_profile = None
+
+
+class PhaseStats:
+    """Accumulated numbers of one named phase."""
+
+    def __init__(self):
+        self.runs = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak = 0
+        self.net = 0
+
+
+class RunProfile:
+    """Profiles one command run and writes its reports."""
+
+    def __init__(self, prefix, label):
+        self.prefix = prefix
+        self.label = label
+        self.phases = {}
+        self.profiler = None
+        self.sampler = None
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak = 0
+        # Peaks read before each reset_peak(), for the run and the open phases
+        self.open_peaks = []
+
+    def _reset_peak(self):
+        """Reset the traced peak, keeping the old one for the run and open phases."""
+        import tracemalloc
+
+        peak = tracemalloc.get_traced_memory()[1]
+        self.peak = max(self.peak, peak)
+        self.open_peaks = [max(open_peak, peak) for open_peak in self.open_peaks]
+        tracemalloc.reset_peak()
+
+    def start(self):
+        import tracemalloc
+
+        tracemalloc.start()
+        try:
+            import pyinstrument
+        except ImportError:
+            pyinstrument = None
+
+        if pyinstrument is not None:
+            self.sampler = pyinstrument.Profiler(interval=0.001)
+            self.sampler.start()
+        else:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.started = (time.perf_counter(), time.process_time())
+
+    def stop(self):
+        import tracemalloc
+
+        if self.sampler is not None:
+            self.sampler.stop()
+        else:
+            self.profiler.disable()
+        self.wall = time.perf_counter() - self.started[0]
+        self.cpu = time.process_time() - self.started[1]
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name):
+        import tracemalloc
+
+        stats = self.phases.setdefault(name, PhaseStats())
+        self._reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        self.open_peaks.append(0)
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            # Nested phases may have reset the peak since this one began
+            peak = max(peak, self.open_peaks.pop())
+            stats.runs += 1
+            stats.wall += time.perf_counter() - start_wall
+            stats.cpu += time.process_time() - start_cpu
+            stats.peak = max(stats.peak, peak)
+            stats.net += current - start_memory
+
+    def write_pstats(self):
+        """Write the pstats file and return its path, or None."""
+        path = f"{self.prefix}.pstats"
+        if self.profiler is not None:
+            self.profiler.dump_stats(path)
+            return path
+
+        try:
+            from pyinstrument.renderers import PstatsRenderer
+
+            data = PstatsRenderer().render(self.sampler.last_session)
+        except Exception as e:
+            print(f"Warning: Could not write pstats from the sampling profile: {e}")
+            return None
+        with open(path, "wb") as file:
+            file.write(data if isinstance(data, bytes) else data.encode("latin-1"))
+        return path
+
+    def write_reports(self):
+        """Write all report files and return their paths."""
+        directory = os.path.dirname(self.prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        paths = []
+        pstats_path = self.write_pstats()
+        if pstats_path:
+            paths.append(pstats_path)
+
+        if self.sampler is not None:
+            tree_path = f"{self.prefix}.calltree.txt"
+            with open(tree_path, "w", encoding="utf-8") as file:
+                file.write(self.sampler.output_text(unicode=True, color=False))
+            paths.append(tree_path)
+
+        report_path = f"{self.prefix}.txt"
+        with open(report_path, "w", encoding="utf-8") as file:
+            file.write(self.format_report(pstats_path))
+        paths.append(report_path)
+        return paths
+
+    def format_report(self, pstats_path):
+        engine = "pyinstrument" if self.sampler is not None else "cProfile"
+        lines = [
+            f"Profile of {self.label} ({engine})",
+            f"{self.wall:.3f} s wall, {self.cpu:.3f} s CPU, "
+            f"{self.peak / MIB:.1f} MiB peak traced memory",
+            f"{engine} only sees the main thread: network time of the prefetch "
+            "and pagination threads shows up as 'waiting on threads'",
+            "",
+            "Phases",
+            f"  {'phase':<16}{'runs':>6}{'wall s':>10}{'cpu s':>10}"
+            f"{'peak MiB':>10}{'net MiB':>10}",
+        ]
+        for name, stats in self.phases.items():
+            lines.append(
+                f"  {name:<16}{stats.runs:>6}{stats.wall:>10.3f}{stats.cpu:>10.3f}"
+                f"{stats.peak / MIB:>10.1f}{stats.net / MIB:>10.1f}"
+            )
+        if not self.phases:
+            lines.append("  (no phases marked)")
+
+        if pstats_path:
+            import pstats
+
+            stats = pstats.Stats(pstats_path)
+            lines += ["", "Own time by category"]
+            for category, seconds in categorize(stats):
+                lines.append(f"  {category:<22}{seconds:>10.3f} s")
+            lines += ["", "Hot functions by own time"]
+            lines += hot_functions(stats, sort_index=2)
+            lines += ["", "Hot functions by cumulative time"]
+            lines += hot_functions(stats, sort_index=3)
+
+        return "\n".join(lines) + "\n"
+
+
+def function_label(function):
+    """Return 'file:line(function)' of a pstats function key."""
+    file_name, line, name = function
+    if file_name == "~":
+        return name
+    return f"{file_name}:{line}({name})"
+
+
+def categorize(stats):
+    """Return (category, own seconds) pairs, largest first."""
+    totals = {}
+    for function, (_, _, own_time, _, _) in stats.stats.items():
+        key = f"{function[0]}:{function[2]}"
+        category = next(
+            (
+                name
+                for name, patterns in TIME_CATEGORIES
+                if any(pattern in key for pattern in patterns)
+            ),
+            "other Python",
+        )
+        totals[category] = totals.get(category, 0.0) + own_time
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def hot_functions(stats, sort_index, count=HOT_FUNCTION_COUNT):
+    """Return report lines of the functions with the most own or cumulative time."""
+    rows = sorted(
+        stats.stats.items(), key=lambda item: item[1][sort_index], reverse=True
+    )[:count]
+    lines = [f"  {'own s':>9}{'cum s':>9}{'calls':>10}  function"]
+    for function, (_, calls, own_time, cumulative_time, _) in rows:
+        lines.append(
+            f"  {own_time:>9.3f}{cumulative_time:>9.3f}{calls:>10}  {function_label(function)}"
+        )
+    return lines
+
+
+def default_profile_prefix(name):
+    """Return a timestamped report prefix for a profiled command."""
+    return f"profile-{name}-{time.strftime('%Y%m%d-%H%M%S')}"
+
+
+@contextmanager
+def profile_run(prefix, label):
+    """Profile the enclosed run and write its reports when it ends."""
+    global _active_profile
+    run_profile = RunProfile(prefix, label)
+    _active_profile = run_profile
+    run_profile.start()
+    try:
+        yield run_profile
+    finally:
+        run_profile.stop()
+        _active_profile = None
+        paths = run_profile.write_reports()
+        print(f"\nProfile written to {', '.join(paths)}")
+
+
+def profile_phase(name):
+    """Mark a phase of the run being profiled; does nothing otherwise."""
+    if _active_profile is None:
+        return nullcontext()
+    return _active_profile.phase(name)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+OpenProject Request Rate Limiting
+
+Keeps parallel requests from overwhelming the OpenProject server. Every
+request to a host takes a token from a token bucket shared by all sessions in
+the process (steady rate plus a burst allowance) and a slot from an AIMD
+concurrency controller. The controller halves the number of requests in
+flight when the server answers 429 or 5xx, fails, or slows down well past its
+usual latency, and adds roughly one slot per round of healthy responses.
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+from config import CONFIG
+
+DEFAULT_REQUESTS_PER_SECOND = 10
+DEFAULT_BURST = 20
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_INITIAL_CONCURRENCY = 4
+
+# Smoothing of the latency average, how far above its best value it may rise
+# before the server counts as congested, and how fast that best value is
+# forgotten so long sessions follow a server whose normal speed changes
+LATENCY_SMOOTHING = 0.2
+LATENCY_CONGESTION_FACTOR = 2.0
+BEST_LATENCY_DRIFT = 1.01
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing rate requests per second with bursts."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hand out no tokens for the given number of seconds."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class AIMDController:
+    """Limits requests in flight, adapting the limit to how the server copes."""
+
+    def __init__(
+        self,
+        initial=DEFAULT_INITIAL_CONCURRENCY,
+        minimum=1,
+        maximum=DEFAULT_MAX_CONCURRENCY,
+        decrease_factor=0.5,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.latency = None  # Smoothed response time in seconds
+        self.best_latency = None
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Block until the number of requests in flight is below the limit."""
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency, overloaded):
+        """Record the outcome of a request and adjust the limit."""
+        with self.condition:
+            self.in_flight -= 1
+
+            if not overloaded:
+                self.latency = (
+                    latency
+                    if self.latency is None
+                    else self.latency + LATENCY_SMOOTHING * (latency - self.latency)
+                )
+                self.best_latency = (
+                    self.latency
+                    if self.best_latency is None
+                    else min(self.best_latency * BEST_LATENCY_DRIFT, self.latency)
+                )
+                overloaded = (
+                    self.latency > self.best_latency * LATENCY_CONGESTION_FACTOR
+                )
+
+            if overloaded:
+                # Back off at most once per round trip, so one burst of bad
+                # responses does not collapse the limit to the minimum
+                now = time.monotonic()
+                if now - self.last_decrease >= (self.latency or latency):
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+            self.condition.notify_all()
+
+
+class HostLimiter:
+    """Token bucket and concurrency controller shared by all requests to one host."""
+
+    def __init__(self, requests_per_second, burst, max_concurrency):
+        self.bucket = (
+            TokenBucket(requests_per_second, burst) if requests_per_second else None
+        )
+        self.concurrency = AIMDController(
+            initial=min(DEFAULT_INITIAL_CONCURRENCY, max_concurrency),
+            maximum=max_concurrency,
+        )
+        self.throttled = 0  # Responses that were 429 or 5xx
+
+    def before_request(self):
+        if self.bucket is not None:
+            self.bucket.acquire()
+        self.concurrency.acquire()
+
+    def after_request(self, latency, response):
+        overloaded = response is None or (
+            response.status_code == 429 or response.status_code >= 500
+        )
+        if overloaded:
+            self.throttled += 1
+        if response is not None and response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit() and self.bucket is not None:
+                self.bucket.pause(int(retry_after))
+        self.concurrency.release(latency, overloaded)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTP adapter that sends every request through a HostLimiter."""
+
+    def __init__(self, limiter, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+
+    def send(self, request, **kwargs):
+        self.limiter.before_request()
+        start = time.monotonic()
+        response = None
+        try:
+            response = super().send(request, **kwargs)
+            return response
+        finally:
+            self.limiter.after_request(time.monotonic() - start, response)
+
+
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+
+
+def get_host_limiter(base_url):
+    """Return the limiter shared by every session talking to the URL's host."""
+    host = urlsplit(base_url).netloc
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(host)
+        if limiter is None:
+            limiter = HostLimiter(
+                CONFIG.get("requests_per_second", DEFAULT_REQUESTS_PER_SECOND),
+                CONFIG.get("request_burst", DEFAULT_BURST),
+                CONFIG.get("max_concurrent_requests", DEFAULT_MAX_CONCURRENCY),
+            )
+            _host_limiters[host] = limiter
+        return limiter
+
+
+def mount_rate_limiter(session, base_url):
+    """Route a session's requests to base_url through the host's limiter."""
+    limiter = get_host_limiter(base_url)
+    session.mount(
+        base_url.rstrip("/") + "/",
+        RateLimitedAdapter(limiter, pool_maxsize=max(10, limiter.concurrency.maximum)),
+    )
+    return limiter
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Work Log Reconciliation
+
+Compares parsed work log entries with the time entries that exist in
+OpenProject. Both sides are keyed by (date, work package, activity), sorted
+and merge-joined, producing one row per key that is missing remotely, extra
+remotely, or logged with different hours.
+"""
+
+import csv
+import re
+
+ISO_DURATION_PATTERN = re.compile(
+    r"^P(?:(?P<days>[\d.]+)D)?(?:T(?:(?P<hours>[\d.]+)H)?(?:(?P<minutes>[\d.]+)M)?(?:(?P<seconds>[\d.]+)S)?)?$"
+)
+
+# Hours closer than this are considered equal
+HOURS_TOLERANCE = 0.01
+
+RECONCILE_COLUMNS = [
+    "status",
+    "date",
+    "work_package",
+    "activity",
+    "subject",
+    "local_hours",
+    "remote_hours",
+]
+
+
+def parse_iso_duration(duration):
+    """Convert an ISO 8601 duration such as 'PT1H30M' to hours."""
+    match = ISO_DURATION_PATTERN.match(duration or "")
+    if not match:
+        return 0.0
+    parts = {name: float(value) for name, value in match.groupdict(0).items()}
+    return (
+        parts["days"] * 24
+        + parts["hours"]
+        + parts["minutes"] / 60
+        + parts["seconds"] / 3600
+    )
+
+
+def remote_entry_row(entry):
+    """Project a time entry row onto the fields used for reconciliation."""
+    return {
+        "date": entry.spent_on,
+        "work_package_id": entry.work_package_id,
+        "subject": entry.work_package_title,
+        "activity_href": entry.activity_href,
+        "activity": entry.activity_title,
+        "hours": parse_iso_duration(entry.hours),
+    }
+
+
+def reconcile_entries(all_date_entries, remote_entries, reference_data):
+    """Merge-join local and remote entries and return the difference rows."""
+    remote_rows = [remote_entry_row(entry) for entry in remote_entries]
+
+    # Entries that create work packages have no ID locally; the remote work
+    # package link title carries the subject they were created with
+    ids_by_subject = {}
+    for row in remote_rows:
+        if row["work_package_id"] and row["subject"]:
+            ids_by_subject.setdefault(
+                row["subject"].strip().lower(), row["work_package_id"]
+            )
+
+    activity_names = {}
+    local = {}
+    for date, entries in all_date_entries.items():
+        for entry in entries:
+            work_package_id = entry.get("work_package_id") or ids_by_subject.get(
+                entry["subject"].strip().lower()
+            )
+            activity_href = reference_data.activity_href(entry["activity"])
+            activity_names[activity_href] = entry["activity"]
+            work_package_key = (
+                work_package_id
+                if work_package_id
+                else f"new: {entry['subject'].strip().lower()}"
+            )
+            key = (date.isoformat(), str(work_package_key), activity_href or "")
+            row = local.setdefault(
+                key, {"hours": 0.0, "subject": entry["subject"], "id": work_package_id}
+            )
+            row["hours"] += entry["hours"]
+
+    remote = {}
+    for row in remote_rows:
+        key = (row["date"], str(row["work_package_id"]), row["activity_href"] or "")
+        activity_names.setdefault(row["activity_href"], row["activity"])
+        merged = remote.setdefault(
+            key, {"hours": 0.0, "subject": row["subject"], "id": row["work_package_id"]}
+        )
+        merged["hours"] += row["hours"]
+
+    local_keys = sorted(local)
+    remote_keys = sorted(remote)
+    rows = []
+    i = j = 0
+
+    def make_row(status, key, local_row, remote_row):
+        source = local_row or remote_row
+        return {
+            "status": status,
+            "date": key[0],
+            "work_package": source["id"] or "",
+            "activity": activity_names.get(key[2]) or key[2],
+            "subject": source["subject"],
+            "local_hours": round(local_row["hours"], 2) if local_row else "",
+            "remote_hours": round(remote_row["hours"], 2) if remote_row else "",
+        }
+
+    while i < len(local_keys) or j < len(remote_keys):
+        local_key = local_keys[i] if i < len(local_keys) else None
+        remote_key = remote_keys[j] if j < len(remote_keys) else None
+
+        if remote_key is None or (local_key is not None and local_key < remote_key):
+            rows.append(make_row("missing", local_key, local[local_key], None))
+            i += 1
+        elif local_key is None or remote_key < local_key:
+            rows.append(make_row("extra", remote_key, None, remote[remote_key]))
+            j += 1
+        else:
+            local_row = local[local_key]
+            remote_row = remote[remote_key]
+            status = (
+                "ok"
+                if abs(local_row["hours"] - remote_row["hours"]) <= HOURS_TOLERANCE
+                else "mismatch"
+            )
+            rows.append(make_row(status, local_key, local_row, remote_row))
+            i += 1
+            j += 1
+
+    return rows
+
+
+def print_reconcile_table(rows, show_all=False):
+    """Print reconciliation rows as a table."""
+    visible = [row for row in rows if show_all or row["status"] != "ok"]
+
+    if not visible:
+        print("✓ logs.json and OpenProject agree")
+        return
+
+    print(
+        f"{'STATUS':<9} {'DATE':<10} {'WP':>6} {'ACTIVITY':<14} {'LOCAL':>6} {'REMOTE':>6}  SUBJECT"
+    )
+    print("-" * 100)
+    for row in visible:
+        print(
+            f"{row['status']:<9} {row['date']:<10} {row['work_package']!s:>6} "
+            f"{row['activity'][:14]:<14} {row['local_hours']!s:>6} "
+            f"{row['remote_hours']!s:>6}  {row['subject'][:50]}"
+        )
+
+
+def write_reconcile_csv(rows, file_path):
+    """Write reconciliation rows to a CSV file."""
+    with open(file_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=RECONCILE_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def summarize(rows):
+    """Count rows per status."""
+    counts = {"ok": 0, "missing": 0, "extra": 0, "mismatch": 0}
+    for row in rows:
+        counts[row["status"]] += 1
+    return counts
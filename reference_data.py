@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+OpenProject Reference Data
+
+Discovers activities, statuses, types and projects from the OpenProject API
+and keeps name to href lookup tables for them. The collections are fetched
+concurrently once and cached on disk, so later runs start without any
+reference data requests until the cache expires.
+"""
+
+import json
+import os
+import time
+from config import (
+    CONFIG,
+    PROJECT_MAPPINGS,
+    ACTIVITY_MAPPINGS,
+)
+
+REFERENCE_ENDPOINTS = {
+    "activities": "/api/v3/time_entries/activities",
+    "statuses": "/api/v3/statuses",
+    "types": "/api/v3/types",
+    "projects": "/api/v3/projects",
+}
+
+# Used when the server does not expose a collection (the activities endpoint
+# returns 404 on many instances) and before anything has been discovered.
+DEFAULT_STATUSES = [
+    (1, "New"),
+    (2, "To Do"),
+    (7, "In Progress"),
+    (11, "Developed"),
+    (12, "Closed"),
+    (13, "Rejected"),
+    (14, "On Hold"),
+]
+DEFAULT_TYPES = [(1, "Task")]
+DEFAULT_STATUS_NAME = "In Progress"
+DEFAULT_TYPE_NAME = "Task"
+
+CACHE_FILE_NAME = "reference_data.json"
+
+
+def get_cache_dir():
+    """Return the directory used for local caches."""
+    return CONFIG.get("cache_dir", ".openproject_cache")
+
+
+def get_project_mappings_file():
+    """Return the path of the discovered project mappings file."""
+    return CONFIG.get("project_mappings_file", "project_mappings.json")
+
+
+def load_project_mappings(file_path=None):
+    """Return the discovered project mappings with config.py entries taking precedence."""
+    file_path = file_path or get_project_mappings_file()
+    mappings = {}
+
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        mappings.update(
+            (name, int(project_id))
+            for name, project_id in data.get("mappings", {}).items()
+        )
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, AttributeError, TypeError) as e:
+        print(f"Warning: Could not load project mappings from {file_path}: {e}")
+
+    mappings.update(PROJECT_MAPPINGS)
+    return mappings
+
+
+def href_id(href):
+    """Return the trailing numeric ID of an API href, or None."""
+    if not href:
+        return None
+    tail = href.rstrip("/").rsplit("/", 1)[-1]
+    return int(tail) if tail.isdigit() else None
+
+
+class ReferenceData:
+    """Name to href lookup tables for activities, statuses, types and projects."""
+
+    def __init__(self, collections=None):
+        collections = collections or {}
+
+        self.activities = self._build_table(
+            collections.get("activities"),
+            ACTIVITY_MAPPINGS.items(),
+            "/api/v3/time_entries/activities",
+            aliases=True,
+        )
+        self.statuses = self._build_table(
+            collections.get("statuses"),
+            ((name, status_id) for status_id, name in DEFAULT_STATUSES),
+            "/api/v3/statuses",
+        )
+        self.types = self._build_table(
+            collections.get("types"),
+            ((name, type_id) for type_id, name in DEFAULT_TYPES),
+            "/api/v3/types",
+        )
+        self.projects = self._build_table(
+            collections.get("projects"),
+            load_project_mappings().items(),
+            "/api/v3/projects",
+            aliases=True,
+        )
+
+        # Discovered projects are also reachable by their identifier, which is
+        # how test_api.py suggests PROJECT_MAPPINGS keys.
+        for element in collections.get("projects") or []:
+            identifier = element.get("identifier")
+            if identifier:
+                self.projects.setdefault(
+                    identifier.lower(),
+                    self._element_entry(element, "/api/v3/projects"),
+                )
+
+        # Ordered (id, name) pairs for prompts and display
+        self.status_choices = [
+            (entry["id"], entry["name"])
+            for entry in sorted(
+                {entry["id"]: entry for entry in self.statuses.values()}.values(),
+                key=lambda entry: entry.get("position", entry["id"]),
+            )
+        ]
+        self.status_names = dict(self.status_choices)
+
+    @staticmethod
+    def _element_entry(element, base_href):
+        """Build a lookup entry from a HAL collection element."""
+        href = element.get("_links", {}).get("self", {}).get("href")
+        element_id = element.get("id")
+        if href is None and element_id is not None:
+            href = f"{base_href}/{element_id}"
+        return {
+            "id": element_id if element_id is not None else href_id(href),
+            "name": element.get("name", ""),
+            "href": href,
+            "position": element.get("position", element_id),
+        }
+
+    def _build_table(self, elements, fallback_pairs, base_href, aliases=False):
+        """Build a lowercase name lookup table, preferring discovered elements.
+
+        The fallback pairs are used only when nothing was discovered, except
+        that names the user configured (aliases=True) stay usable and resolve
+        to the discovered element with their ID.
+        """
+        table = {}
+
+        if elements:
+            by_id = {}
+            for element in elements:
+                entry = self._element_entry(element, base_href)
+                if entry["name"] and entry["href"]:
+                    table[entry["name"].lower()] = entry
+                    by_id[entry["id"]] = entry
+            if aliases:
+                # A configured ID the (possibly cached) discovery lacks is
+                # still the user's explicit setting
+                for name, item_id in fallback_pairs:
+                    table.setdefault(
+                        name.lower(),
+                        by_id.get(item_id)
+                        or {
+                            "id": item_id,
+                            "name": name,
+                            "href": f"{base_href}/{item_id}",
+                        },
+                    )
+        else:
+            for position, (name, item_id) in enumerate(fallback_pairs):
+                table[name.lower()] = {
+                    "id": item_id,
+                    "name": name,
+                    "href": f"{base_href}/{item_id}",
+                    "position": position,
+                }
+
+        return table
+
+    def update_project(self, element, removed=False):
+        """Add, rename or remove one discovered project in the lookup table."""
+        entry = self._element_entry(element, "/api/v3/projects")
+        # Names from the project mappings keep pointing at their IDs
+        mapped = {name.lower() for name in load_project_mappings()}
+        for key in [
+            key
+            for key, existing in self.projects.items()
+            if existing["id"] == entry["id"] and key not in mapped
+        ]:
+            del self.projects[key]
+        if removed:
+            return
+
+        if entry["name"]:
+            self.projects[entry["name"].lower()] = entry
+        identifier = element.get("identifier")
+        if identifier:
+            self.projects.setdefault(identifier.lower(), entry)
+
+    def activity_href(self, activity_name):
+        """Return the href of a time entry activity, or None if unknown."""
+        entry = self.activities.get((activity_name or "").lower())
+        return entry["href"] if entry else None
+
+    def status_href(self, status_id):
+        """Return the href of a status ID."""
+        for entry in self.statuses.values():
+            if entry["id"] == status_id:
+                return entry["href"]
+        return f"/api/v3/statuses/{status_id}"
+
+    def status_id(self, status_name):
+        """Return the ID of a status name, or None if unknown."""
+        entry = self.statuses.get((status_name or "").lower())
+        return entry["id"] if entry else None
+
+    def type_href(self, type_name):
+        """Return the href of a work package type, falling back to the first known type."""
+        entry = self.types.get((type_name or "").lower())
+        if entry is None:
+            entry = self.types.get(DEFAULT_TYPE_NAME.lower()) or next(
+                iter(self.types.values())
+            )
+        return entry["href"]
+
+    def project_id(self, project_name):
+        """Return the ID of a project by mapping key, identifier or name."""
+        entry = self.projects.get((project_name or "").lower())
+        return entry["id"] if entry else None
+
+    @classmethod
+    def from_config(cls):
+        """Build lookup tables from config.py only, without network access."""
+        return cls()
+
+    @classmethod
+    def load(cls, session, base_url, ttl_hours=None, refresh=False):
+        """Load reference data from the disk cache or fetch it concurrently."""
+        if ttl_hours is None:
+            ttl_hours = CONFIG.get("reference_data_ttl_hours", 24)
+
+        cache_path = os.path.join(get_cache_dir(), CACHE_FILE_NAME)
+
+        if not refresh:
+            collections = cls._read_cache(cache_path, base_url, ttl_hours)
+            if collections is not None:
+                return cls(collections)
+
+        collections = cls.fetch(session, base_url)
+        failed = set(REFERENCE_ENDPOINTS) - set(collections)
+        if failed:
+            # Not cached, so the next run fetches everything again; until then
+            # the failed collections keep their last cached value, however old
+            previous = cls._read_cache(cache_path, base_url, ttl_hours=None) or {}
+            for name in failed:
+                if previous.get(name) is not None:
+                    collections[name] = previous[name]
+        elif any(collections.values()):
+            cls._write_cache(cache_path, base_url, collections)
+        return cls(collections)
+
+    @staticmethod
+    def fetch(session, base_url):
+        """Fetch all reference collections in one parallel burst.
+
+        A collection the server does not expose is None; one that failed to
+        load, e.g. on a timeout, is left out.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        from requests.exceptions import HTTPError
+
+        from pagination import iter_collection
+
+        failed = object()
+
+        def fetch_collection(endpoint):
+            try:
+                return list(
+                    iter_collection(session, f"{base_url}{endpoint}", timeout=30)
+                )
+            except HTTPError as e:
+                # Not every instance exposes every collection
+                if e.response is not None and e.response.status_code in (403, 404):
+                    return None
+                print(f"Warning: Could not load {endpoint}: {e}")
+                return failed
+            except Exception as e:
+                print(f"Warning: Could not load {endpoint}: {e}")
+                return failed
+
+        with ThreadPoolExecutor(max_workers=len(REFERENCE_ENDPOINTS)) as executor:
+            futures = {
+                name: executor.submit(fetch_collection, endpoint)
+                for name, endpoint in REFERENCE_ENDPOINTS.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+        return {
+            name: result for name, result in results.items() if result is not failed
+        }
+
+    @classmethod
+    def update_cached_project(cls, base_url, element, removed=False):
+        """Add, replace or remove one project in the disk cache.
+
+        The cache keeps its age, so the other collections still expire.
+        Returns False when there is no cache for this server.
+        """
+        cache_path = os.path.join(get_cache_dir(), CACHE_FILE_NAME)
+        try:
+            with open(cache_path, "r", encoding="utf-8") as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return False
+        collections = cached.get("collections")
+        if cached.get("base_url") != base_url or not isinstance(collections, dict):
+            return False
+
+        projects = [
+            project
+            for project in collections.get("projects") or []
+            if project.get("id") != element.get("id")
+        ]
+        if not removed:
+            projects.append(element)
+        collections["projects"] = projects
+        cls._write_cache(cache_path, base_url, collections, cached.get("fetched_at", 0))
+        return True
+
+    @staticmethod
+    def _read_cache(cache_path, base_url, ttl_hours):
+        """Return cached collections if they are for this server and fresh.
+
+        ttl_hours=None accepts a cache of any age.
+        """
+        try:
+            with open(cache_path, "r", encoding="utf-8") as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if cached.get("base_url") != base_url:
+            return None
+        if (
+            ttl_hours is not None
+            and time.time() - cached.get("fetched_at", 0) > ttl_hours * 3600
+        ):
+            return None
+
+        return cached.get("collections")
+
+    @staticmethod
+    def _write_cache(cache_path, base_url, collections, fetched_at=None):
+        """Write fetched collections to the disk cache."""
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "base_url": base_url,
+                        "fetched_at": fetched_at or time.time(),
+                        "collections": collections,
+                    },
+                    file,
+                )
+        except OSError as e:
+            print(f"Warning: Could not write reference data cache: {e}")
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Local Sync Service
+
+A small HTTP service on localhost that keeps one OpenProjectTimeLogger alive
+between submissions, so reference data, project subject indexes and pooled
+connections stay warm. The Chrome extension and 'python log.py submit' send
+work log documents to it and get structured per-entry results back; a
+repeated submission only costs the write calls plus one time entry lookup
+per date.
+
+Endpoints (JSON in and out):
+    GET  /status     service and cache state
+    GET  /reference  statuses, activities and projects
+    POST /analyze    what a submission would create, reuse or skip
+    POST /submit     create work packages and time entries
+    POST /refresh    reload reference data and drop project indexes
+    POST /webhook    OpenProject webhook events that update the caches
+
+With webhook_secret set, OpenProject's signed webhooks keep the caches up
+to date, so time entries looked up for a date are also kept between
+submissions instead of being fetched again each time.
+"""
+
+import hmac
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8770
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# Browsers send an Origin header; only extensions may call the service, so a
+# web page cannot submit time entries through it
+ALLOWED_ORIGIN_PREFIXES = ("chrome-extension://", "moz-extension://")
+
+
+def entry_summary(date, entry):
+    """Return the JSON-friendly fields of a parsed entry."""
+    return {
+        "date": date.isoformat(),
+        "project": entry["project"],
+        "subject": entry["subject"],
+        "activity": entry["activity"],
+        "hours": entry["hours"],
+        "start_time": entry["start_time"].strftime("%H:%M"),
+        "end_time": entry["end_time"].strftime("%H:%M"),
+        "is_scrum": bool(entry.get("is_scrum")),
+        "work_package_id": entry.get("work_package_id"),
+    }
+
+
+class SyncService:
+    """Work log analysis and submission against one warm logger."""
+
+    def __init__(self, logger, parser_class, webhook_secret=None):
+        from webhooks import WebhookCacheUpdater
+
+        self.logger = logger
+        self.parser_class = parser_class
+        self.webhook_secret = webhook_secret
+        self.webhooks = WebhookCacheUpdater(logger)
+        # Submissions run one at a time so duplicate checks see earlier writes
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.submissions = 0
+
+    def parse(self, document):
+        """Parse a work log document and return (date entries, errors)."""
+        parser = self.parser_class()
+        all_date_entries = parser.parse_json_work_log_content(document)
+        return all_date_entries, parser.errors
+
+    def prefetch(self, all_date_entries):
+        """Start the lookups of every date in the background."""
+        for date, entries in all_date_entries.items():
+            self.logger.prefetch_work_log_entries(entries, date)
+
+    def status(self):
+        return {
+            "status": "ok",
+            "base_url": self.logger.base_url,
+            "uptime_seconds": round(time.time() - self.started),
+            "submissions": self.submissions,
+            "indexed_projects": len(self.logger.subject_indexes),
+            "spooled_operations": len(self.logger.spool) if self.logger.spool else 0,
+            "webhook_events": self.webhooks.events,
+        }
+
+    def reference(self):
+        reference_data = self.logger.reference_data
+        return {
+            "statuses": [
+                {"id": status_id, "name": name}
+                for status_id, name in reference_data.status_choices
+            ],
+            "activities": sorted(
+                {entry["name"] for entry in reference_data.activities.values()}
+            ),
+            "projects": sorted(
+                (
+                    {"id": entry["id"], "name": entry["name"]}
+                    for entry in {
+                        entry["id"]: entry for entry in reference_data.projects.values()
+                    }.values()
+                ),
+                key=lambda project: project["id"] or 0,
+            ),
+        }
+
+    def refresh(self):
+        with self.lock:
+            self.logger.load_reference_data(refresh=True)
+            self.logger.subject_indexes.clear()
+            self.logger.forget_time_entries()
+        return self.status()
+
+    def webhook(self, body, signature):
+        """Apply a signed OpenProject webhook event to the caches."""
+        from webhooks import signature_valid
+
+        if not self.webhook_secret:
+            raise PermissionError("Webhooks are disabled; set webhook_secret")
+        if not signature_valid(self.webhook_secret, body, signature):
+            raise PermissionError("Invalid webhook signature")
+        event = json.loads(body)
+        if not isinstance(event, dict):
+            raise ValueError("Webhook body must be a JSON object")
+        with self.lock:
+            return {
+                "action": event.get("action"),
+                "applied": self.webhooks.apply(event),
+            }
+
+    def resolve_project_id(self, entry):
+        project_id = entry.get("project_id") or self.logger.reference_data.project_id(
+            entry["project"]
+        )
+        entry["project_id"] = project_id
+        return project_id
+
+    def analyze(self, document):
+        """Report for each entry whether it is SCRUM, existing, reused or new."""
+        all_date_entries, errors = self.parse(document)
+
+        results = []
+        with self.lock:
+            self.prefetch(all_date_entries)
+            for date, entries in all_date_entries.items():
+                results.extend(self.analyze_date(date, entries))
+
+        return {"entries": results, "errors": errors}
+
+    def analyze_date(self, date, entries):
+        """Return the analysis rows of one date's entries."""
+        results = []
+        for entry in entries:
+            result = entry_summary(date, entry)
+            if entry.get("is_scrum"):
+                result["plan"] = "scrum"
+            elif not entry.get("create_new_task"):
+                result["plan"] = "existing"
+            elif not self.resolve_project_id(entry):
+                result["plan"] = "unknown_project"
+            else:
+                existing = self.logger.check_existing_work_package_by_subject(
+                    entry["project_id"], entry["subject"]
+                )
+                if existing:
+                    result["plan"] = "reuse"
+                    result["work_package_id"] = existing["id"]
+                else:
+                    result["plan"] = "new"
+                    result["similar"] = self.logger.find_similar_work_packages(
+                        entry["project_id"], entry["subject"]
+                    )[:3]
+            results.append(result)
+
+        return results
+
+    def apply_choices(self, entry, choices):
+        """Apply the client's work package choices for an entry's subject."""
+        choice = choices.get(entry["subject"]) or {}
+        if choice.get("work_package_id"):
+            entry["work_package_id"] = int(choice["work_package_id"])
+            entry["create_new_task"] = False
+        if choice.get("comment"):
+            entry["work_package_comment"] = choice["comment"]
+        if choice.get("status_id"):
+            entry["work_package_status_id"] = int(choice["status_id"])
+        if entry.get("create_new_task"):
+            self.resolve_project_id(entry)
+
+    def submit(
+        self,
+        document,
+        start_times=None,
+        work_packages=None,
+        dates=None,
+        start_time=None,
+    ):
+        """Create the time entries of a work log and return per-entry outcomes.
+
+        start_times maps ISO dates to the start of their first entry, with
+        start_time used for dates not listed; work_packages maps subjects to
+        an existing work_package_id or the comment and status_id of new ones.
+        """
+        all_date_entries, errors = self.parse(document)
+        start_times = start_times or {}
+        work_packages = work_packages or {}
+        if dates:
+            all_date_entries = {
+                date: entries
+                for date, entries in all_date_entries.items()
+                if date.isoformat() in dates
+            }
+
+        results = []
+        with self.lock:
+            self.submissions += 1
+            if not self.webhook_secret:
+                # Entries may have been logged elsewhere since the last submission
+                self.logger.forget_time_entries()
+            self.prefetch(all_date_entries)
+
+            for date, entries in all_date_entries.items():
+                day_start = start_times.get(date.isoformat()) or start_time
+                if day_start:
+                    self.parser_class.apply_start_time(
+                        entries,
+                        datetime.combine(date, self.logger.parse_time_input(day_start)),
+                    )
+
+                for entry in entries:
+                    self.apply_choices(entry, work_packages)
+                    with self.logger.tracer.span(
+                        "process_entry",
+                        date=date.isoformat(),
+                        project=entry["project"],
+                        subject=entry["subject"],
+                        hours=entry["hours"],
+                    ) as span:
+                        outcome = self.logger.process_work_log_entry(entry, date)
+                        span.set_attribute("outcome", outcome["outcome"])
+                    results.append(dict(entry_summary(date, entry), **outcome))
+
+        summary = {}
+        for result in results:
+            summary[result["outcome"]] = summary.get(result["outcome"], 0) + 1
+        return {"entries": results, "summary": summary, "errors": errors}
+
+
+class SyncRequestHandler(BaseHTTPRequestHandler):
+    """Routes JSON requests to the server's SyncService."""
+
+    server_version = "OpenProjectSync/1.0"
+
+    def _origin_allowed(self):
+        origin = self.headers.get("Origin")
+        return origin is None or origin.startswith(ALLOWED_ORIGIN_PREFIXES)
+
+    def _token_valid(self):
+        token = self.server.token
+        if not token:
+            return True
+        return hmac.compare_digest(self.headers.get("X-Service-Token", ""), token)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        origin = self.headers.get("Origin")
+        if origin:
+            self.send_header("Access-Control-Allow-Origin", origin)
+            self.send_header("Vary", "Origin")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        return self.rfile.read(length) if length else b""
+
+    def _read_json(self):
+        body = self._read_body()
+        if not body:
+            return {}
+        body = json.loads(body)
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        return body
+
+    def _handle(self, routes):
+        if not self._origin_allowed():
+            return self._send_json(403, {"error": "Origin not allowed"})
+        # OpenProject signs webhooks instead of sending the service token
+        if self.path != "/webhook" and not self._token_valid():
+            return self._send_json(401, {"error": "Missing or wrong X-Service-Token"})
+
+        route = routes.get(self.path.split("?", 1)[0])
+        if route is None:
+            return self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+
+        try:
+            self._send_json(200, route())
+        except PermissionError as e:
+            self._send_json(403, {"error": str(e)})
+        except ValueError as e:
+            # Also covers malformed JSON and invalid work logs or times
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"error": f"{e.__class__.__name__}: {e}"})
+
+    def do_OPTIONS(self):
+        if not self._origin_allowed():
+            return self._send_json(403, {"error": "Origin not allowed"})
+        self.send_response(204)
+        origin = self.headers.get("Origin")
+        if origin:
+            self.send_header("Access-Control-Allow-Origin", origin)
+            self.send_header("Vary", "Origin")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.send_header(
+            "Access-Control-Allow-Headers", "Content-Type, X-Service-Token"
+        )
+        self.end_headers()
+
+    def do_GET(self):
+        service = self.server.service
+        self._handle({"/status": service.status, "/reference": service.reference})
+
+    def do_POST(self):
+        service = self.server.service
+
+        def analyze():
+            body = self._read_json()
+            return service.analyze(body.get("work_log", body))
+
+        def submit():
+            body = self._read_json()
+            return service.submit(
+                body.get("work_log", body),
+                body.get("start_times"),
+                body.get("work_packages"),
+                body.get("dates"),
+                body.get("start_time"),
+            )
+
+        def webhook():
+            from webhooks import SIGNATURE_HEADER
+
+            return service.webhook(
+                self._read_body(), self.headers.get(SIGNATURE_HEADER)
+            )
+
+        self._handle(
+            {
+                "/analyze": analyze,
+                "/submit": submit,
+                "/refresh": service.refresh,
+                "/webhook": webhook,
+            }
+        )
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+    """Create the HTTP server for a SyncService without starting it."""
+    server = ThreadingHTTPServer((host, port), SyncRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.token = token
+    return server
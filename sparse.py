@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Sparse Collection Reads
+
+Collection requests ask OpenProject for only the properties the time logger
+uses, through the 'select' query parameter, instead of full HAL documents
+with descriptions, every link and embedded schemas. Elements are projected
+onto small named tuples as soon as a page is decoded, so only those tuples
+are kept. A server that rejects 'select' for a collection is asked again
+without it, and later reads of that collection skip it; projection works on
+full documents as well.
+"""
+
+import json
+import threading
+from collections import namedtuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from reference_data import href_id
+
+WorkPackageRow = namedtuple("WorkPackageRow", "id subject")
+TimeEntryRow = namedtuple(
+    "TimeEntryRow",
+    "id spent_on hours work_package_id work_package_title activity_href activity_title",
+)
+
+WORK_PACKAGE_FIELDS = ("id", "subject")
+TIME_ENTRY_FIELDS = ("id", "spentOn", "hours", "workPackage", "activity")
+
+# Collections whose server answered 400 to a 'select' request
+_select_rejected = set()
+_select_rejected_lock = threading.Lock()
+
+
+def select_param(fields):
+    """Return the 'select' value asking for the collection total and fields."""
+    return ",".join(["total"] + [f"elements/{field}" for field in fields])
+
+
+def decode_json(response):
+    """Decode a JSON response body, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return json.loads(response.content)
+
+
+def get_collection_page(session, url, params, fields, collection, timeout=60):
+    """GET one page of a collection, selecting only fields when the server allows."""
+    if collection not in _select_rejected:
+        response = session.get(
+            url,
+            params=dict(params, select=select_param(fields)),
+            timeout=timeout,
+        )
+        if response.status_code != 400:
+            response.raise_for_status()
+            return decode_json(response)
+        with _select_rejected_lock:
+            _select_rejected.add(collection)
+
+    response = session.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return decode_json(response)
+
+
+def collection_elements(page):
+    """Return the elements of a decoded collection page."""
+    return page.get("_embedded", {}).get("elements", [])
+
+
+def work_package_row(element):
+    """Project a work package element onto its ID and subject."""
+    return WorkPackageRow(element.get("id"), element.get("subject", ""))
+
+
+def time_entry_row(element):
+    """Project a time entry element onto the fields the logger compares."""
+    links = element.get("_links", {})
+    work_package = links.get("workPackage", {})
+    activity = links.get("activity", {})
+    return TimeEntryRow(
+        element.get("id"),
+        element.get("spentOn"),
+        element.get("hours"),
+        href_id(work_package.get("href")),
+        work_package.get("title", ""),
+        activity.get("href"),
+        activity.get("title", ""),
+    )
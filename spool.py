@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Offline Spool
+
+When OpenProject cannot be reached, work package and time entry creations are
+appended to a local journal instead of being lost. A time entry for a work
+package that is itself still spooled refers to it by spool reference. Once the
+server is back, 'python log.py flush' replays the journal: work packages
+first (one worker per project, in order), then time entries concurrently with
+the new work package IDs filled in. Whatever still fails stays in the spool.
+"""
+
+import json
+import os
+import time
+import uuid
+from datetime import date, time as time_of_day
+
+from reference_data import get_cache_dir
+
+SPOOL_FILE_NAME = "spool.jsonl"
+SPOOL_REF_PREFIX = "spool:"
+
+
+def default_spool_path():
+    """Return the path of the offline spool."""
+    return os.path.join(get_cache_dir(), SPOOL_FILE_NAME)
+
+
+def is_spool_ref(work_package_id):
+    """Return True if a work package ID refers to a spooled work package."""
+    return isinstance(work_package_id, str) and work_package_id.startswith(
+        SPOOL_REF_PREFIX
+    )
+
+
+class Spool:
+    """Append-only journal of API writes that could not be sent."""
+
+    def __init__(self, path):
+        self.path = path
+        # Set once something was spooled in this session; later writes are
+        # spooled too so they reach the server in their original order
+        self.offline = False
+
+    def load(self):
+        """Return the spooled operations in the order they were written."""
+        operations = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        operations.append(json.loads(line))
+                    except ValueError:
+                        # A write cut short by a crash; nothing after it is lost
+                        print(f"Warning: Skipping damaged spool line: {line[:60]}")
+        except FileNotFoundError:
+            pass
+        return operations
+
+    def __len__(self):
+        return len(self.load())
+
+    def append(self, kind, args, depends_on=None):
+        """Durably add an operation and return its spool reference."""
+        operation = {
+            "id": uuid.uuid4().hex[:12],
+            "kind": kind,
+            "args": args,
+            "depends_on": depends_on,
+            "spooled_at": time.time(),
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(operation) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self.offline = True
+        return SPOOL_REF_PREFIX + operation["id"]
+
+    def spool_work_package(
+        self, project_id, subject, activity_type, description, status_id
+    ):
+        """Spool a work package creation."""
+        return self.append(
+            "work_package",
+            {
+                "project_id": project_id,
+                "subject": subject,
+                "activity_type": activity_type,
+                "description": description,
+                "status_id": status_id,
+            },
+        )
+
+    def spool_time_entry(
+        self, work_package_id, day, start_time, hours, activity_name, comment
+    ):
+        """Spool a time entry creation, depending on a spooled work package if needed."""
+        depends_on = None
+        if is_spool_ref(work_package_id):
+            depends_on = work_package_id[len(SPOOL_REF_PREFIX) :]
+            work_package_id = None
+        return self.append(
+            "time_entry",
+            {
+                "work_package_id": work_package_id,
+                "date": day.isoformat(),
+                "start_time": start_time.isoformat() if start_time else None,
+                "hours": hours,
+                "activity_name": activity_name,
+                "comment": comment,
+            },
+            depends_on,
+        )
+
+    def rewrite(self, operations):
+        """Replace the spool with the given operations."""
+        if not operations:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.offline = False
+            return
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for operation in operations:
+                file.write(json.dumps(operation) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+
+
+def flush_spool(logger, spool, max_workers=4):
+    """Replay spooled operations through the logger and return (sent, remaining)."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from tracing import in_current_context
+
+    operations = spool.load()
+    if not operations:
+        return 0, 0
+
+    work_packages = [op for op in operations if op["kind"] == "work_package"]
+    time_entries = [op for op in operations if op["kind"] == "time_entry"]
+
+    # The logger must report failures now instead of spooling them again
+    logger_spool, logger.spool = logger.spool, None
+    try:
+        # Subject indexes and time entry caches are filled on this thread;
+        # the workers below only read them
+        for project_id in {op["args"]["project_id"] for op in work_packages}:
+            try:
+                logger.get_subject_index(project_id)
+            except Exception as e:
+                print(f"Warning: Could not check existing work packages: {e}")
+        for day in {op["args"]["date"] for op in time_entries}:
+            try:
+                logger.get_time_entries_for_date(date.fromisoformat(day))
+            except Exception as e:
+                print(f"Warning: Could not check existing time entries: {e}")
+
+        created = {}  # Spool ID -> work package ID
+
+        def send_project_work_packages(project_operations):
+            for operation in project_operations:
+                work_package_id = logger.create_work_package(**operation["args"])
+                if work_package_id:
+                    created[operation["id"]] = work_package_id
+                    print(
+                        f"  ✓ Work package '{operation['args']['subject']}' (ID: {work_package_id})"
+                    )
+
+        by_project = {}
+        for operation in work_packages:
+            by_project.setdefault(operation["args"]["project_id"], []).append(operation)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(
+                executor.map(
+                    in_current_context(send_project_work_packages),
+                    by_project.values(),
+                )
+            )
+
+        def send_time_entry(operation):
+            args = dict(operation["args"])
+            if operation.get("depends_on"):
+                args["work_package_id"] = created.get(operation["depends_on"])
+                if not args["work_package_id"]:
+                    return False
+            day = date.fromisoformat(args["date"])
+
+            # A timed out request may have reached the server after all
+            if logger.check_existing_time_entries(
+                args["work_package_id"], day, args["activity_name"]
+            ):
+                print(
+                    f"  ⚠ Time entry for work package {args['work_package_id']} on {day} already exists - dropping"
+                )
+                return True
+
+            result = logger.create_time_entry(
+                args["work_package_id"],
+                day,
+                (
+                    time_of_day.fromisoformat(args["start_time"])
+                    if args["start_time"]
+                    else None
+                ),
+                args["hours"],
+                args["activity_name"],
+                args["comment"],
+            )
+            if result:
+                print(
+                    f"  ✓ Time entry on {day} for work package {args['work_package_id']} (ID: {result.get('id', 'Unknown')})"
+                )
+            return bool(result)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            sent = dict(
+                zip(
+                    (op["id"] for op in time_entries),
+                    executor.map(in_current_context(send_time_entry), time_entries),
+                )
+            )
+    finally:
+        logger.spool = logger_spool
+
+    remaining = []
+    for operation in operations:
+        if operation["id"] in created or sent.get(operation["id"]):
+            continue
+        depends_on = operation.get("depends_on")
+        if depends_on in created:
+            # Its work package exists now; keep the entry with the real ID
+            operation = dict(
+                operation,
+                depends_on=None,
+                args=dict(operation["args"], work_package_id=created[depends_on]),
+            )
+        remaining.append(operation)
+
+    spool.rewrite(remaining)
+    # Keep spooling new writes while older ones are still waiting
+    spool.offline = bool(remaining)
+    return len(operations) - len(remaining), len(remaining)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Work Package Subject Index
+
+Per-project index of work package subjects for duplicate detection. Subjects
+are normalized (case, punctuation, spacing and trailing ticket references are
+ignored) and split into character trigrams. Subjects whose other numbers
+differ, such as "Sprint 12 review" and "Sprint 13 review", never match. Near matches are found through an
+inverted trigram index using prefix filtering: only the rarest trigrams of the
+query are looked up, which keeps candidate sets tiny even for projects with
+tens of thousands of work packages while still finding every match above the
+similarity threshold.
+"""
+
+import math
+import re
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+
+# Trailing ticket references, matched before lowercasing: "#123", "ABC-123",
+# "(HR-42)", "[123]" or a long number after a dash, "- 50000179". Plain
+# numbers like "Sprint 12" or "Release 2.4" are part of the subject.
+TRAILING_TICKET_PATTERN = re.compile(
+    r"(?:\s*[-:])?\s*(?:"
+    r"[(\[]\s*(?:#?\d+|[A-Z][A-Z0-9]+-\d+)\s*[)\]]"
+    r"|#\d+"
+    r"|(?<![\w-])[A-Z][A-Z0-9]+-\d+"
+    r"|(?<=[-:])\s*\d{5,}"
+    r")\s*$"
+)
+NON_WORD_PATTERN = re.compile(r"[\W_]+")
+NUMBER_PATTERN = re.compile(r"\d+")
+
+
+def normalize_subject(subject):
+    """Normalize a subject for comparison."""
+    normalized = TRAILING_TICKET_PATTERN.sub("", (subject or "").strip()).lower()
+    return NON_WORD_PATTERN.sub(" ", normalized).strip()
+
+
+def subject_trigrams(normalized):
+    """Return the set of character trigrams of a normalized subject."""
+    padded = f"  {normalized} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SubjectIndex:
+    """Similarity index over the work package subjects of one project."""
+
+    def __init__(self, work_packages=()):
+        self.subjects = {}  # work package ID -> subject
+        self.exact = {}  # subject.strip().lower() -> work package ID
+        self.normalized = {}  # normalized subject -> [work package IDs]
+        self.trigrams = {}  # work package ID -> trigram set
+        self.postings = {}  # trigram -> set of work package IDs
+
+        for work_package_id, subject in work_packages:
+            self.add(work_package_id, subject)
+
+    def __len__(self):
+        return len(self.subjects)
+
+    def add(self, work_package_id, subject):
+        """Add or replace a work package subject."""
+        if work_package_id in self.subjects:
+            self.remove(work_package_id)
+
+        subject = subject or ""
+        normalized = normalize_subject(subject)
+        trigrams = subject_trigrams(normalized)
+
+        self.subjects[work_package_id] = subject
+        self.exact.setdefault(subject.strip().lower(), work_package_id)
+        self.normalized.setdefault(normalized, []).append(work_package_id)
+        self.trigrams[work_package_id] = trigrams
+        for trigram in trigrams:
+            self.postings.setdefault(trigram, set()).add(work_package_id)
+
+    def remove(self, work_package_id):
+        """Remove a work package from the index."""
+        subject = self.subjects.pop(work_package_id, None)
+        if subject is None:
+            return
+
+        key = subject.strip().lower()
+        if self.exact.get(key) == work_package_id:
+            del self.exact[key]
+            # Another work package with the same subject takes over the slot
+            for other_id, other_subject in self.subjects.items():
+                if other_subject.strip().lower() == key:
+                    self.exact[key] = other_id
+                    break
+
+        normalized = normalize_subject(subject)
+        ids = self.normalized.get(normalized, [])
+        if work_package_id in ids:
+            ids.remove(work_package_id)
+        if not ids:
+            self.normalized.pop(normalized, None)
+
+        for trigram in self.trigrams.pop(work_package_id, ()):
+            posting = self.postings.get(trigram)
+            if posting is not None:
+                posting.discard(work_package_id)
+                if not posting:
+                    del self.postings[trigram]
+
+    def find_exact(self, subject):
+        """Return the ID of a work package with the same subject, ignoring case."""
+        return self.exact.get((subject or "").strip().lower())
+
+    def find_similar(self, subject, threshold=DEFAULT_SIMILARITY_THRESHOLD, limit=5):
+        """Return up to limit (score, work package ID) pairs at or above threshold."""
+        normalized = normalize_subject(subject)
+        query = subject_trigrams(normalized)
+        if not query:
+            return []
+
+        # Any subject with Jaccard >= threshold shares at least one of the
+        # query's (|Q| - ceil(threshold * |Q|) + 1) trigrams, so looking up the
+        # rarest ones is enough.
+        required = math.ceil(threshold * len(query) - 1e-9)
+        prefix_length = max(1, len(query) - required + 1)
+        prefix = sorted(query, key=lambda trigram: len(self.postings.get(trigram, ())))
+
+        candidates = set(self.normalized.get(normalized, ()))
+        for trigram in prefix[:prefix_length]:
+            candidates.update(self.postings.get(trigram, ()))
+
+        numbers = NUMBER_PATTERN.findall(normalized)
+        matches = []
+        for candidate_id in candidates:
+            trigrams = self.trigrams[candidate_id]
+            shared = len(query & trigrams)
+            score = shared / (len(query) + len(trigrams) - shared)
+            if score >= threshold and numbers == NUMBER_PATTERN.findall(
+                normalize_subject(self.subjects[candidate_id])
+            ):
+                matches.append((score, candidate_id))
+
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return matches[:limit]
@@ -7,12 +7,76 @@ the configuration settings in config.py.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+import argparse
 import json
-from config import (
-    CONFIG,
-    PROJECT_MAPPINGS,
-)
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cassette import mount_cassette
+from config import CONFIG, PROJECT_MAPPINGS
+from reference_data import get_project_mappings_file
+
+# Number of diagnostic requests allowed in flight at once
+DEFAULT_CONCURRENCY = 10
+
+# (label, elapsed ms, status) for every diagnostic request, for the latency report
+CHECK_LATENCIES = []
+_latency_lock = threading.Lock()
+
+# Importing log.py must stay cheap so 'python log.py validate' answers quickly
+LOG_IMPORT_BUDGET_MS = 50
+
+
+def record_latency(label, elapsed_ms, status):
+    """Record the latency of one diagnostic request."""
+    with _latency_lock:
+        CHECK_LATENCIES.append((label, elapsed_ms, status))
+
+
+def create_session(pool_size=DEFAULT_CONCURRENCY):
+    """Create an authenticated session with a connection pool sized for concurrency."""
+    session = requests.Session()
+    session.auth = HTTPBasicAuth("apikey", CONFIG["api_token"])
+    session.headers.update(
+        {"Content-Type": "application/json", "Accept": "application/hal+json"}
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    mount_cassette(session)
+    return session
+
+
+def timed_request(session, label, method, url, **kwargs):
+    """Send one request, record its latency and return (response or error, ms)."""
+    start = time.perf_counter()
+    try:
+        result = session.request(method, url, **kwargs)
+        status = result.status_code
+    except Exception as e:
+        result = e
+        status = type(e).__name__
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    record_latency(label, elapsed_ms, status)
+    return result, elapsed_ms
+
+
+def run_checks(session, checks, max_workers=DEFAULT_CONCURRENCY):
+    """Run (label, method, url, kwargs) checks concurrently, keyed by label."""
+    if not checks:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(checks))) as executor:
+        futures = {
+            label: executor.submit(timed_request, session, label, method, url, **kwargs)
+            for label, method, url, kwargs in checks
+        }
+        return {label: future.result() for label, future in futures.items()}
 
 
 def test_api_connection():
@@ -21,19 +85,19 @@ def test_api_connection():
     print(f"\nBase URL: {CONFIG['base_url']}")
 
     try:
-        session = requests.Session()
-        session.auth = HTTPBasicAuth("apikey", CONFIG["api_token"])
-        session.headers.update(
-            {"Content-Type": "application/json", "Accept": "application/hal+json"}
-        )
+        session = create_session()
 
         # Test basic connectivity
         url = f"{CONFIG['base_url'].rstrip('/')}/api/v3/users/me"
-        response = session.get(url, timeout=10)
+        response, elapsed_ms = timed_request(
+            session, "users/me", "GET", url, timeout=10
+        )
+        if isinstance(response, Exception):
+            raise response
 
         if response.status_code == 200:
             user_data = response.json()
-            print(f"\n✅ API Connection Successful!")
+            print(f"\n✅ API Connection Successful! ({elapsed_ms:.0f} ms)")
             print(f"   Authenticated as: {user_data.get('name', 'Unknown')}")
             print(f"   User ID: {user_data.get('id', 'Unknown')}")
             print(f"   Email: {user_data.get('email', 'Unknown')}")
@@ -58,43 +122,104 @@ def test_api_connection():
         return None
 
 
-def test_projects(session):
+def project_checks():
+    """Build the project access checks for every configured project."""
+    base_url = CONFIG["base_url"].rstrip("/")
+    return [
+        (
+            f"project {project_name}",
+            "GET",
+            f"{base_url}/api/v3/projects/{project_id}",
+            {"timeout": 5},
+        )
+        for project_name, project_id in PROJECT_MAPPINGS.items()
+    ]
+
+
+def form_checks():
+    """Build the work package and time entry form checks."""
+    base_url = CONFIG["base_url"].rstrip("/")
+    checks = [
+        (
+            "time entry form",
+            "POST",
+            f"{base_url}/api/v3/time_entries/form",
+            {"json": {}, "timeout": 5},
+        )
+    ]
+
+    # Test with the first available project
+    for project_id in PROJECT_MAPPINGS.values():
+        checks.append(
+            (
+                "work package form",
+                "POST",
+                f"{base_url}/api/v3/projects/{project_id}/work_packages/form",
+                {"json": {}, "timeout": 5},
+            )
+        )
+        break
+
+    return checks
+
+
+def user_checks():
+    """Build the checks for the configured accountable and assignee users."""
+    base_url = CONFIG["base_url"].rstrip("/")
+    return [
+        (f"user {user_id}", "GET", f"{base_url}/api/v3/users/{user_id}", {"timeout": 5})
+        for user_id in {
+            CONFIG.get("accountable_user_id"),
+            CONFIG.get("assignee_user_id"),
+        }
+        if user_id
+    ]
+
+
+def test_projects(session, results=None):
     """Test access to configured projects."""
     print(f"\n📁 Testing Project Access...")
 
     project_results = {}
 
+    if results is None:
+        results = run_checks(session, project_checks())
+
     for project_name, project_id in PROJECT_MAPPINGS.items():
+        response, elapsed_ms = results[f"project {project_name}"]
+        timing = f"({elapsed_ms:.0f} ms)"
         try:
-            url = f"{CONFIG['base_url'].rstrip('/')}/api/v3/projects/{project_id}"
-            response = session.get(url, timeout=5)
+            if isinstance(response, Exception):
+                raise response
 
             if response.status_code == 200:
                 project_data = response.json()
                 print(
-                    f"✅ {project_name} (ID: {project_id}) - {project_data.get('name', 'Unknown')}"
+                    f"✅ {project_name} (ID: {project_id}) - {project_data.get('name', 'Unknown')} {timing}"
                 )
                 project_results[project_name] = True
             elif response.status_code == 404:
-                print(f"❌ {project_name} (ID: {project_id}) - Project not found")
+                print(
+                    f"❌ {project_name} (ID: {project_id}) - Project not found {timing}"
+                )
                 project_results[project_name] = False
             elif response.status_code == 403:
-                print(f"⚠️  {project_name} (ID: {project_id}) - Access denied")
+                print(f"⚠️  {project_name} (ID: {project_id}) - Access denied {timing}")
                 project_results[project_name] = False
             else:
                 print(
-                    f"❌ {project_name} (ID: {project_id}) - Error {response.status_code}"
+                    f"❌ {project_name} (ID: {project_id}) - Error {response.status_code} {timing}"
                 )
                 project_results[project_name] = False
 
         except Exception as e:
-            print(f"❌ {project_name} (ID: {project_id}) - Error: {e}")
+            print(f"❌ {project_name} (ID: {project_id}) - Error: {e} {timing}")
             project_results[project_name] = False
 
     return project_results
 
 
-def test_work_package_creation(session):
+def test_work_package_creation(session, results=None):
     """Test work package creation permissions."""
     print(f"\n📋 Testing Work Package Creation Permissions...")
 
@@ -111,17 +236,23 @@ def test_work_package_creation(session):
         print("❌ No projects configured for testing")
         return False
 
+    if results is None:
+        results = run_checks(session, form_checks())
+
     try:
         # Test work package creation endpoint without actually creating
-        url = f"{CONFIG['base_url'].rstrip('/')}/api/v3/projects/{test_project_id}/work_packages/form"
-        response = session.post(url, json={}, timeout=5)
+        response, elapsed_ms = results["work package form"]
+        if isinstance(response, Exception):
+            raise response
 
         if response.status_code in [
             200,
             201,
             422,
         ]:  # 422 is validation error, which means endpoint works
-            print(f"✅ Work package creation allowed in {test_project_name}")
+            print(
+                f"✅ Work package creation allowed in {test_project_name} ({elapsed_ms:.0f} ms)"
+            )
             return True
         elif response.status_code == 403:
             print(f"❌ Work package creation denied in {test_project_name}")
@@ -137,21 +268,25 @@ def test_work_package_creation(session):
         return False
 
 
-def test_time_entry_creation(session):
+def test_time_entry_creation(session, results=None):
     """Test time entry creation permissions."""
     print(f"\n⏰ Testing Time Entry Creation Permissions...")
 
+    if results is None:
+        results = run_checks(session, form_checks())
+
     try:
         # Test time entry creation endpoint without actually creating
-        url = f"{CONFIG['base_url'].rstrip('/')}/api/v3/time_entries/form"
-        response = session.post(url, json={}, timeout=5)
+        response, elapsed_ms = results["time entry form"]
+        if isinstance(response, Exception):
+            raise response
 
         if response.status_code in [
             200,
             201,
             422,
         ]:  # 422 is validation error, which means endpoint works
-            print(f"✅ Time entry creation allowed")
+            print(f"✅ Time entry creation allowed ({elapsed_ms:.0f} ms)")
             return True
         elif response.status_code == 403:
             print(f"❌ Time entry creation denied")
@@ -167,18 +302,62 @@ def test_time_entry_creation(session):
         return False
 
 
+def fetch_all_projects(session, page_size=None):
+    """Fetch every project, reading the first page and then the rest concurrently."""
+    from pagination import iter_collection
+
+    url = f"{CONFIG['base_url'].rstrip('/')}/api/v3/projects"
+
+    start = time.perf_counter()
+    try:
+        projects = list(iter_collection(session, url, page_size=page_size, timeout=30))
+    except requests.exceptions.HTTPError as e:
+        record_latency(
+            "projects (all pages)",
+            (time.perf_counter() - start) * 1000,
+            e.response.status_code,
+        )
+        return e.response, None
+    record_latency("projects (all pages)", (time.perf_counter() - start) * 1000, 200)
+
+    return None, sorted(projects, key=lambda project: project.get("id", 0))
+
+
+def write_project_mappings_file(project_mappings, projects, file_path=None):
+    """Write the discovered mappings to the file log.py loads at startup."""
+    file_path = file_path or get_project_mappings_file()
+
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "base_url": CONFIG["base_url"],
+                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "total": len(projects),
+                "mappings": project_mappings,
+                "projects": [
+                    {
+                        "id": project.get("id"),
+                        "identifier": project.get("identifier"),
+                        "name": project.get("name"),
+                    }
+                    for project in projects
+                ],
+            },
+            file,
+            indent=2,
+        )
+
+    return file_path
+
+
 def get_project_mappings(session):
     """Retrieve all available projects from OpenProject API."""
     print(f"\n🗺️  Retrieving Project Mappings from OpenProject...")
 
     try:
-        url = f"{CONFIG['base_url'].rstrip('/')}/api/v3/projects"
-        response = session.get(url, timeout=10)
-
-        if response.status_code == 200:
-            data = response.json()
-            projects = data.get("_embedded", {}).get("elements", [])
+        response, projects = fetch_all_projects(session)
 
+        if projects is not None:
             print(f"\n📋 Available Projects ({len(projects)} total):")
             print("-" * 80)
 
@@ -188,7 +367,7 @@ def get_project_mappings(session):
                 project_id = project.get("id")
                 project_name = project.get("name", "Unknown")
                 project_identifier = project.get("identifier", "Unknown")
-                status = project.get("status", {}).get("name", "Unknown")
+                status = (project.get("status") or {}).get("name", "Unknown")
 
                 print(f"🔹 {project_name}")
                 print(f"   ID: {project_id}")
@@ -210,6 +389,13 @@ def get_project_mappings(session):
                 print(f"    '{identifier}': {proj_id},")
             print("}")
 
+            try:
+                file_path = write_project_mappings_file(project_mappings, projects)
+                print(f"\n💾 Saved {len(project_mappings)} mappings to {file_path}")
+                print("   log.py loads this file automatically")
+            except OSError as e:
+                print(f"⚠️  Could not write project mappings file: {e}")
+
             return project_mappings
 
         elif response.status_code == 403:
@@ -225,10 +411,13 @@ def get_project_mappings(session):
         return None
 
 
-def test_user_permissions(session):
+def test_user_permissions(session, results=None):
     """Test user permissions and validate user IDs."""
     print(f"\n👤 Testing User Permissions...")
 
+    if results is None:
+        results = run_checks(session, user_checks())
+
     accountable_id = CONFIG.get("accountable_user_id")
     assignee_id = CONFIG.get("assignee_user_id")
 
@@ -238,21 +427,27 @@ def test_user_permissions(session):
     ]:
         if user_id:
             try:
-                url = f"{CONFIG['base_url'].rstrip('/')}/api/v3/users/{user_id}"
-                response = session.get(url, timeout=5)
+                response, elapsed_ms = results[f"user {user_id}"]
+                if isinstance(response, Exception):
+                    raise response
+                timing = f"({elapsed_ms:.0f} ms)"
 
                 if response.status_code == 200:
                     user_data = response.json()
                     print(
-                        f"✅ {user_type} User (ID: {user_id}) - {user_data.get('name', 'Unknown')}"
+                        f"✅ {user_type} User (ID: {user_id}) - {user_data.get('name', 'Unknown')} {timing}"
                     )
                 elif response.status_code == 404:
-                    print(f"❌ {user_type} User (ID: {user_id}) - User not found")
+                    print(
+                        f"❌ {user_type} User (ID: {user_id}) - User not found {timing}"
+                    )
                 elif response.status_code == 403:
-                    print(f"⚠️  {user_type} User (ID: {user_id}) - Access denied")
+                    print(
+                        f"⚠️  {user_type} User (ID: {user_id}) - Access denied {timing}"
+                    )
                 else:
                     print(
-                        f"❌ {user_type} User (ID: {user_id}) - Error {response.status_code}"
+                        f"❌ {user_type} User (ID: {user_id}) - Error {response.status_code} {timing}"
                     )
 
             except Exception as e:
@@ -261,12 +456,206 @@ def test_user_permissions(session):
             print(f"⚠️  {user_type} User ID not configured")
 
 
-def main():
+def test_log_import_time():
+    """Check that importing log.py stays network-free and within the time budget."""
+    print(f"\n⚡ Testing log.py Startup Time...")
+
+    code = (
+        "import sys, time; start = time.perf_counter(); import log; "
+        "print((time.perf_counter() - start) * 1000); "
+        "print('requests' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert result.returncode == 0, f"Importing log.py failed: {result.stderr}"
+
+    elapsed_line, requests_line = result.stdout.strip().splitlines()[-2:]
+    elapsed_ms = float(elapsed_line)
+    print(f"   import log: {elapsed_ms:.1f} ms (budget {LOG_IMPORT_BUDGET_MS} ms)")
+
+    assert requests_line == "False", "log.py imports requests at module load"
+    assert (
+        elapsed_ms < LOG_IMPORT_BUDGET_MS
+    ), f"Importing log.py took {elapsed_ms:.1f} ms"
+    print(f"✅ log.py starts within budget without loading requests")
+
+
+def percentile(sorted_values, fraction):
+    """Return the nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    index = max(
+        0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1)
+    )
+    return sorted_values[index]
+
+
+def print_latency_report():
+    """Print the latency of every diagnostic request, slowest first."""
+    if not CHECK_LATENCIES:
+        return
+
+    print(f"\n⏱️  Latency Report")
+    print("-" * 50)
+    for label, elapsed_ms, status in sorted(
+        CHECK_LATENCIES, key=lambda item: item[1], reverse=True
+    ):
+        print(f"   {elapsed_ms:8.0f} ms  {status!s:>5}  {label}")
+
+    latencies = sorted(item[1] for item in CHECK_LATENCIES)
+    print(
+        f"   {len(latencies)} requests - p50 {percentile(latencies, 0.50):.0f} ms, "
+        f"p95 {percentile(latencies, 0.95):.0f} ms, max {latencies[-1]:.0f} ms"
+    )
+
+
+def probe_endpoints():
+    """Build the read endpoints exercised by the capacity probe."""
+    base_url = CONFIG["base_url"].rstrip("/")
+    endpoints = [
+        ("users/me", f"{base_url}/api/v3/users/me"),
+        ("projects", f"{base_url}/api/v3/projects?pageSize=100"),
+        ("time_entries", f"{base_url}/api/v3/time_entries?pageSize=100"),
+    ]
+
+    for project_id in PROJECT_MAPPINGS.values():
+        endpoints.append(("project", f"{base_url}/api/v3/projects/{project_id}"))
+        endpoints.append(
+            (
+                "work_packages",
+                f"{base_url}/api/v3/projects/{project_id}/work_packages?pageSize=100",
+            )
+        )
+        break
+
+    return endpoints
+
+
+def run_probe(concurrency, total_requests):
+    """Hammer the read endpoints in parallel and report throughput and latency."""
+    print(f"\n🔥 Probing {CONFIG['base_url']}")
+    print(f"   {total_requests} requests, {concurrency} in parallel")
+    print("=" * 50)
+
+    session = create_session(pool_size=concurrency)
+    endpoints = probe_endpoints()
+    checks = [
+        (name, url)
+        for name, url in (
+            endpoints[index % len(endpoints)] for index in range(total_requests)
+        )
+    ]
+
+    def probe(check):
+        name, url = check
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=30)
+            response.content  # Include the body transfer in the timing
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        return name, (time.perf_counter() - start) * 1000, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(probe, checks))
+    wall_seconds = time.perf_counter() - start
+
+    errors = [result for result in results if result[2] != 200]
+    print(
+        f"Throughput: {len(results) / wall_seconds:.1f} req/s over {wall_seconds:.2f} s"
+    )
+    print(f"Errors: {len(errors)}/{len(results)}")
+
+    by_endpoint = {"all": [result[1] for result in results]}
+    for name, elapsed_ms, _ in results:
+        by_endpoint.setdefault(name, []).append(elapsed_ms)
+
+    print(f"\n{'endpoint':<16}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, latencies in by_endpoint.items():
+        latencies.sort()
+        print(
+            f"{name:<16}{len(latencies):>7}"
+            f"{percentile(latencies, 0.50):>8.0f}ms"
+            f"{percentile(latencies, 0.95):>8.0f}ms"
+            f"{percentile(latencies, 0.99):>8.0f}ms"
+        )
+
+    if errors:
+        statuses = {}
+        for _, _, status in errors:
+            statuses[status] = statuses.get(status, 0) + 1
+        print(f"\nError statuses: {statuses}")
+
+    return not errors
+
+
+def main(argv=None):
     """Run all API tests."""
+    arg_parser = argparse.ArgumentParser(
+        description="Test OpenProject API connectivity and configuration."
+    )
+    arg_parser.add_argument(
+        "--probe",
+        action="store_true",
+        help="Load-test the read endpoints instead of running the diagnostics",
+    )
+    arg_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Parallel requests (default: {DEFAULT_CONCURRENCY})",
+    )
+    arg_parser.add_argument(
+        "--requests",
+        type=int,
+        default=200,
+        help="Total probe requests (default: 200)",
+    )
+    arg_parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=True,
+        metavar="PREFIX",
+        help="Profile the run and write PREFIX.pstats and PREFIX.txt",
+    )
+    from log import add_cassette_arguments, cassette_context
+
+    add_cassette_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
+
+    with cassette_context(args):
+        if args.profile:
+            from profiling import default_profile_prefix, profile_run
+
+            prefix = (
+                args.profile if isinstance(args.profile, str) else None
+            ) or default_profile_prefix("test_api")
+            with profile_run(prefix, "test_api.py"):
+                return run_tests(args)
+
+        return run_tests(args)
+
+
+def run_tests(args):
+    """Run the diagnostics or the load probe selected by the arguments."""
+    from profiling import profile_phase
+
+    if args.probe:
+        with profile_phase("probe"):
+            return run_probe(args.concurrency, args.requests)
+
     print("\n🚀 OpenProject API Configuration Test")
     print("=" * 50)
 
-    session = test_api_connection()
+    with profile_phase("connection"):
+        session = test_api_connection()
     if not session:
         print("\n❌ Cannot proceed - API connection failed")
         print("\nTroubleshooting:")
@@ -275,16 +664,28 @@ def main():
         print("3. Ensure you have internet connectivity")
         return False
 
-    project_results = test_projects(session)
+    with profile_phase("checks"):
+        # Every independent check goes out in one parallel burst
+        results = run_checks(
+            session,
+            project_checks() + form_checks() + user_checks(),
+            args.concurrency,
+        )
+
+        project_results = test_projects(session, results)
+
+    with profile_phase("project mappings"):
+        # Get available project mappings from API
+        available_mappings = get_project_mappings(session)
 
-    # Get available project mappings from API
-    available_mappings = get_project_mappings(session)
+    with profile_phase("checks"):
+        test_work_package_creation(session, results)
 
-    test_work_package_creation(session)
+        test_time_entry_creation(session, results)
 
-    test_time_entry_creation(session)
+        test_user_permissions(session, results)
 
-    test_user_permissions(session)
+    print_latency_report()
 
     # Summary
     print(f"\n📊 Test Summary")
@@ -310,4 +711,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(0 if main() else 1)
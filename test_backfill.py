@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Tests for the leased SQLite work queue of the sharded backfill."""
+
+import pytest
+
+import backfill
+from backfill import WorkQueue
+
+BLOCK = {"date": "2025-09-07", "entries": ["Review 1.5h"]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(backfill.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "queue" / "backfill.sqlite3")
+
+
+def test_units_are_claimed_in_date_order(queue_path, clock):
+    with WorkQueue(queue_path) as queue:
+        assert queue.enqueue("alice", "2025-09-08", BLOCK, "logs.json")
+        assert queue.enqueue("alice", "2025-09-07", BLOCK, "logs.json")
+        assert queue.enqueue("bob", "2025-09-06", BLOCK, "bob.json")
+
+        assert queue.claim("w1", user="alice").day == "2025-09-07"
+        assert queue.claim("w1").day == "2025-09-06"
+        assert queue.claim("w1").day == "2025-09-08"
+        assert queue.claim("w1") is None
+        assert queue.counts()["leased"] == 3
+
+
+def test_expired_lease_is_claimed_by_another_worker(queue_path, clock):
+    with WorkQueue(queue_path) as first, WorkQueue(queue_path) as second:
+        first.enqueue("alice", "2025-09-07", BLOCK)
+        unit = first.claim("w1", lease_seconds=60)
+        assert unit.payload == BLOCK and unit.attempts == 1
+
+        clock[0] += 30
+        assert second.claim("w2") is None
+        assert first.renew(unit.id, "w1", lease_seconds=60)
+
+        # The renewed lease runs out; w1 has crashed or lost the network
+        clock[0] += 61
+        taken_over = second.claim("w2")
+        assert (taken_over.id, taken_over.attempts) == (unit.id, 2)
+
+        assert not first.renew(unit.id, "w1")
+        assert not first.complete(unit.id, "w1", [], succeeded=True)
+        assert second.complete(unit.id, "w2", [{"ok": True}], succeeded=True)
+        assert first.counts() == {"pending": 0, "leased": 0, "done": 1, "failed": 0}
+
+
+def test_unit_fails_after_max_attempts(queue_path, clock):
+    with WorkQueue(queue_path, max_attempts=2) as queue:
+        queue.enqueue("alice", "2025-09-07", BLOCK)
+        unit = queue.claim("w1")
+        assert queue.complete(unit.id, "w1", ["timeout"], succeeded=False)
+
+        # The second attempt's worker dies and its lease runs out
+        assert queue.claim("w1", lease_seconds=10).attempts == 2
+        clock[0] += 11
+        assert queue.claim("w2") is None
+        assert queue.failures() == [("alice", "2025-09-07", 2, ["timeout"])]
+
+        assert queue.retry_failed() == 1
+        assert queue.claim("w2").attempts == 1
+
+
+def test_enqueue_resets_only_changed_idle_units(queue_path, clock):
+    changed = {**BLOCK, "entries": ["Review 2h"]}
+    with WorkQueue(queue_path) as queue:
+        queue.enqueue("alice", "2025-09-07", BLOCK)
+        assert not queue.enqueue("alice", "2025-09-07", BLOCK)
+
+        unit = queue.claim("w1")
+        assert not queue.enqueue("alice", "2025-09-07", changed)
+        queue.complete(unit.id, "w1", [], succeeded=True)
+
+        assert queue.enqueue("alice", "2025-09-07", changed)
+        assert queue.claim("w1").payload == changed
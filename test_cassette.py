@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Tests for recording HTTP traffic to a cassette and replaying it."""
+
+import json
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+from cassette import REDACTED, CassetteMiss, mount_cassette, use_cassette
+
+BASE_URL = "https://op.example.com"
+TOKEN = "s3cret-token"
+
+
+class StubAdapter(BaseAdapter):
+    """Answers every request with a numbered JSON body that echoes the token."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers["Content-Type"] = "application/json"
+        response.headers["Set-Cookie"] = "session=abc"
+        response.headers["X-Echo"] = TOKEN
+        response._content = json.dumps(
+            {"call": len(self.sent), "token": TOKEN}
+        ).encode()
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def session_with(adapter):
+    session = requests.Session()
+    session.auth = ("apikey", TOKEN)
+    session.mount(BASE_URL + "/", adapter)
+    mount_cassette(session)
+    return session
+
+
+def record(path, calls):
+    with use_cassette(str(path), "record", secrets=[TOKEN]):
+        session = session_with(StubAdapter())
+        for method, url, body in calls:
+            session.request(method, url, json=body)
+
+
+def test_cassette_redacts_secrets(tmp_path):
+    path = tmp_path / "run.json"
+    record(
+        path,
+        [("POST", f"{BASE_URL}/api/v3/time_entries?token={TOKEN}", {"x": TOKEN})],
+    )
+
+    text = path.read_text()
+    assert TOKEN not in text
+    interaction = json.loads(text)["interactions"][0]
+    assert interaction["request"]["url"].endswith(f"token={REDACTED}")
+    assert "Authorization" not in interaction["request"]["headers"]
+    assert "Set-Cookie" not in interaction["response"]["headers"]
+    assert interaction["response"]["headers"]["X-Echo"] == REDACTED
+
+
+def test_replay_matches_query_order_and_json_body(tmp_path):
+    path = tmp_path / "run.json"
+    record(
+        path,
+        [
+            ("GET", f"{BASE_URL}/api/v3/projects?a=1&b=2", None),
+            ("POST", f"{BASE_URL}/api/v3/work_packages", {"a": 1, "b": 2}),
+        ],
+    )
+
+    with use_cassette(str(path), "replay", secrets=[TOKEN]) as cassette:
+        adapter = StubAdapter()
+        session = session_with(adapter)
+        listed = session.get(f"{BASE_URL}/api/v3/projects?b=2&a=1")
+        created = session.post(
+            f"{BASE_URL}/api/v3/work_packages", data='{"b": 2, "a": 1}'
+        )
+        with pytest.raises(CassetteMiss):
+            session.get(f"{BASE_URL}/api/v3/statuses")
+
+    assert adapter.sent == []
+    assert listed.json() == {"call": 1, "token": REDACTED}
+    assert created.json()["call"] == 2
+    assert cassette.misses == 1
+
+
+def test_repeated_requests_replay_in_order(tmp_path):
+    path = tmp_path / "run.json"
+    url = f"{BASE_URL}/api/v3/time_entries"
+    record(path, [("GET", url, None)] * 2)
+
+    with use_cassette(str(path), "replay"):
+        session = session_with(StubAdapter())
+        calls = [session.get(url).json()["call"] for _ in range(3)]
+    # The last response keeps answering once the recorded ones run out
+    assert calls == [1, 2, 2]
+
+
+def test_sessions_outside_the_block_are_not_wrapped():
+    adapter = StubAdapter()
+    session = session_with(adapter)
+    assert session.get(f"{BASE_URL}/api/v3/projects").json()["call"] == 1
+    assert len(adapter.sent) == 1
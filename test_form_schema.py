@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Tests for form schema validation and the per-project schema cache."""
+
+import form_schema
+from form_schema import FormSchema, FormSchemaCache
+
+BASE_URL = "https://openproject.example"
+
+# Schema section of a POST /api/v3/time_entries/form response, trimmed to the
+# fields a time entry payload sets plus some the form adds around them
+TIME_ENTRY_SCHEMA = {
+    "_type": "Schema",
+    "_dependencies": [],
+    "id": {
+        "type": "Integer",
+        "name": "ID",
+        "required": True,
+        "hasDefault": False,
+        "writable": False,
+        "options": {},
+    },
+    "createdAt": {
+        "type": "DateTime",
+        "name": "Created on",
+        "required": True,
+        "hasDefault": False,
+        "writable": False,
+        "options": {},
+    },
+    "spentOn": {
+        "type": "Date",
+        "name": "Date",
+        "required": True,
+        "hasDefault": False,
+        "writable": True,
+        "options": {},
+    },
+    "hours": {
+        "type": "Duration",
+        "name": "Hours",
+        "required": True,
+        "hasDefault": False,
+        "writable": True,
+        "options": {},
+    },
+    "comment": {
+        "type": "Formattable",
+        "name": "Comment",
+        "required": False,
+        "hasDefault": False,
+        "writable": True,
+        "options": {},
+    },
+    "user": {
+        "type": "User",
+        "name": "User",
+        "required": True,
+        "hasDefault": True,
+        "writable": True,
+        "location": "_links",
+        "_links": {"allowedValues": {"href": "/api/v3/principals?filters=..."}},
+    },
+    "workPackage": {
+        "type": "WorkPackage",
+        "name": "Work package",
+        "required": True,
+        "hasDefault": False,
+        "writable": True,
+        "location": "_links",
+        "_links": {
+            "allowedValues": {"href": "/api/v3/time_entries/available_work_packages"}
+        },
+    },
+    "project": {
+        "type": "Project",
+        "name": "Project",
+        "required": False,
+        "hasDefault": False,
+        "writable": True,
+        "location": "_links",
+        "_links": {
+            "allowedValues": {"href": "/api/v3/time_entries/available_projects"}
+        },
+    },
+    "activity": {
+        "type": "TimeEntriesActivity",
+        "name": "Activity",
+        "required": True,
+        "hasDefault": True,
+        "writable": True,
+        "location": "_links",
+        "_embedded": {
+            "allowedValues": [
+                {
+                    "_type": "TimeEntriesActivity",
+                    "id": 3,
+                    "name": "Development",
+                    "position": 3,
+                    "default": True,
+                    "_links": {
+                        "self": {
+                            "href": "/api/v3/time_entries/activities/3",
+                            "title": "Development",
+                        }
+                    },
+                },
+                {
+                    "_type": "TimeEntriesActivity",
+                    "id": 5,
+                    "name": "Testing",
+                    "position": 5,
+                    "default": False,
+                    "_links": {
+                        "self": {
+                            "href": "/api/v3/time_entries/activities/5",
+                            "title": "Testing",
+                        }
+                    },
+                },
+            ]
+        },
+        "_links": {},
+    },
+    "_links": {},
+}
+
+
+def payload(**fields):
+    links = {
+        "workPackage": {"href": "/api/v3/work_packages/42"},
+        "activity": {"href": "/api/v3/time_entries/activities/3"},
+    }
+    links.update(fields.pop("_links", {}))
+    return {
+        "spentOn": "2025-01-06",
+        "hours": "PT1.5H",
+        "comment": "[IDCOL] Review",
+        **fields,
+        "_links": links,
+    }
+
+
+class FakeResponse:
+    def __init__(self, schema):
+        self.schema = schema
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"_type": "Form", "_embedded": {"payload": {}, "schema": self.schema}}
+
+
+class FakeSession:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append((url, json))
+        return FakeResponse(TIME_ENTRY_SCHEMA)
+
+
+def schema_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(form_schema, "get_cache_dir", lambda: str(tmp_path))
+    session = FakeSession()
+    return session, FormSchemaCache(session, BASE_URL, ttl_hours=24)
+
+
+def test_valid_time_entry_passes():
+    assert FormSchema.from_schema(TIME_ENTRY_SCHEMA).validate(payload()) == []
+
+
+def test_time_entry_problems_use_the_server_wording():
+    schema = FormSchema.from_schema(TIME_ENTRY_SCHEMA)
+    errors = schema.validate(
+        payload(
+            spentOn="2025-13-01",
+            hours="1.5h",
+            _links={"activity": {"href": "/api/v3/time_entries/activities/9"}},
+        )
+    )
+    assert errors == [
+        "Date is not a valid date.",
+        "Hours is not a valid duration.",
+        "Activity is not set to one of the allowed values.",
+    ]
+
+
+def test_fields_with_defaults_or_read_only_are_not_required():
+    errors = FormSchema.from_schema(TIME_ENTRY_SCHEMA).validate(
+        payload(_links={"activity": {"href": None}})
+    )
+    assert errors == []
+
+
+def test_time_entry_schema_is_fetched_once_per_project(monkeypatch, tmp_path):
+    session, schemas = schema_cache(monkeypatch, tmp_path)
+    schemas.time_entry(42, project_id=64)
+    schemas.time_entry(43, project_id=64)
+    schemas.time_entry(44, project_id=65)
+
+    assert [body for _, body in session.posts] == [
+        {
+            "_links": {
+                "workPackage": {"href": "/api/v3/work_packages/42"},
+                "project": {"href": "/api/v3/projects/64"},
+            }
+        },
+        {
+            "_links": {
+                "workPackage": {"href": "/api/v3/work_packages/44"},
+                "project": {"href": "/api/v3/projects/65"},
+            }
+        },
+    ]
+    assert {url for url, _ in session.posts} == {f"{BASE_URL}/api/v3/time_entries/form"}
+
+
+def test_forgetting_a_schema_keeps_other_projects(monkeypatch, tmp_path):
+    session, schemas = schema_cache(monkeypatch, tmp_path)
+    schemas.time_entry(42, project_id=64)
+    schemas.time_entry(44, project_id=65)
+    schemas.forget_time_entry(42, project_id=64)
+
+    # A fresh cache reads what is left from disk
+    reloaded = FormSchemaCache(session, BASE_URL, ttl_hours=24)
+    reloaded.time_entry(44, project_id=65)
+    reloaded.time_entry(42, project_id=64)
+    assert len(session.posts) == 3
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Tests for the SQLite work log history and its reports."""
+
+import sqlite3
+from datetime import date
+
+import pytest
+
+from history import WorkLogHistory
+
+
+def entry(project, subject, hours, activity="Development"):
+    return {
+        "project": project,
+        "subject": subject,
+        "hours": hours,
+        "activity": activity,
+        "work_package_id": None,
+        "is_scrum": False,
+    }
+
+
+SEPTEMBER = {
+    date(2025, 9, 7): [entry("IDCOL", "Review", 1.5), entry("CBL", "Deploy", 2)],
+    date(2025, 9, 8): [entry("IDCOL", "Standup", 0.25, activity="Meeting")],
+}
+OCTOBER = {date(2025, 10, 1): [entry("IDCOL", "Review", 3)]}
+
+
+@pytest.fixture
+def history(tmp_path):
+    with WorkLogHistory(str(tmp_path / "history.sqlite3")) as history:
+        yield history
+
+
+def test_report_rollups(history):
+    assert history.archive(SEPTEMBER, source="logs.json") == 3
+    history.archive(OCTOBER, source="logs.json")
+
+    assert history.report(["project"]) == [("CBL", 2.0, 1), ("IDCOL", 4.75, 3)]
+    assert history.report(["month", "activity"]) == [
+        ("2025-09", "Development", 3.5, 2),
+        ("2025-09", "Meeting", 0.25, 1),
+        ("2025-10", "Development", 3.0, 1),
+    ]
+    # 2025-09-07 is a Sunday, the end of ISO week 36
+    assert history.report(["week"]) == [
+        ("2025-W36", 3.5, 2),
+        ("2025-W37", 0.25, 1),
+        ("2025-W40", 3.0, 1),
+    ]
+    assert history.report([]) == [(6.75, 4)]
+
+
+def test_report_filters(history):
+    history.archive(SEPTEMBER, source="logs.json")
+    history.archive(OCTOBER, source="logs.json")
+
+    assert history.report(
+        ["date"], start_date=date(2025, 9, 8), end_date=date(2025, 9, 30)
+    ) == [("2025-09-08", 0.25, 1)]
+    assert history.report(["year"], project="CBL") == [("2025", 2.0, 1)]
+    assert history.report(["project"], project="Unknown") == []
+    with pytest.raises(ValueError, match="Unknown report dimension"):
+        history.report(["team"])
+
+
+def test_rearchiving_a_source_replaces_its_dates(history):
+    history.archive(SEPTEMBER, source="logs.json")
+    history.archive(SEPTEMBER, source="logs.json")
+    assert history.summary() == (3, date(2025, 9, 7), date(2025, 9, 8))
+
+    # Another file for the same date is kept next to it
+    history.archive(
+        {date(2025, 9, 7): [entry("SEBL", "Support", 1)]}, source="team.json"
+    )
+    assert history.report(["project"])[-1] == ("SEBL", 1.0, 1)
+
+    # Only the dates of the new archive are replaced
+    history.archive(
+        {date(2025, 9, 7): [entry("IDCOL", "Review", 2)]}, source="logs.json"
+    )
+    assert history.report(["date"]) == [
+        ("2025-09-07", 3.0, 2),
+        ("2025-09-08", 0.25, 1),
+    ]
+
+
+def test_sources_per_date(history):
+    history.archive(
+        {**SEPTEMBER, **OCTOBER},
+        source="logs.json",
+        sources={date(2025, 10, 1): "october.json"},
+    )
+    history.archive(OCTOBER, source="october.json")
+    assert history.summary()[0] == 4
+
+
+def test_old_archive_gets_sources(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE entries (day INTEGER NOT NULL, month INTEGER NOT NULL,
+            project_id INTEGER NOT NULL, activity_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL, work_package_id INTEGER,
+            is_scrum INTEGER NOT NULL, hours REAL NOT NULL);
+        CREATE TABLE archives (source TEXT NOT NULL, archived_at REAL NOT NULL,
+            first_day INTEGER NOT NULL, last_day INTEGER NOT NULL,
+            entries INTEGER NOT NULL);
+        """)
+    day = date(2025, 9, 7).toordinal()
+    connection.execute(
+        "INSERT INTO entries VALUES (?, ?, 1, 1, 1, NULL, 0, 1.5)",
+        (day, 2025 * 12 + 8),
+    )
+    connection.execute(
+        "INSERT INTO archives VALUES ('logs.json', 1, ?, ?, 1)", (day, day)
+    )
+    connection.commit()
+    connection.close()
+
+    with WorkLogHistory(path) as history:
+        # Re-archiving the same file replaces the migrated row
+        history.archive(
+            {date(2025, 9, 7): [entry("IDCOL", "Review", 2)]}, source="logs.json"
+        )
+        assert history.summary()[0] == 1
+        assert history.report([]) == [(2.0, 1)]
+
+
+def test_empty_summary(history):
+    assert history.summary() == (0, None, None)
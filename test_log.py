@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Tests for the work log parser's activity classifier."""
+
+import random
+
+from log import DEFAULT_ACTIVITY_KEYWORDS, ActivityClassifier
+
+
+def first_keyword_activity(keywords, text, default="Development"):
+    """The rule the classifier implements: the first keyword found wins."""
+    text = text.lower()
+    for keyword, activity in keywords.items():
+        if keyword.lower() in text:
+            return activity
+    return default
+
+
+def test_default_keywords():
+    classifier = ActivityClassifier()
+    assert classifier.classify("Daily scrum") == "Meeting"
+    assert classifier.classify("Staging server setup") == "Development"
+    assert classifier.classify("Recruitment feedback") == "Specification"
+    assert classifier.classify("Write release notes") == "Development"
+
+
+def test_keyword_hidden_inside_a_longer_match():
+    """A higher priority keyword inside a longer matched keyword still wins."""
+    keywords = {"view": "Specification", "review": "Meeting", "re": "Support"}
+    classifier = ActivityClassifier(keywords)
+    assert classifier.classify("Code review") == "Specification"
+
+
+def test_longest_match_keeps_prefix_priority():
+    """A longer keyword found in place of its higher priority prefix keeps that priority."""
+    classifier = ActivityClassifier({"fix": "Support", "fixed": "Development"})
+    assert classifier.classify("Fixed login") == "Support"
+
+
+def test_regex_metacharacters_are_literal():
+    classifier = ActivityClassifier({"c++": "Development", "q&a": "Meeting"})
+    assert classifier.classify("Q&A with client") == "Meeting"
+    assert classifier.classify("cxx build") == "Development"
+    assert classifier.pattern.findall("c++ and q&a") == ["c++", "q&a"]
+
+
+def test_matches_first_keyword_rule_on_random_text():
+    """Overlapping keywords on a small alphabet agree with the naive scan."""
+    rng = random.Random(1)
+    activities = ["Meeting", "Support", "Testing", "Specification"]
+    for _ in range(50):
+        keywords = {
+            "".join(rng.choice("abc") for _ in range(rng.randint(1, 4))): rng.choice(
+                activities
+            )
+            for _ in range(rng.randint(1, 8))
+        }
+        classifier = ActivityClassifier(keywords, default_activity="Development")
+        for _ in range(40):
+            text = "".join(rng.choice("abcd ") for _ in range(rng.randint(0, 12)))
+            assert classifier.classify(text) == first_keyword_activity(
+                keywords, text
+            ), (keywords, text)
+
+
+def test_default_keywords_match_first_keyword_rule():
+    classifier = ActivityClassifier()
+    for text in [
+        "Fix staging server",
+        "Template view for profile",
+        "Feedback session",
+        "Setup meeting room",
+        "",
+    ]:
+        assert classifier.classify(text) == first_keyword_activity(
+            DEFAULT_ACTIVITY_KEYWORDS, text
+        )
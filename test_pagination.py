@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Tests for the concurrent collection pagination engine."""
+
+import json
+import threading
+
+import pytest
+from requests.exceptions import HTTPError
+
+import pagination
+import sparse
+from pagination import iter_collection
+
+URL = "https://openproject.example/api/v3/projects/64/work_packages"
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode("utf-8")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(f"{self.status_code} Error", response=self)
+
+
+class FakeSession:
+    """Serves a collection of total elements, capping pageSize at max_page_size."""
+
+    def __init__(self, total, max_page_size=100, reject_select=False, fail_page=None):
+        self.total = total
+        self.max_page_size = max_page_size
+        self.reject_select = reject_select
+        self.fail_page = fail_page
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        with self.lock:
+            self.requests.append(dict(params))
+        if self.reject_select and "select" in params:
+            return FakeResponse(400, {"message": "select not supported"})
+        page = params["offset"]
+        if page == self.fail_page:
+            return FakeResponse(500, {"message": "boom"})
+        size = min(params["pageSize"], self.max_page_size)
+        start = (page - 1) * size
+        ids = range(start + 1, min(start + size, self.total) + 1)
+        return FakeResponse(
+            200,
+            {
+                "total": self.total,
+                "count": len(ids),
+                "pageSize": size,
+                "offset": page,
+                "_embedded": {"elements": [{"id": i, "subject": f"#{i}"} for i in ids]},
+            },
+        )
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr(pagination, "_served_page_sizes", {})
+    monkeypatch.setattr(sparse, "_select_rejected", set())
+
+
+def test_capped_pages_are_read_with_the_served_size():
+    session = FakeSession(total=250, max_page_size=100)
+    elements = list(iter_collection(session, URL, page_size=1000, max_workers=2))
+
+    assert sorted(element["id"] for element in elements) == list(range(1, 251))
+    assert [(r["offset"], r["pageSize"]) for r in session.requests[:1]] == [(1, 1000)]
+    assert sorted((r["offset"], r["pageSize"]) for r in session.requests[1:]) == [
+        (2, 100),
+        (3, 100),
+    ]
+
+
+def test_served_page_size_is_remembered_per_collection():
+    session = FakeSession(total=150, max_page_size=100)
+    list(iter_collection(session, URL, max_workers=1))
+    session.requests.clear()
+
+    list(iter_collection(session, URL, max_workers=1))
+    assert session.requests[0]["pageSize"] == 100
+
+
+def test_single_page_collection_takes_one_request():
+    session = FakeSession(total=3)
+    assert len(list(iter_collection(session, URL))) == 3
+    assert len(session.requests) == 1
+
+
+def test_empty_collection():
+    session = FakeSession(total=0)
+    assert list(iter_collection(session, URL)) == []
+
+
+def test_rejected_select_falls_back_to_full_elements():
+    session = FakeSession(total=5, reject_select=True)
+    fields = ["id", "subject"]
+    assert len(list(iter_collection(session, URL, fields=fields, collection="wp"))) == 5
+    assert len(list(iter_collection(session, URL, fields=fields, collection="wp"))) == 5
+
+    # Only the first read asks for the select parameter
+    assert ["select" in request for request in session.requests] == [
+        True,
+        False,
+        False,
+    ]
+
+
+def test_failed_page_raises():
+    session = FakeSession(total=250, max_page_size=100, fail_page=3)
+    with pytest.raises(HTTPError):
+        list(iter_collection(session, URL, max_workers=2))
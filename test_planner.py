@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Tests for cross-date request planning."""
+
+from collections import namedtuple
+from datetime import date
+
+from planner import build_plan, date_runs, run_plan
+
+Row = namedtuple("Row", "id spent_on")
+
+
+class StubReferenceData:
+    def project_id(self, project_name):
+        return {"IDCOL": 64}.get(project_name)
+
+
+class StubLogger:
+    """Records the reads the planner issues instead of sending them."""
+
+    def __init__(self, rows=()):
+        self.reference_data = StubReferenceData()
+        self.subject_indexes = {}
+        self.time_entries_by_date = {}
+        self.rows = list(rows)
+        self.calls = []
+
+    def fetch_time_entries(self, start_date, end_date):
+        self.calls.append(("time_entries", start_date, end_date))
+        return [
+            row
+            for row in self.rows
+            if start_date.isoformat() <= row.spent_on <= end_date.isoformat()
+        ]
+
+    def build_subject_index(self, project_id):
+        self.calls.append(("subject_index", project_id))
+        return {}
+
+    def fetch_work_packages(self, ids):
+        self.calls.append(("work_packages", tuple(ids)))
+        return [Row(int(work_package_id), None) for work_package_id in ids]
+
+
+def entry(**fields):
+    return {"hours": 1, "activity": "Development", **fields}
+
+
+def test_weekend_does_not_split_a_run():
+    friday, monday = date(2025, 1, 10), date(2025, 1, 13)
+    assert date_runs([friday, monday]) == [(friday, monday)]
+
+
+def test_sparse_plan_queries_each_run_separately():
+    """Dates months apart are read in two narrow queries, not one wide one."""
+    january, june = date(2025, 1, 6), date(2025, 6, 2)
+    logger = StubLogger(
+        rows=[Row(1, "2025-01-06"), Row(2, "2025-03-01"), Row(3, "2025-06-02")]
+    )
+    plan = build_plan(
+        logger,
+        {
+            january: [entry(work_package_id="10")],
+            june: [entry(create_new_task=True, project="IDCOL")],
+        },
+    )
+
+    assert plan.reads == 3
+    assert run_plan(logger, plan, max_workers=1) == []
+    assert sorted(call for call in logger.calls if call[0] == "time_entries") == [
+        ("time_entries", january, january),
+        ("time_entries", june, june),
+    ]
+    assert ("subject_index", 64) in logger.calls
+    assert ("work_packages", ("10",)) in logger.calls
+    assert logger.time_entries_by_date == {
+        "2025-01-06": [Row(1, "2025-01-06")],
+        "2025-06-02": [Row(3, "2025-06-02")],
+    }
+
+
+def test_cached_dates_are_not_planned():
+    logger = StubLogger()
+    logger.time_entries_by_date["2025-01-06"] = []
+    plan = build_plan(logger, {date(2025, 1, 6): [entry(work_package_id="10")]})
+    assert plan.dates == []
+    assert plan.reads == 0
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Tests for the token bucket and AIMD concurrency controller."""
+
+import threading
+
+import pytest
+
+import rate_limit
+from rate_limit import AIMDController, HostLimiter, TokenBucket
+
+
+class FakeClock:
+    """Stands in for time.monotonic and time.sleep."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(round(seconds, 6))
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limit.time, "sleep", clock.sleep)
+    return clock
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_bucket_allows_a_burst_then_the_steady_rate(clock):
+    bucket = TokenBucket(rate=4, burst=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.slept == []
+
+    bucket.acquire()
+    assert clock.slept == [0.25]
+
+    # Idle time refills the bucket, but never beyond the burst
+    clock.now += 60
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.slept == [0.25]
+
+
+def test_paused_bucket_waits_out_the_pause(clock):
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.pause(2)
+    bucket.acquire()
+    assert clock.slept == [2.0]
+
+
+def test_healthy_responses_grow_the_limit_additively(clock):
+    controller = AIMDController(initial=4, maximum=6)
+    for _ in range(4):
+        controller.acquire()
+        controller.release(0.1, overloaded=False)
+    # Roughly one slot per round of limit responses
+    assert 4.9 < controller.limit < 5
+
+    for _ in range(100):
+        controller.acquire()
+        controller.release(0.1, overloaded=False)
+    assert controller.limit == 6
+
+
+def test_overload_halves_the_limit_once_per_round_trip(clock):
+    controller = AIMDController(initial=8, minimum=1)
+    controller.acquire()
+    controller.release(0.5, overloaded=False)
+
+    for _ in range(3):
+        controller.acquire()
+        controller.release(0.5, overloaded=True)
+    assert controller.limit == 8.125 / 2
+
+    clock.now += 1
+    controller.acquire()
+    controller.release(0.5, overloaded=True)
+    assert controller.limit == 8.125 / 4
+
+    for _ in range(5):
+        clock.now += 1
+        controller.acquire()
+        controller.release(0.5, overloaded=True)
+    assert controller.limit == 1
+
+
+def test_slow_responses_count_as_overload(clock):
+    controller = AIMDController(initial=8)
+    for _ in range(5):
+        controller.acquire()
+        controller.release(0.1, overloaded=False)
+    before = controller.limit
+
+    # The smoothed latency climbs past twice its best value
+    for _ in range(10):
+        clock.now += 5
+        controller.acquire()
+        controller.release(2.0, overloaded=False)
+    assert controller.limit < before / 2
+
+
+def test_acquire_blocks_at_the_limit():
+    controller = AIMDController(initial=1, maximum=1)
+    controller.acquire()
+    acquired = threading.Event()
+
+    def second_request():
+        controller.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=second_request)
+    thread.start()
+    assert not acquired.wait(0.1)
+
+    controller.release(0.1, overloaded=False)
+    assert acquired.wait(1)
+    thread.join()
+    assert controller.in_flight == 1
+
+
+def test_host_limiter_honours_retry_after(clock):
+    limiter = HostLimiter(requests_per_second=10, burst=5, max_concurrency=4)
+    limiter.before_request()
+    limiter.after_request(0.1, FakeResponse(429, {"Retry-After": "3"}))
+    assert limiter.throttled == 1
+
+    limiter.before_request()
+    assert clock.slept == [3.0]
+
+    limiter.after_request(0.1, None)  # A failed request is an overload too
+    assert limiter.throttled == 2
+    assert limiter.concurrency.in_flight == 0
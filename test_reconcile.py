@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Tests for reconciling the work log with remote time entries."""
+
+import csv
+from datetime import date
+
+import pytest
+
+from reconcile import (
+    RECONCILE_COLUMNS,
+    parse_iso_duration,
+    reconcile_entries,
+    summarize,
+    write_reconcile_csv,
+)
+from sparse import TimeEntryRow
+
+DEVELOPMENT = "/api/v3/time_entries/activities/3"
+MEETING = "/api/v3/time_entries/activities/14"
+
+
+class StubReferenceData:
+    def activity_href(self, activity_name):
+        return {"Development": DEVELOPMENT, "Meeting": MEETING}.get(activity_name)
+
+
+def local(subject, hours, work_package_id=None, activity="Development"):
+    return {
+        "subject": subject,
+        "hours": hours,
+        "work_package_id": work_package_id,
+        "activity": activity,
+    }
+
+
+def remote(spent_on, work_package_id, title, hours, activity=DEVELOPMENT):
+    name = "Development" if activity == DEVELOPMENT else "Meeting"
+    return TimeEntryRow(None, spent_on, hours, work_package_id, title, activity, name)
+
+
+@pytest.mark.parametrize(
+    "duration, hours",
+    [
+        ("PT1H30M", 1.5),
+        ("PT45M", 0.75),
+        ("PT2.5H", 2.5),
+        ("P1DT1H", 25.0),
+        ("PT90S", 0.025),
+        ("1.5", 0.0),
+        (None, 0.0),
+    ],
+)
+def test_parse_iso_duration(duration, hours):
+    assert parse_iso_duration(duration) == pytest.approx(hours)
+
+
+def test_rows_for_every_status():
+    all_date_entries = {
+        date(2025, 9, 7): [
+            local("Review", 1.5, work_package_id=42),
+            local("Review", 0.5, work_package_id=42),  # Summed with the above
+            local("Standup", 0.25, work_package_id=7, activity="Meeting"),
+            local("New login page", 3),
+        ],
+        date(2025, 9, 8): [local("Deploy", 1, work_package_id=43)],
+    }
+    remote_entries = [
+        remote("2025-09-07", 42, "Review", "PT2H"),
+        remote("2025-09-07", 7, "Standup", "PT30M", activity=MEETING),
+        # Created from the work log; matched by its subject
+        remote("2025-09-07", 1001, "New login page", "PT3H"),
+        remote("2025-09-09", 44, "Hotfix", "PT1H"),
+    ]
+
+    rows = reconcile_entries(all_date_entries, remote_entries, StubReferenceData())
+
+    assert [
+        (row["status"], row["date"], row["work_package"], row["activity"])
+        for row in rows
+    ] == [
+        ("ok", "2025-09-07", 1001, "Development"),
+        ("ok", "2025-09-07", 42, "Development"),
+        ("mismatch", "2025-09-07", 7, "Meeting"),
+        ("missing", "2025-09-08", 43, "Development"),
+        ("extra", "2025-09-09", 44, "Development"),
+    ]
+    assert rows[2]["local_hours"] == 0.25 and rows[2]["remote_hours"] == 0.5
+    assert rows[3]["remote_hours"] == "" and rows[4]["local_hours"] == ""
+    assert summarize(rows) == {"ok": 2, "missing": 1, "extra": 1, "mismatch": 1}
+
+
+def test_new_task_without_remote_entry_is_missing():
+    rows = reconcile_entries(
+        {date(2025, 9, 7): [local("New login page", 3)]}, [], StubReferenceData()
+    )
+    assert [(row["status"], row["work_package"]) for row in rows] == [("missing", "")]
+
+
+def test_write_csv(tmp_path):
+    rows = reconcile_entries(
+        {date(2025, 9, 7): [local("Review", 1, work_package_id=42)]},
+        [remote("2025-09-07", 42, "Review", "PT1H")],
+        StubReferenceData(),
+    )
+    path = tmp_path / "reconcile.csv"
+    write_reconcile_csv(rows, str(path))
+
+    with open(path, newline="", encoding="utf-8") as file:
+        written = list(csv.DictReader(file))
+    assert list(written[0]) == RECONCILE_COLUMNS
+    assert written[0]["status"] == "ok" and written[0]["remote_hours"] == "1.0"
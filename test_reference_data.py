@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Tests for reference data discovery and its disk cache."""
+
+import json
+import os
+
+import reference_data
+from reference_data import CACHE_FILE_NAME, ReferenceData
+
+BASE_URL = "https://openproject.example"
+
+
+def element(element_id, name):
+    return {"id": element_id, "name": name}
+
+
+def fetched(**overrides):
+    """Return a complete fetch result with the given collections replaced."""
+    collections = {
+        "activities": [element(3, "Development")],
+        "statuses": [element(1, "New"), element(2, "In specification")],
+        "types": [element(1, "Task")],
+        "projects": [element(64, "IDCOL")],
+    }
+    collections.update(overrides)
+    return {name: value for name, value in collections.items() if value != "failed"}
+
+
+def load(monkeypatch, tmp_path, collections, refresh=True):
+    monkeypatch.setattr(reference_data, "get_cache_dir", lambda: str(tmp_path))
+    monkeypatch.setattr(
+        ReferenceData, "fetch", staticmethod(lambda session, base_url: collections)
+    )
+    return ReferenceData.load(None, BASE_URL, ttl_hours=24, refresh=refresh)
+
+
+def read_cache(tmp_path):
+    with open(os.path.join(tmp_path, CACHE_FILE_NAME), encoding="utf-8") as file:
+        return json.load(file)["collections"]
+
+
+def test_discovered_statuses_replace_the_defaults():
+    """Only the server's statuses are offered once discovery succeeds."""
+    data = ReferenceData(fetched())
+    assert data.status_choices == [(1, "New"), (2, "In specification")]
+    assert data.status_id("To Do") is None
+
+
+def test_complete_fetch_is_cached(monkeypatch, tmp_path):
+    load(monkeypatch, tmp_path, fetched())
+    assert read_cache(tmp_path)["statuses"] == fetched()["statuses"]
+
+
+def test_failed_collection_is_not_cached(monkeypatch, tmp_path):
+    """A timeout on one collection keeps the old cache and its old value."""
+    load(monkeypatch, tmp_path, fetched())
+    renamed = fetched(
+        statuses="failed", projects=[element(64, "IDCOL"), element(65, "CBL")]
+    )
+    data = load(monkeypatch, tmp_path, renamed)
+
+    # The failed collection falls back to the previous cache...
+    assert data.status_id("In specification") == 2
+    # ...the others are current, and nothing was written
+    assert data.project_id("CBL") == 65
+    assert [project["id"] for project in read_cache(tmp_path)["projects"]] == [64]
+
+
+def test_unexposed_collection_is_cached_as_missing(monkeypatch, tmp_path):
+    """A collection the server does not expose (None) still completes the fetch."""
+    load(monkeypatch, tmp_path, fetched(activities=None))
+    assert read_cache(tmp_path)["activities"] is None
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Tests for the offline spool and its replay."""
+
+import threading
+from datetime import date, time
+
+import pytest
+
+from spool import SPOOL_REF_PREFIX, Spool, flush_spool, is_spool_ref
+
+DAY = date(2025, 9, 7)
+
+
+class StubLogger:
+    """Records the writes a flush replays."""
+
+    def __init__(self, spool, failing_subjects=(), failing_hours=(), existing=()):
+        self.spool = spool
+        self.failing_subjects = set(failing_subjects)
+        self.failing_hours = set(failing_hours)
+        self.existing = set(existing)  # Work package IDs with a time entry already
+        self.work_packages = []
+        self.time_entries = []
+        self.lock = threading.Lock()
+
+    def get_subject_index(self, project_id):
+        return None
+
+    def get_time_entries_for_date(self, day):
+        return []
+
+    def create_work_package(
+        self, project_id, subject, activity_type, description, status_id
+    ):
+        assert self.spool is None, "a flush must not spool again"
+        if subject in self.failing_subjects:
+            return None
+        with self.lock:
+            self.work_packages.append(subject)
+            return 1000 + len(self.work_packages)
+
+    def check_existing_time_entries(self, work_package_id, day, activity_name):
+        return work_package_id in self.existing
+
+    def create_time_entry(
+        self, work_package_id, day, start_time, hours, activity_name, comment
+    ):
+        if hours in self.failing_hours:
+            return None
+        with self.lock:
+            self.time_entries.append((work_package_id, day, start_time, hours))
+            return {"id": len(self.time_entries)}
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return Spool(str(tmp_path / "spool.jsonl"))
+
+
+def spool_new_task(spool, subject, hours):
+    ref = spool.spool_work_package(64, subject, "Development", "", 7)
+    spool.spool_time_entry(ref, DAY, time(9, 30), hours, "Development", subject)
+    return ref
+
+
+def test_spooled_operations_survive_reloading(spool):
+    ref = spool_new_task(spool, "Review", 1.5)
+    operations = Spool(spool.path).load()
+
+    assert is_spool_ref(ref) and spool.offline
+    assert [op["kind"] for op in operations] == ["work_package", "time_entry"]
+    assert operations[1]["depends_on"] == ref[len(SPOOL_REF_PREFIX) :]
+    assert operations[1]["args"]["work_package_id"] is None
+    assert operations[1]["args"]["start_time"] == "09:30:00"
+
+
+def test_damaged_line_is_skipped(spool, capsys):
+    spool.spool_time_entry(42, DAY, None, 1, "Development", "")
+    with open(spool.path, "a", encoding="utf-8") as file:
+        file.write('{"id": "cut sh')
+    assert len(spool) == 1
+    assert "damaged spool line" in capsys.readouterr().out
+
+
+def test_flush_fills_in_new_work_package_ids(spool):
+    spool_new_task(spool, "Review", 1.5)
+    spool.spool_time_entry(42, DAY, None, 2, "Development", "Existing")
+    logger = StubLogger(spool)
+
+    assert flush_spool(logger, spool) == (3, 0)
+    assert sorted(logger.time_entries) == [
+        (42, DAY, None, 2),
+        (1001, DAY, time(9, 30), 1.5),
+    ]
+    assert logger.spool is spool
+    assert spool.load() == [] and not spool.offline
+
+
+def test_failures_stay_in_the_spool(spool):
+    spool_new_task(spool, "Review", 1.5)  # Time entry fails
+    spool_new_task(spool, "Deploy", 2)  # Work package fails
+    logger = StubLogger(spool, failing_subjects={"Deploy"}, failing_hours={1.5})
+
+    assert flush_spool(logger, spool) == (1, 3)
+    remaining = spool.load()
+    assert spool.offline
+    # The entry whose work package was created keeps the real ID...
+    assert remaining[0]["kind"] == "time_entry"
+    assert remaining[0]["depends_on"] is None
+    assert remaining[0]["args"]["work_package_id"] == 1001
+    # ...and the other still waits for its spooled work package
+    assert [op["kind"] for op in remaining[1:]] == ["work_package", "time_entry"]
+    assert remaining[2]["depends_on"] == remaining[1]["id"]
+
+    # Once the server accepts them, nothing is left
+    logger.failing_subjects.clear()
+    logger.failing_hours.clear()
+    assert flush_spool(logger, spool) == (3, 0)
+
+
+def test_time_entry_that_reached_the_server_is_dropped(spool):
+    spool.spool_time_entry(42, DAY, None, 1, "Development", "")
+    logger = StubLogger(spool, existing={42})
+
+    assert flush_spool(logger, spool) == (1, 0)
+    assert logger.time_entries == []
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Tests for subject normalization and the similar subject search."""
+
+import pytest
+
+from subject_index import SubjectIndex, normalize_subject
+
+
+@pytest.mark.parametrize(
+    "subject, normalized",
+    [
+        ("August Daily Scrum - 50000179", "august daily scrum"),
+        ("Fix login #123", "fix login"),
+        ("Fix login (HR-42)", "fix login"),
+        ("Fix login [123]", "fix login"),
+        ("Fix login ABC-123", "fix login"),
+        ("Sprint 12 review", "sprint 12 review"),
+        ("Release 2.4", "release 2 4"),
+        ("Upgrade to python-3", "upgrade to python 3"),
+    ],
+)
+def test_normalize_strips_only_ticket_references(subject, normalized):
+    assert normalize_subject(subject) == normalized
+
+
+def test_ticket_references_are_ignored_when_matching():
+    index = SubjectIndex([(1, "Fix login page #123")])
+    assert index.find_similar("Fix login page #456") == [(1.0, 1)]
+
+
+@pytest.mark.parametrize(
+    "existing, query",
+    [
+        ("Sprint 12 review", "Sprint 13 review"),
+        ("Release 2.4", "Release 2.5"),
+        ("Migrate 2023 payroll data", "Migrate 2024 payroll data"),
+    ],
+)
+def test_subjects_with_other_numbers_are_not_offered(existing, query):
+    index = SubjectIndex([(1, existing)])
+    assert index.find_similar(query, threshold=0.5) == []
+
+
+def test_near_matches_are_found_above_the_threshold():
+    index = SubjectIndex(
+        [
+            (1, "Enhance candidate onboarding process"),
+            (2, "Enhance head count entry management"),
+        ]
+    )
+    matches = index.find_similar("Enhance candidate onboarding processes")
+    assert [work_package_id for _, work_package_id in matches] == [1]
+    assert matches[0][0] >= 0.8
+
+
+def test_removed_work_packages_are_not_found():
+    index = SubjectIndex([(1, "Write release notes"), (2, "Write release notes")])
+    index.remove(1)
+    assert index.find_exact("write release notes") == 2
+    assert [match[1] for match in index.find_similar("Write release notes")] == [2]
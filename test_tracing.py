@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Tests for entry tracing spans."""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from tracing import Tracer, in_current_context, record_response
+
+
+def read_spans(path):
+    with open(path, encoding="utf-8") as file:
+        return {span["name"]: span for span in map(json.loads, file)}
+
+
+def test_worker_spans_have_the_submitting_span_as_parent(tmp_path):
+    tracer = Tracer(str(tmp_path / "trace.jsonl"))
+
+    def page(number):
+        with tracer.span(f"page_{number}"):
+            pass
+
+    with tracer.span("lookup"):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(in_current_context(page), [2, 3, 4]))
+    tracer.close()
+
+    spans = read_spans(tracer.path)
+    for number in (2, 3, 4):
+        span = spans[f"page_{number}"]
+        assert span["parentSpanId"] == spans["lookup"]["spanId"]
+        assert span["traceId"] == spans["lookup"]["traceId"]
+
+
+def test_responses_in_workers_count_towards_the_submitting_span(tmp_path):
+    tracer = Tracer(str(tmp_path / "trace.jsonl"))
+    response = SimpleNamespace(status_code=200)
+
+    with tracer.span("scan") as span:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(in_current_context(record_response), [response] * 3))
+    tracer.close()
+
+    assert span.attributes == {
+        "http.request_count": 3,
+        "http.response.status_code": 200,
+    }
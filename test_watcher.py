@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Tests for incremental work log syncing in watch mode."""
+
+import json
+
+from log import WorkLogParser
+from tracing import Tracer
+from watcher import WorkLogSync
+
+
+class StubLogger:
+    """Creates one time entry per work package subject and records deletions."""
+
+    def __init__(self):
+        self.tracer = Tracer()
+        self.time_entries = {}  # Subject -> time entry ID
+        self.deleted = []
+        self.fail_deletes = False
+
+    def process_work_log_entry(self, entry, date, update_existing=False, claimed=None):
+        if entry["subject"] in self.time_entries:
+            # Same work package, date and activity: updated in place
+            time_entry_id = self.time_entries[entry["subject"]]
+            outcome = "updated"
+        else:
+            time_entry_id = len(self.time_entries) + 100
+            self.time_entries[entry["subject"]] = time_entry_id
+            outcome = "created"
+        return {
+            "outcome": outcome,
+            "work_package_id": None,
+            "time_entry_id": time_entry_id,
+        }
+
+    def delete_time_entry(self, time_entry_id, date):
+        if self.fail_deletes:
+            return False
+        self.deleted.append(time_entry_id)
+        return True
+
+
+def task(subject, hours=1):
+    return {
+        "project": "IDCOL",
+        "subject": subject,
+        "duration_hours": hours,
+        "is_scrum": False,
+    }
+
+
+def write_log(path, blocks):
+    path.write_text(
+        json.dumps(
+            {"logs": [{"date": date, "entries": entries} for date, entries in blocks]}
+        )
+    )
+
+
+def start(tmp_path, blocks):
+    log_path = tmp_path / "logs.json"
+    write_log(log_path, blocks)
+    logger = StubLogger()
+    work_log_sync = WorkLogSync(
+        logger, WorkLogParser(str(log_path)), str(log_path), str(tmp_path / "state")
+    )
+    assert work_log_sync.sync() == (sum(len(entries) for _, entries in blocks), 0)
+    return log_path, logger, work_log_sync
+
+
+def test_renamed_new_task_deletes_its_old_time_entry(tmp_path):
+    log_path, logger, work_log_sync = start(
+        tmp_path, [("jan-06-2025", [task("Review"), task("Deploy")])]
+    )
+
+    # A new subject means a new work package and time entry
+    write_log(log_path, [("jan-06-2025", [task("Code review"), task("Deploy")])])
+    assert work_log_sync.sync() == (1, 0)
+    assert logger.deleted == [100]
+    assert sorted(work_log_sync.state["entries"].values()) == [101, 102]
+
+
+def test_hours_edit_keeps_the_updated_time_entry(tmp_path):
+    log_path, logger, work_log_sync = start(
+        tmp_path, [("jan-06-2025", [task("Review")])]
+    )
+
+    write_log(log_path, [("jan-06-2025", [task("Review", hours=2)])])
+    assert work_log_sync.sync() == (1, 0)
+    assert logger.deleted == []
+
+
+def test_removed_block_deletes_its_time_entries(tmp_path):
+    log_path, logger, work_log_sync = start(
+        tmp_path,
+        [("jan-06-2025", [task("Review")]), ("jan-07-2025", [task("Deploy")])],
+    )
+
+    write_log(log_path, [("jan-07-2025", [task("Deploy")])])
+    assert work_log_sync.sync() == (0, 0)
+    assert logger.deleted == [100]
+
+
+def test_failed_deletion_is_retried(tmp_path):
+    log_path, logger, work_log_sync = start(
+        tmp_path, [("jan-06-2025", [task("Review")])]
+    )
+
+    write_log(log_path, [("jan-06-2025", [task("Code review")])])
+    logger.fail_deletes = True
+    assert work_log_sync.sync() == (1, 1)
+
+    logger.fail_deletes = False
+    assert work_log_sync.sync() == (0, 0)
+    assert logger.deleted == [100]
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Tests for webhook cache updates through a running sync service."""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import reference_data
+from log import WorkLogParser
+from reference_data import CACHE_FILE_NAME, ReferenceData
+from service import SyncService, create_server
+from sparse import TimeEntryRow
+from subject_index import SubjectIndex
+from tracing import Tracer
+from webhooks import SIGNATURE_HEADER, sign
+
+BASE_URL = "https://openproject.example"
+SECRET = "s3cret"
+USER_ID = 83
+
+
+class StubLogger:
+    """The caches of an OpenProjectTimeLogger, without a server behind them."""
+
+    def __init__(self):
+        self.base_url = BASE_URL
+        self.tracer = Tracer()
+        self.spool = None
+        self.reference_data = ReferenceData(
+            {"projects": [{"id": 64, "name": "IDCOL", "identifier": "idcol"}]}
+        )
+        self.subject_indexes = {
+            64: SubjectIndex([(1042, "Review pull requests")]),
+            65: SubjectIndex([]),
+        }
+        self.time_entries_by_date = {
+            "2025-09-07": [TimeEntryRow(9, "2025-09-07", "PT1H", 1042, "", None, "")]
+        }
+
+    def get_current_user(self):
+        return {"id": USER_ID}
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    monkeypatch.setattr(reference_data, "get_cache_dir", lambda: str(tmp_path))
+    ReferenceData._write_cache(
+        str(tmp_path / CACHE_FILE_NAME),
+        BASE_URL,
+        {"projects": [{"id": 64, "name": "IDCOL", "identifier": "idcol"}]},
+    )
+    sync_service = SyncService(StubLogger(), WorkLogParser, webhook_secret=SECRET)
+    server = create_server(sync_service, port=0)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    sync_service.url = f"http://127.0.0.1:{server.server_address[1]}/webhook"
+    yield sync_service
+    server.shutdown()
+    server.server_close()
+
+
+def post(service, body, signature=None):
+    """Post a raw body and return (status, JSON response)."""
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if signature is not None:
+        headers[SIGNATURE_HEADER] = signature
+    request = urllib.request.Request(service.url, body, headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def post_signed(service, event):
+    body = json.dumps(event).encode("utf-8")
+    return post(service, body, sign(SECRET, body))
+
+
+def links(**hrefs):
+    return {name: {"href": href} for name, href in hrefs.items()}
+
+
+def test_moved_work_package_changes_subject_indexes(service):
+    status, response = post_signed(
+        service,
+        {
+            "action": "work_package:updated",
+            "work_package": {
+                "id": 1042,
+                "subject": "Review merge requests",
+                "_links": links(project="/api/v3/projects/65"),
+            },
+        },
+    )
+
+    assert status == 200
+    assert response["applied"] == "subject index of project 65 updated"
+    indexes = service.logger.subject_indexes
+    assert indexes[64].subjects == {}
+    assert indexes[65].find_exact("review merge requests") == 1042
+
+
+def test_time_entry_events_update_the_cached_date(service):
+    updated = {
+        "id": 9,
+        "spentOn": "2025-09-07",
+        "hours": "PT2H",
+        "_links": links(
+            workPackage="/api/v3/work_packages/1042", user=f"/api/v3/users/{USER_ID}"
+        ),
+    }
+    cached = service.logger.time_entries_by_date["2025-09-07"]
+    status, _ = post_signed(
+        service, {"action": "time_entry:updated", "time_entry": updated}
+    )
+    assert status == 200
+    assert [(row.id, row.hours) for row in cached] == [(9, "PT2H")]
+
+    other_user = dict(updated, id=10, _links=links(user="/api/v3/users/1"))
+    _, response = post_signed(
+        service, {"action": "time_entry:created", "time_entry": other_user}
+    )
+    assert response["applied"] == "another user's time entry"
+
+    post_signed(service, {"action": "time_entry:deleted", "time_entry": {"id": 9}})
+    assert cached == []
+
+
+def test_renamed_project_is_written_to_the_disk_cache(service, tmp_path):
+    renamed = {"id": 64, "name": "IDCOL Platform", "identifier": "idcol"}
+    status, _ = post_signed(service, {"action": "project:updated", "project": renamed})
+
+    assert status == 200
+    assert service.logger.reference_data.project_id("IDCOL Platform") == 64
+    cached = ReferenceData._read_cache(
+        str(tmp_path / CACHE_FILE_NAME), BASE_URL, ttl_hours=24
+    )
+    assert cached["projects"] == [renamed]
+
+
+def test_deleted_project_leaves_the_disk_cache(service, tmp_path):
+    post_signed(service, {"action": "project:deleted", "project": {"id": 64}})
+    cached = ReferenceData._read_cache(
+        str(tmp_path / CACHE_FILE_NAME), BASE_URL, ttl_hours=24
+    )
+    assert cached["projects"] == []
+    assert 64 not in service.logger.subject_indexes
+
+
+@pytest.mark.parametrize("signature", [None, "sha1=0000", sign("other", b"{}")])
+def test_unsigned_or_wrongly_signed_events_are_refused(service, signature):
+    event = {"action": "work_package:deleted", "work_package": {"id": 1042}}
+    status, response = post(service, event, signature)
+
+    assert status == 403
+    assert "signature" in response["error"]
+    assert service.logger.subject_indexes[64].subjects == {1042: "Review pull requests"}
+    assert service.webhooks.events == 0
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"[1, 2]"])
+def test_malformed_events_are_rejected(service, body):
+    status, _ = post(service, body, sign(SECRET, body))
+    assert status == 400
+    assert service.webhooks.events == 0
+
+
+def test_unknown_or_incomplete_events_are_ignored(service):
+    for event in [
+        {"action": "user:created", "user": {"id": 1}},
+        {"action": "work_package:updated"},
+        {"action": "time_entry:updated", "time_entry": "9"},
+    ]:
+        assert post_signed(service, event) == (
+            200,
+            {"action": event["action"], "applied": "ignored"},
+        )
+    assert service.logger.time_entries_by_date["2025-09-07"][0].id == 9
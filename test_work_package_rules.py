@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Tests for compiled work package status and comment rules."""
+
+import json
+import re
+from datetime import date
+
+import pytest
+
+from work_package_rules import WorkPackageRules
+
+RULES = [
+    {"subject": "^(fix|bug)", "status": "In Progress", "comment": "Bug in {project}"},
+    {"project": ["HRIS", "CBL"], "activity": "Meeting", "status": "Closed"},
+    {"subject": r"release \d+", "status_id": 11, "comment": "{subject} on {date}"},
+    {"project": "IDCOL", "comment": "IDCOL work"},
+]
+
+STATUSES = {"in progress": 7, "closed": 12}
+
+
+def first_matching_rule(rules, subject, project, activity):
+    """The rule the compiled matcher implements: the first one that applies."""
+    for index, rule in enumerate(rules, 1):
+        projects = rule.get("project")
+        if isinstance(projects, str):
+            projects = [projects]
+        if projects and project.lower() not in {p.lower() for p in projects}:
+            continue
+        activities = rule.get("activity")
+        if isinstance(activities, str):
+            activities = [activities]
+        if activities and activity.lower() not in {a.lower() for a in activities}:
+            continue
+        subject_pattern = rule.get("subject")
+        if subject_pattern and not re.search(subject_pattern, subject, re.IGNORECASE):
+            continue
+        return index
+    return None
+
+
+def decide(rules, subject, project="IDCOL", activity="Development"):
+    entry = {"subject": subject, "project": project, "activity": activity}
+    return rules.decide(
+        entry, date(2025, 9, 7), lambda name: STATUSES.get(name.lower())
+    )
+
+
+def test_first_matching_rule_wins():
+    rules = WorkPackageRules(RULES)
+    assert decide(rules, "Fix login", project="HRIS", activity="Meeting") == (
+        7,
+        "Bug in HRIS",
+    )
+    assert decide(rules, "Sprint review", project="cbl", activity="meeting") == (
+        12,
+        "",
+    )
+    assert decide(rules, "Prepare Release 42") == (
+        11,
+        "Prepare Release 42 on 2025-09-07",
+    )
+    assert decide(rules, "Anything else") == (None, "IDCOL work")
+    assert decide(rules, "Anything else", project="SEBL") is None
+
+
+def test_compiled_matcher_agrees_with_rule_order():
+    rules = WorkPackageRules(RULES)
+    for subject in ["fix it", "bugfix", "A bug", "release 1", "Release x", "notes"]:
+        for project in ["IDCOL", "HRIS", "SEBL"]:
+            for activity in ["Meeting", "Development"]:
+                rule = rules.match(subject, project, activity)
+                assert (rule.index if rule else None) == first_matching_rule(
+                    RULES, subject, project, activity
+                ), (subject, project, activity)
+
+
+def test_unknown_status_name_gives_no_status(capsys):
+    rules = WorkPackageRules([{"status": "Parked"}])
+    assert decide(rules, "Anything") == (None, "")
+    assert "unknown status 'Parked'" in capsys.readouterr().out
+
+
+def test_named_groups_can_be_referenced():
+    rules = WorkPackageRules([{"subject": r"(?P<word>\w+) (?P=word)", "comment": "x"}])
+    assert rules.match("again again", "IDCOL", "Development") is not None
+    assert rules.match("again once", "IDCOL", "Development") is None
+
+
+@pytest.mark.parametrize(
+    "rule, message",
+    [
+        ({"subject": "(?i)fix", "status": "New"}, "inline flags"),
+        ({"subject": r"(a)\1", "status": "New"}, "by number"),
+        ({"subject": "(", "status": "New"}, "invalid subject pattern"),
+        ({"subject": "fix"}, "needs a status"),
+        ({"status": "New", "colour": "red"}, "unknown keys colour"),
+        ({"comment": "{owner}"}, "invalid comment template"),
+    ],
+)
+def test_invalid_rules_are_rejected(rule, message):
+    with pytest.raises(ValueError, match=message):
+        WorkPackageRules([rule])
+
+
+def test_group_names_shared_between_rules_are_rejected():
+    with pytest.raises(ValueError, match="cannot be combined"):
+        WorkPackageRules(
+            [
+                {"subject": "(?P<id>a)", "status": "New"},
+                {"subject": "(?P<id>b)", "status": "New"},
+            ]
+        )
+
+
+def test_load(tmp_path):
+    assert WorkPackageRules.load(str(tmp_path / "missing.json")) is None
+
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": RULES}))
+    assert len(WorkPackageRules.load(str(path)).rules) == 4
+
+    path.write_text(json.dumps(RULES))
+    with pytest.raises(ValueError, match="expected"):
+        WorkPackageRules.load(str(path))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Entry Tracing
+
+Records each stage of processing a work log entry as a span in a span tree:
+looking up the work package, checking for duplicates, creating the work
+package and posting the time entry. Finished spans are appended to a JSONL
+file, one per line, using OpenTelemetry field names (traceId, spanId,
+parentSpanId, startTimeUnixNano, endTimeUnixNano, attributes, status). The
+HTTP requests a span makes add their status code and request count to it,
+so slow entries can be traced to the stage that is slow. Work handed to
+thread pools is wrapped with in_current_context(), so the requests of
+pagination and prefetch workers count towards the span that started them.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, copy_context
+from functools import wraps
+
+from config import CONFIG
+
+SERVICE_NAME = "openproject-time-logger"
+STATUS_UNSET = "STATUS_CODE_UNSET"
+STATUS_OK = "STATUS_CODE_OK"
+STATUS_ERROR = "STATUS_CODE_ERROR"
+
+_current_span = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed stage with attributes, written when it ends."""
+
+    def __init__(self, name, trace_id, parent_span_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.attributes = dict(attributes)
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        # Worker threads of the span record their responses concurrently
+        self.lock = threading.Lock()
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_error(self, message):
+        self.status = STATUS_ERROR
+        self.status_message = str(message)
+
+    def record_response(self, response):
+        """Add an HTTP response received while this span was open."""
+        with self.lock:
+            self.attributes["http.request_count"] = (
+                self.attributes.get("http.request_count", 0) + 1
+            )
+            self.attributes["http.response.status_code"] = response.status_code
+        if response.status_code >= 400:
+            self.set_error(f"HTTP {response.status_code}")
+
+    def to_dict(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message},
+            "resource": {"service.name": SERVICE_NAME},
+        }
+
+
+class _NullSpan:
+    """Span stand-in used when tracing is off."""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_error(self, message):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Writes finished spans to a JSONL file; does nothing without a path."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def span(self, name, **attributes):
+        """Return a context manager timing a span under the current one."""
+        if not self.path:
+            return nullcontext(NULL_SPAN)
+        return self._span(name, attributes)
+
+    @contextmanager
+    def _span(self, name, attributes):
+        parent = _current_span.get()
+        span = Span(
+            name,
+            parent.trace_id if parent else os.urandom(16).hex(),
+            parent.span_id if parent else None,
+            attributes,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{e.__class__.__name__}: {e}")
+            raise
+        else:
+            if span.status == STATUS_UNSET:
+                span.status = STATUS_OK
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self.write(span)
+
+    def write(self, span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self.lock:
+            if self.file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def current_span():
+    """Return the span open in this thread, or a no-op span."""
+    return _current_span.get() or NULL_SPAN
+
+
+def in_current_context(function):
+    """Return function bound to the caller's context, for running on worker threads.
+
+    Each call runs in its own copy of the context, so the wrapper can be
+    submitted to several workers at once and their spans get the caller's
+    current span as parent.
+    """
+    context = copy_context()
+    return lambda *args, **kwargs: context.copy().run(function, *args, **kwargs)
+
+
+def record_response(response, *args, **kwargs):
+    """requests response hook adding HTTP details to the current span."""
+    span = _current_span.get()
+    if span is not None:
+        span.record_response(response)
+    return response
+
+
+def traced(name, *arg_names):
+    """Decorate a method of an object with a 'tracer' so each call is a span.
+
+    The named arguments of each call are recorded as span attributes.
+    """
+
+    def decorate(method):
+        code = method.__code__
+        # Position of each named argument in a call, not counting self
+        positions = {
+            arg_name: code.co_varnames.index(arg_name) - 1 for arg_name in arg_names
+        }
+
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.tracer.enabled:
+                return method(self, *args, **kwargs)
+            attributes = {}
+            for arg_name, position in positions.items():
+                value = args[position] if position < len(args) else kwargs.get(arg_name)
+                if value is not None:
+                    attributes[arg_name] = value
+            with self.tracer.span(name, **attributes):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def set_trace_file(path):
+    """Write spans of this process to path, overriding the trace_file setting."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is not None:
+            _tracer.close()
+        _tracer = Tracer(path)
+
+
+def get_tracer():
+    """Return the tracer shared by the process."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(CONFIG.get("trace_file"))
+        return _tracer
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Work Log File Watcher
+
+Watches the work log file and syncs only what changed. Changes are detected
+with inotify on Linux and by polling the file's modification time elsewhere.
+Each date block and entry is hashed, and the hashes of entries that reached
+OpenProject are kept in a state file with their time entry IDs, so an edit
+only pushes the new or changed entries. A changed entry updates the one time
+entry of its work package, date and activity that no unchanged entry owns.
+Time entries whose entry was removed, or edited onto another work package,
+are deleted once the rest of their date has synced, so hours are not counted
+twice.
+"""
+
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import select
+import struct
+import time
+
+# inotify event flags (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+# Editors often write a file in several steps; wait for them to settle
+DEBOUNCE_SECONDS = 0.3
+
+# Version 1 state files kept work package IDs instead of time entry IDs
+STATE_VERSION = 2
+
+
+def content_hash(value):
+    """Return a stable hash of a JSON-serializable value."""
+    encoded = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def entry_hash(entry):
+    """Return the hash of the fields of a parsed entry that reach OpenProject."""
+    return content_hash(
+        [
+            entry["entry_date"].isoformat(),
+            entry["project"],
+            entry["subject"],
+            entry["activity"],
+            entry["hours"],
+            entry["is_scrum"],
+            entry["work_package_id"],
+        ]
+    )
+
+
+class PollingWatcher:
+    """Detects file changes by polling its modification time and size."""
+
+    def __init__(self, file_path, interval=1.0):
+        self.file_path = file_path
+        self.interval = interval
+        self.last_stat = self._stat()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.file_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def wait_for_change(self, timeout=None):
+        """Block until the file changes or timeout seconds pass; return True on change."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(self.interval)
+            current = self._stat()
+            if current != self.last_stat:
+                self.last_stat = current
+                return True
+        return False
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Detects file changes with Linux inotify on the file's directory."""
+
+    def __init__(self, file_path):
+        self.file_name = os.path.basename(file_path)
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # Watch the directory so editors that replace the file are seen too
+        directory = os.path.dirname(os.path.abspath(file_path))
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, directory.encode(), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {directory}")
+
+    def _read_events(self):
+        """Drain pending events and return True if one concerns the file."""
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                _, _, _, name_length = INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+                offset += INOTIFY_EVENT_HEADER.size
+                name = data[offset : offset + name_length].rstrip(b"\0").decode()
+                offset += name_length
+                if name == self.file_name:
+                    changed = True
+
+    def wait_for_change(self, timeout=None):
+        """Block until the file changes or timeout seconds pass; return True on change."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if ready and self._read_events():
+                # Swallow the rest of a multi-step save
+                while select.select([self.fd], [], [], DEBOUNCE_SECONDS)[0]:
+                    self._read_events()
+                return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def default_state_path(file_path, cache_dir):
+    """Return the sync state file for a work log file."""
+    digest = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"watch_{digest[:12]}.json")
+
+
+def create_watcher(file_path, poll_interval=1.0, use_inotify=True):
+    """Return an inotify watcher where available, otherwise a polling watcher."""
+    if use_inotify and hasattr(os, "O_CLOEXEC") and os.uname().sysname == "Linux":
+        try:
+            return InotifyWatcher(file_path)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(file_path, poll_interval)
+
+
+class WorkLogSync:
+    """Pushes new or changed work log entries, remembering what was synced."""
+
+    def __init__(self, logger, parser, file_path, state_path):
+        self.logger = logger
+        self.parser = parser
+        self.file_path = file_path
+        self.state_path = state_path
+        self.state = self._load_state()
+        self.block_dates = {}  # Parsed date -> date string of its block
+
+    def _load_state(self):
+        """Load the synced block and entry hashes for this file."""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+            if state.get("file") == os.path.abspath(self.file_path):
+                if state.get("version") != STATE_VERSION:
+                    state["entries"] = dict.fromkeys(state.get("entries", {}))
+                    state["version"] = STATE_VERSION
+                return state
+        except (OSError, ValueError):
+            pass
+        return {
+            "file": os.path.abspath(self.file_path),
+            "version": STATE_VERSION,
+            "blocks": {},
+            "entries": {},
+        }
+
+    def _save_state(self):
+        """Write the synced hashes to the state file."""
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(self.state, file)
+        os.replace(temp_path, self.state_path)
+
+    def pending_changes(self):
+        """Return (block hashes, {date: [(key, entry)]}, {date: keys}).
+
+        The second item holds the entries not yet synced, the third the keys
+        of every entry on the dates of changed blocks.
+        """
+        with open(self.file_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+
+        logs = data.get("logs", []) if isinstance(data, dict) else []
+        block_hashes = {}
+        changed_blocks = []
+        for block in logs:
+            if not isinstance(block, dict) or "date" not in block:
+                continue
+            block_key = str(block["date"]).lower()
+            block_hashes[block_key] = content_hash(block)
+            if self.state["blocks"].get(block_key) != block_hashes[block_key]:
+                changed_blocks.append(block)
+                try:
+                    self.block_dates[self.parser.parse_date_string(block_key)] = (
+                        block_key
+                    )
+                except ValueError:
+                    pass
+
+        pending = {}
+        present = {}
+        for block_key in set(self.state["blocks"]) - set(block_hashes):
+            # A removed block leaves its date without entries
+            try:
+                present[self.parser.parse_date_string(block_key)] = set()
+            except ValueError:
+                pass
+        if changed_blocks:
+            parsed = self.parser.parse_json_work_log_content({"logs": changed_blocks})
+            for date, entries in parsed.items():
+                seen = {}
+                for entry in entries:
+                    digest = entry_hash(entry)
+                    # Identical entries on the same date are kept apart
+                    seen[digest] = seen.get(digest, 0) + 1
+                    key = f"{date.isoformat()}:{digest}:{seen[digest]}"
+                    present.setdefault(date, set()).add(key)
+                    if key not in self.state["entries"]:
+                        pending.setdefault(date, []).append((key, entry))
+
+        return block_hashes, pending, present
+
+    def _delete_orphans(self, date, keys):
+        """Delete the time entries of removed entries on a date; return failures.
+
+        A time entry still owned by a current entry, e.g. one updated in
+        place, is kept.
+        """
+        prefix = f"{date.isoformat()}:"
+        owned = {self.state["entries"].get(key) for key in keys}
+        orphans = {
+            time_entry_id
+            for key, time_entry_id in self.state["entries"].items()
+            if key.startswith(prefix)
+            and key not in keys
+            and time_entry_id is not None
+            and time_entry_id not in owned
+        }
+        failed = 0
+        for time_entry_id in sorted(orphans):
+            if self.logger.delete_time_entry(time_entry_id, date):
+                print(
+                    f"  ✓ Deleted time entry {time_entry_id} of a removed or replaced entry"
+                )
+            else:
+                print(f"  ✗ Failed to delete time entry {time_entry_id}")
+                failed += 1
+        return failed
+
+    def _forget_removed(self, present):
+        """Drop synced keys of entries no longer in the file, so reverting an edit pushes it."""
+        for date, keys in present.items():
+            prefix = f"{date.isoformat()}:"
+            for key in [
+                key
+                for key in self.state["entries"]
+                if key.startswith(prefix) and key not in keys
+            ]:
+                del self.state["entries"][key]
+
+    def mark_synced(self):
+        """Record the current file contents as synced without pushing anything."""
+        block_hashes, pending, present = self.pending_changes()
+        for date_entries in pending.values():
+            for key, _ in date_entries:
+                self.state["entries"][key] = None
+        self._forget_removed(present)
+        self.state["blocks"] = block_hashes
+        self._save_state()
+        return sum(len(date_entries) for date_entries in pending.values())
+
+    def sync(self):
+        """Push pending entries and return (synced, failed) counts."""
+        block_hashes, pending, present = self.pending_changes()
+        synced_count = 0
+        failed_count = 0
+        failed_dates = set()
+
+        for date, date_entries in sorted(pending.items()):
+            # Time entries of unchanged entries are not touched by changed ones
+            claimed = {
+                self.state["entries"][key]
+                for key in present.get(date, ())
+                if self.state["entries"].get(key) is not None
+            }
+            print(
+                f"\nSyncing {len(date_entries)} entries for {date.strftime('%Y-%m-%d')}"
+            )
+            for index, (key, entry) in enumerate(date_entries, 1):
+                print(
+                    f"\n[{index}/{len(date_entries)}] {entry['project']} - {entry['subject'][:50]} ({entry['hours']} hrs)"
+                )
+                with self.logger.tracer.span(
+                    "process_entry",
+                    date=date.isoformat(),
+                    project=entry["project"],
+                    subject=entry["subject"],
+                    hours=entry["hours"],
+                ) as span:
+                    result = self.logger.process_work_log_entry(
+                        entry, date, update_existing=True, claimed=claimed
+                    )
+                    span.set_attribute("outcome", result["outcome"])
+
+                if result["outcome"] in ("failed", "ambiguous"):
+                    # Changed but not pushed; tried again on the next change
+                    failed_count += 1
+                    failed_dates.add(date)
+                else:
+                    self.state["entries"][key] = result["time_entry_id"]
+                    if result["time_entry_id"] is not None:
+                        claimed.add(result["time_entry_id"])
+                    synced_count += 1
+
+        for date, keys in sorted(present.items()):
+            if date not in failed_dates and self._delete_orphans(date, keys):
+                # Keep the old keys so the deletion is tried on the next change
+                failed_count += 1
+                failed_dates.add(date)
+
+        self._forget_removed(
+            {date: keys for date, keys in present.items() if date not in failed_dates}
+        )
+
+        # A block counts as synced only once every entry in it made it
+        failed_blocks = {self.block_dates.get(date) for date in failed_dates}
+        self.state["blocks"] = {
+            block_key: block_hash
+            for block_key, block_hash in block_hashes.items()
+            if block_key not in failed_blocks
+        }
+        self._save_state()
+
+        return synced_count, failed_count
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Webhook Cache Updates
+
+OpenProject sends a webhook (Administration > API and webhooks) when work
+packages, time entries or projects change. The sync service receives them
+on POST /webhook and applies each change to its logger's caches instead of
+expiring them: a work package goes into, moves between or leaves the
+subject indexes of its projects, a time entry replaces the cached row of its
+date, and a project is renamed or added in the reference data and its disk
+cache, so a restarted service does not read the old name back. Caches can
+then live for the whole service lifetime and still match the server.
+
+Run as a script, this module is a stand-in for OpenProject that posts signed
+sample events to a running service:
+
+    python webhooks.py work_package:updated --id 1042 --project 64 --subject "New title"
+    python webhooks.py time_entry:created --id 9 --work-package 1042 --spent-on 2025-09-07 --user 83
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import sys
+
+from reference_data import ReferenceData, href_id
+
+SIGNATURE_HEADER = "X-Op-Signature"
+COLLECTIONS = {
+    "work_package": "work_packages",
+    "time_entry": "time_entries",
+    "project": "projects",
+}
+
+
+def sign(secret, body):
+    """Return the signature OpenProject sends for a body."""
+    return "sha1=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha1).hexdigest()
+
+
+def signature_valid(secret, body, signature):
+    """Check a webhook body against its signature header."""
+    return hmac.compare_digest(sign(secret, body), signature or "")
+
+
+def link_id(resource, name):
+    """Return the ID a resource links to under name, or None."""
+    return href_id(resource.get("_links", {}).get(name, {}).get("href"))
+
+
+class WebhookCacheUpdater:
+    """Applies webhook events to an OpenProjectTimeLogger's caches."""
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.current_user_id = None
+        self.events = 0
+
+    def apply(self, event):
+        """Apply one webhook event and return what was done."""
+        self.events += 1
+        resource, _, change = (event.get("action") or "").partition(":")
+        handler = {
+            "work_package": self.work_package,
+            "time_entry": self.time_entry,
+            "project": self.project,
+        }.get(resource)
+        payload = event.get(resource)
+        if handler is None or not isinstance(payload, dict):
+            return "ignored"
+        return handler(change, payload)
+
+    def work_package(self, change, work_package):
+        work_package_id = work_package.get("id")
+        project_id = link_id(work_package, "project")
+
+        # A moved or deleted work package leaves every other index
+        for indexed_project_id, index in self.logger.subject_indexes.items():
+            if indexed_project_id != project_id or change == "deleted":
+                if work_package_id in index.subjects:
+                    index.remove(work_package_id)
+        if change == "deleted":
+            return "removed from subject indexes"
+
+        index = self.logger.subject_indexes.get(project_id)
+        if index is None:
+            return "project not cached"
+        index.add(work_package_id, work_package.get("subject", ""))
+        return f"subject index of project {project_id} updated"
+
+    def time_entry(self, change, time_entry):
+        from sparse import time_entry_row
+
+        time_entry_id = time_entry.get("id")
+        cached_dates = self.logger.time_entries_by_date
+        for rows in cached_dates.values():
+            rows[:] = [row for row in rows if row.id != time_entry_id]
+        if change == "deleted":
+            return "removed from cached time entries"
+
+        date = time_entry.get("spentOn")
+        if date not in cached_dates:
+            return "date not cached"
+        user_id = self.get_current_user_id()
+        if user_id is None:
+            # Without knowing whose entry it is, the date is looked up again
+            del cached_dates[date]
+            return f"time entries of {date} invalidated"
+        if link_id(time_entry, "user") != user_id:
+            return "another user's time entry"
+        cached_dates[date].append(time_entry_row(time_entry))
+        return f"time entries of {date} updated"
+
+    def project(self, change, project):
+        removed = change == "deleted"
+        self.logger.reference_data.update_project(project, removed=removed)
+        ReferenceData.update_cached_project(
+            self.logger.base_url, project, removed=removed
+        )
+        if removed:
+            self.logger.subject_indexes.pop(project.get("id"), None)
+        return "projects updated"
+
+    def get_current_user_id(self):
+        """Return the ID of the logger's user, looking it up once."""
+        if self.current_user_id is None:
+            user = self.logger.get_current_user()
+            self.current_user_id = user.get("id") if user else None
+        return self.current_user_id
+
+
+def sample_event(args):
+    """Build an event shaped like OpenProject's webhook payloads."""
+    resource = args.action.partition(":")[0]
+    payload = {
+        "_type": "".join(part.title() for part in resource.split("_")),
+        "id": args.id,
+    }
+    links = {
+        "self": {"href": f"/api/v3/{COLLECTIONS.get(resource, resource)}/{args.id}"}
+    }
+
+    if resource == "work_package":
+        payload["subject"] = args.subject or f"Work package {args.id}"
+        if args.project:
+            links["project"] = {"href": f"/api/v3/projects/{args.project}"}
+    elif resource == "time_entry":
+        payload["spentOn"] = args.spent_on
+        payload["hours"] = f"PT{args.hours}H"
+        if args.work_package:
+            links["workPackage"] = {
+                "href": f"/api/v3/work_packages/{args.work_package}"
+            }
+        if args.user:
+            links["user"] = {"href": f"/api/v3/users/{args.user}"}
+        if args.activity:
+            links["activity"] = {
+                "href": f"/api/v3/time_entries/activities/{args.activity}"
+            }
+    elif resource == "project":
+        payload["name"] = args.subject or f"Project {args.id}"
+        payload["identifier"] = args.identifier or f"project-{args.id}"
+
+    payload["_links"] = links
+    return {"action": args.action, resource: payload}
+
+
+def main(argv=None):
+    from config import CONFIG
+    from log import get_service_url, load_requests
+
+    arg_parser = argparse.ArgumentParser(
+        description="Post a signed sample webhook event to the local sync service."
+    )
+    arg_parser.add_argument(
+        "action",
+        help="Event, e.g. work_package:updated, time_entry:created, project:updated",
+    )
+    arg_parser.add_argument("--id", type=int, required=True, help="Resource ID")
+    arg_parser.add_argument("--project", type=int, help="Project of a work package")
+    arg_parser.add_argument("--subject", help="Work package subject or project name")
+    arg_parser.add_argument("--identifier", help="Project identifier")
+    arg_parser.add_argument(
+        "--work-package", type=int, help="Work package of a time entry"
+    )
+    arg_parser.add_argument("--spent-on", help="Date of a time entry (YYYY-MM-DD)")
+    arg_parser.add_argument("--hours", type=float, default=1.0, help="Time entry hours")
+    arg_parser.add_argument("--user", type=int, help="User of a time entry")
+    arg_parser.add_argument("--activity", type=int, help="Activity ID of a time entry")
+    arg_parser.add_argument("--url", help="Sync service URL")
+    arg_parser.add_argument("--secret", help="Webhook secret (default: webhook_secret)")
+    args = arg_parser.parse_args(argv)
+
+    secret = args.secret or CONFIG.get("webhook_secret")
+    if not secret:
+        print("✗ No webhook secret; set webhook_secret in config.py or pass --secret")
+        return 1
+
+    body = json.dumps(sample_event(args)).encode("utf-8")
+    url = (args.url or get_service_url()).rstrip("/") + "/webhook"
+    requests = load_requests()
+    try:
+        response = requests.post(
+            url,
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                SIGNATURE_HEADER: sign(secret, body),
+            },
+            timeout=30,
+        )
+    except requests.exceptions.ConnectionError:
+        print(f"✗ The sync service is not running at {url}")
+        return 1
+
+    print(f"{response.status_code}: {response.text}")
+    return 0 if response.status_code == 200 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
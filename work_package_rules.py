@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Work Package Rules
+
+Decides the status and description of new work packages from a JSON rules
+file instead of asking for each one. A rule matches on a subject regex
+(case-insensitive, searched anywhere unless anchored), project names and
+activity names; any of them may be left out. Rules are tried in file order
+and the first match wins:
+
+    {"rules": [
+        {"subject": "^(fix|bug)", "status": "In Progress",
+         "comment": "Bug fix reported in {project}: {subject}"},
+        {"project": ["HRIS", "CBL"], "activity": "Meeting", "status": "Closed"}
+    ]}
+
+For every (project, activity) pair the rules that can apply are compiled
+into one regex: each rule's subject pattern becomes a lookahead alternative
+of an alternation anchored at the start, so a single match() call returns
+the first matching rule in priority order. Because the patterns share one
+regex, a pattern may not set inline flags such as (?i) (scoped ones such as
+(?i:...) are fine), refer to groups by number (name them and use (?P=name)),
+or reuse a group name of another rule.
+"""
+
+import json
+import re
+
+RULE_KEYS = {"subject", "project", "activity", "status", "status_id", "comment"}
+COMMENT_FIELDS = ("subject", "project", "activity", "date")
+
+# Global inline flags such as (?i), which must start a whole regex
+INLINE_FLAGS = re.compile(r"(?<!\\)(?:\\\\)*\(\?[aiLmsux]+\)")
+# \1 or (?(1)...) outside an escape; group numbers shift in the combined regex
+NUMBERED_REFERENCE = re.compile(r"(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?\(\d)")
+
+
+def get_rules_file():
+    """Return the path of the work package rules file."""
+    from config import CONFIG
+
+    return CONFIG.get("work_package_rules_file", "work_package_rules.json")
+
+
+def _branch(position, subject):
+    """Return the alternative of the combined regex that selects a rule."""
+    if subject is None:
+        return f"(?P<_rule{position}>)"
+    return f"(?=[\\s\\S]*?(?:{subject}))(?P<_rule{position}>)"
+
+
+def _compile(branches):
+    return re.compile(f"(?:{'|'.join(branches)})", re.IGNORECASE)
+
+
+def _name_set(value):
+    """Return the lowercased names of a rule condition, or None for any."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    return frozenset(name.lower() for name in value)
+
+
+class WorkPackageRule:
+    """One validated rule."""
+
+    def __init__(self, index, data):
+        unknown = set(data) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"rule {index}: unknown keys {', '.join(sorted(unknown))}")
+        if not any(key in data for key in ("status", "status_id", "comment")):
+            raise ValueError(f"rule {index}: needs a status, status_id or comment")
+
+        self.index = index
+        self.subject = data.get("subject")
+        if self.subject is not None:
+            if INLINE_FLAGS.search(self.subject):
+                raise ValueError(
+                    f"rule {index}: subject pattern sets inline flags; patterns are "
+                    "case-insensitive already, use a scoped group such as (?s:...)"
+                )
+            if NUMBERED_REFERENCE.search(self.subject):
+                raise ValueError(
+                    f"rule {index}: subject pattern refers to a group by number; "
+                    "name the group and use (?P=name)"
+                )
+            try:
+                # Compiled as it appears in the combined regex
+                _compile([_branch(0, self.subject)])
+            except re.error as e:
+                raise ValueError(f"rule {index}: invalid subject pattern: {e}") from e
+        self.projects = _name_set(data.get("project"))
+        self.activities = _name_set(data.get("activity"))
+        self.status = data.get("status")
+        self.status_id = data.get("status_id")
+        self.comment = data.get("comment", "")
+        try:
+            self.comment.format_map(dict.fromkeys(COMMENT_FIELDS, ""))
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f"rule {index}: invalid comment template: {e}") from e
+
+    def applies_to(self, project, activity):
+        return (self.projects is None or project in self.projects) and (
+            self.activities is None or activity in self.activities
+        )
+
+
+class WorkPackageRules:
+    """Rules compiled into one priority matcher per (project, activity)."""
+
+    def __init__(self, rules):
+        self.rules = [
+            WorkPackageRule(index, data) for index, data in enumerate(rules, 1)
+        ]
+        # Every matcher combines a subset of these, so this catches group
+        # names that two rules share
+        try:
+            _compile(
+                [
+                    _branch(position, rule.subject)
+                    for position, rule in enumerate(self.rules)
+                    if rule.subject is not None
+                ]
+            )
+        except re.error as e:
+            raise ValueError(f"subject patterns cannot be combined: {e}") from e
+        self.matchers = {}
+
+    @classmethod
+    def load(cls, file_path=None):
+        """Load the rules file; returns None when it does not exist."""
+        file_path = file_path or get_rules_file()
+        try:
+            with open(file_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+
+        rules = data.get("rules") if isinstance(data, dict) else None
+        if not isinstance(rules, list):
+            raise ValueError(f'{file_path}: expected {{"rules": [...]}}')
+        try:
+            return cls(rules)
+        except ValueError as e:
+            raise ValueError(f"{file_path}: {e}") from e
+
+    def _matcher(self, project, activity):
+        """Return (compiled pattern, candidate rules) for a project and activity."""
+        key = (project, activity)
+        matcher = self.matchers.get(key)
+        if matcher is None:
+            candidates = [
+                rule for rule in self.rules if rule.applies_to(project, activity)
+            ]
+            # Rules without a subject pattern match any subject, so later
+            # candidates can never win
+            branches = []
+            for position, rule in enumerate(candidates):
+                branches.append(_branch(position, rule.subject))
+                if rule.subject is None:
+                    break
+            pattern = _compile(branches) if branches else None
+            matcher = self.matchers[key] = (pattern, candidates)
+        return matcher
+
+    def match(self, subject, project, activity):
+        """Return the first rule matching an entry, or None."""
+        pattern, candidates = self._matcher(
+            (project or "").lower(), (activity or "").lower()
+        )
+        if pattern is None:
+            return None
+        found = pattern.match(subject)
+        if found is None:
+            return None
+        # The rule's empty marker group closes after its lookahead, so it is
+        # the last group matched
+        return candidates[int(found.lastgroup[len("_rule") :])]
+
+    def decide(self, entry, date, status_id_of):
+        """Return (status ID or None, comment) for an entry, or None when no rule matches.
+
+        status_id_of maps a status name to its ID.
+        """
+        rule = self.match(entry["subject"], entry["project"], entry.get("activity"))
+        if rule is None:
+            return None
+
+        status_id = rule.status_id
+        if status_id is None and rule.status is not None:
+            status_id = status_id_of(rule.status)
+            if status_id is None:
+                print(f"⚠ Rule {rule.index}: unknown status '{rule.status}'")
+        comment = rule.comment.format_map(
+            {
+                "subject": entry["subject"],
+                "project": entry["project"],
+                "activity": entry.get("activity", ""),
+                "date": date.isoformat() if date else "",
+            }
+        )
+        return status_id, comment